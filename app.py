@@ -1,19 +1,39 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
 import sys
 import os
+import tempfile
 
 # Add the parent directory to the path to import utils modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.normalize import normalize_data, create_normalization_df, verify_normalization
-from utils.knapsack import solve_knapsack, create_dp_table_df
-from utils.combinations import generate_combinations, calculate_distances, create_combinations_df
+from utils.normalize import normalize_data, verify_normalization, criteria_matrix, normalize_matrix
+from utils.knapsack import (solve_knapsack, solve_knapsack_sparse, solve_knapsack_k_best, calculate_ideal_point,
+                            dp_path_window, downsample_dp)
+from utils.scaling import plan_precision
+from utils.combinations import (generate_combinations, calculate_distances, DEFAULT_METRICS,
+                                build_candidate_store, calculate_distance_matrix, rank_candidates,
+                                query_candidates)
 from utils.sequential_concessions import (initialize_sequential_concessions, make_next_concession, 
-                                        get_current_result, create_concessions_df, get_history_df)
+                                        get_current_result)
+from utils.portfolio import Portfolio, as_portfolio, apply_row_changes
+from utils.dependencies import parse_rules
+from utils.ingest import read_columns, resolve_columns, read_projects
+from utils.multiplicity import group_identical_projects
+from utils.spatial_index import build_kd_tree, query_nearest, pareto_front
+from utils.budget_sweep import budget_sweep
+from utils.robustness import robustness_analysis
+from utils.candidate_store import build_memmap_store, compute_store_distances, query_store_chunked
+from utils.instrumentation import (record_stage, enable_stage_logging, disable_stage_logging, start_memory_tracing,
+                                   stop_memory_tracing, start_profiler, profile_to_bytes)
+from utils.export import (EXPORT_FORMATS, MAX_DOWNLOAD_BYTES, iter_candidate_frames, iter_dp_frames,
+                          export_to_tempfile)
+from utils.tables import (create_normalization_df, create_precision_df, create_dp_table_df,
+                          create_combinations_df, create_metric_comparison_df, create_candidate_page_df,
+                          get_history_df, create_budget_sweep_df, create_ingest_errors_df,
+                          create_stages_df, create_profile_df, create_robustness_df,
+                          create_project_frequency_df, create_k_best_df)
 
 def main():
     st.set_page_config(page_title="Вибір проєктів за кількома критеріями", 
@@ -30,11 +50,16 @@ def main():
         st.header("Вхідні параметри")
         
         # Budget input
-        budget = st.number_input("Доступний бюджет", min_value=1, value=6)
+        budget = st.number_input("Доступний бюджет", min_value=0.0, value=6.0, step=1.0)
         
         # Number of projects
         num_projects = st.number_input("Кількість проєктів", min_value=1, max_value=200, value=4)
         
+        # Precision of fractional costs for the DP table
+        precision_option = st.selectbox("Точність вартостей", 
+                                        ["Авто", "0 знаків", "1 знак", "2 знаки", "3 знаки"])
+        precision = None if precision_option == "Авто" else int(precision_option.split()[0])
+        
         st.subheader("Опції аналізу")
         
         # Options for Ideal Point method
@@ -44,6 +69,21 @@ def main():
         show_combinations = st.checkbox("Показати всі комбінації", value=True)
         num_top_combinations = st.slider("Кількість найкращих комбінацій для відображення", 
                                         min_value=1, max_value=20, value=10)
+        num_best_portfolios = st.slider("Кількість найкращих портфелів за кожним критерієм",
+                                        min_value=1, max_value=10, value=3)
+        show_metric_comparison = st.checkbox("Порівняти метрики відстані", value=False)
+        profit_weight = st.slider("Вага прибутку для зважених метрик", 
+                                  min_value=0.0, max_value=1.0, value=0.5, step=0.05)
+        show_nearest_search = st.checkbox("Інтерактивний пошук відносно ідеальної точки", value=False)
+        show_budget_sweep = st.checkbox("Показати чутливість до бюджету", value=False)
+        show_disk_store = st.checkbox("Повний перелік комбінацій на диску", value=False)
+        show_robustness = st.checkbox("Перевірити стійкість до похибок оцінок", value=False)
+        
+        st.markdown("**Діагностика:**")
+        show_diagnostics = st.checkbox("Показати час і пам'ять етапів", value=False)
+        capture_profile = st.checkbox("Записати профіль виконання", value=False)
+        budget_sweep_percent = st.slider("Діапазон зміни бюджету (±%)", 
+                                         min_value=5, max_value=50, value=20, step=5)
         
         # Options for Sequential Concessions method
         st.markdown("**Параметри послідовних поступок:**")
@@ -60,55 +100,61 @@ def main():
     
     # Allow selecting input method
     input_method = st.radio("Спосіб введення даних", 
-                            ["Ручне введення", "Приклад даних", "Завантажити CSV"],
+                            ["Ручне введення", "Приклад даних", "Завантажити файл"],
                             horizontal=True)
     
+    # Names of the criteria stored after the cost in each project row
+    criteria_names = ["Прибуток", "Експертна оцінка"]
+    
+    # Capacities of the limited resources besides the budget (None - budget only)
+    capacities = None
+    
     if input_method == "Ручне введення":
-        col_headers = st.columns([1, 1, 1, 1])
-        with col_headers[0]:
-            st.markdown("**Проєкт**")
-        with col_headers[1]:
-            st.markdown("**Вартість**")
-        with col_headers[2]:
-            st.markdown("**Прибуток**")
-        with col_headers[3]:
-            st.markdown("**Експертна оцінка**")
-        
-        # Initialize project data list
-        projects = []
-        
-        # Create input fields for each project
-        for i in range(num_projects):
-            cols = st.columns([1, 1, 1, 1])
-            with cols[0]:
-                st.markdown(f"Проєкт {i+1}")
-            with cols[1]:
-                cost = st.number_input(f"Вартість {i+1}", 
-                                       min_value=1, 
-                                       value=20, 
-                                       key=f"cost_{i}")
-            with cols[2]:
-                profit = st.number_input(f"Прибуток {i+1}", 
-                                         min_value=0, 
-                                         value=30, 
-                                         key=f"profit_{i}")
-            with cols[3]:
-                expert = st.number_input(f"Експертна оцінка {i+1}", 
-                                         min_value=0, 
-                                         value=40, 
-                                         key=f"expert_{i}")
-            
-            # Add project data
-            projects.append([cost, profit, expert])
+        # One editable grid instead of three number inputs per project
+        editor_columns = ["Cost", "Profit", "ExpertScore"]
+        default_row = [20.0, 30, 40]
+        state = st.session_state
+        if 'projects_table' not in state:
+            state.projects_table = Portfolio.from_rows([default_row] * num_projects)
+            state.projects_count, state.projects_editor_version = num_projects, 0
+        elif state.projects_count != num_projects:
+            # Fold the edits made so far into the table before resizing it, so changing
+            # the number of projects keeps the entered rows; the editor restarts on the new table
+            try:
+                rows = apply_row_changes(state.projects_table,
+                                         state.get(f"projects_editor_{state.projects_editor_version}", {}),
+                                         editor_columns).to_rows()
+            except ValueError:
+                rows = state.projects_table.to_rows()
+            state.projects_table = Portfolio.from_rows((rows + [default_row] * num_projects)[:num_projects])
+            state.projects_count = num_projects
+            state.projects_editor_version += 1
+        template = state.projects_table
+        editor_key = f"projects_editor_{state.projects_editor_version}"
+        
+        st.data_editor(
+            pd.DataFrame({name: template.column(j) for j, name in enumerate(editor_columns)}),
+            key=editor_key,
+            num_rows="dynamic",
+            use_container_width=True,
+            column_config={
+                "Cost": st.column_config.NumberColumn("Вартість", min_value=0.0, step=1.0, default=20.0),
+                "Profit": st.column_config.NumberColumn("Прибуток", min_value=0, default=30),
+                "ExpertScore": st.column_config.NumberColumn("Експертна оцінка", min_value=0, default=40)
+            }
+        )
+        
+        # Apply only the edited, added and deleted rows to the template
+        try:
+            projects = apply_row_changes(template, st.session_state.get(editor_key, {}), editor_columns)
+        except ValueError as e:
+            st.error(f"Некоректні дані про проєкти: {e}")
+            return
         
         # Add option to download entered project data
-        if projects:
-            project_df = pd.DataFrame(projects, 
-                                    columns=["Cost", "Profit", "ExpertScore"],
-                                    index=[f"Проєкт {i+1}" for i in range(len(projects))])
-            
-            # Display the entered data as a table
-            st.dataframe(project_df)
+        if len(projects):
+            project_df = pd.DataFrame({name: projects.column(j) for j, name in enumerate(editor_columns)},
+                                      index=[f"Проєкт {i+1}" for i in range(len(projects))])
             
             # Download option for manual data
             csv = project_df.to_csv(index=True)
@@ -167,47 +213,95 @@ def main():
             mime="text/csv",
         )
         
-    else:  # CSV Upload
-        st.info("Завантажте CSV файл із стовпцями: Cost, Profit, ExpertScore")
+    else:  # File upload
+        st.info("Завантажте файл CSV, Parquet або Arrow IPC із стовпцями: Cost, Profit, ExpertScore")
         
-        uploaded_file = st.file_uploader("Виберіть CSV файл", type="csv")
+        uploaded_file = st.file_uploader("Виберіть файл", type=["csv", "parquet", "arrow", "feather"])
         if uploaded_file is not None:
             try:
-                csv_data = pd.read_csv(uploaded_file)
-                required_columns = ["Cost", "Profit", "ExpertScore"]
+                # Resolve the required columns once from the file header
+                columns = read_columns(uploaded_file)
+                required = resolve_columns(columns)
                 
-                # Check if required columns exist (case-insensitive)
-                has_columns = all(any(col.lower() == req.lower() for col in csv_data.columns) 
-                                 for req in required_columns)
+                # Other columns can be used as additional criteria
+                extra_columns = [col for col in columns if col not in required]
+                extra_criteria = st.multiselect("Додаткові критерії", extra_columns)
+                criteria_names += extra_criteria
                 
-                if has_columns:
-                    # Get the actual column names (preserving case)
-                    cost_col = next(col for col in csv_data.columns 
-                                   if col.lower() == "cost".lower())
-                    profit_col = next(col for col in csv_data.columns 
-                                     if col.lower() == "profit".lower())
-                    expert_col = next(col for col in csv_data.columns 
-                                     if col.lower() == "expertscore".lower())
-                    
-                    projects = []
-                    for _, row in csv_data.iterrows():
-                        projects.append([row[cost_col], row[profit_col], row[expert_col]])
-                    
-                    st.dataframe(csv_data)
-                else:
-                    st.error("CSV повинен містити стовпці Cost, Profit та ExpertScore")
-                    projects = []
+                # Other columns can also hold the usage of limited resources (staff hours, equipment)
+                resource_columns = st.multiselect("Обмежені ресурси (крім бюджету)",
+                                                  [col for col in extra_columns if col not in extra_criteria])
+                if resource_columns:
+                    capacities = tuple(
+                        st.number_input(f"Доступний обсяг: {col}", min_value=0.0, value=0.0, step=1.0,
+                                        key=f"capacity_{col}")
+                        for col in resource_columns
+                    )
+                
+                projects, errors = read_projects(uploaded_file, extra_columns=extra_criteria,
+                                                 resource_columns=resource_columns)
+                
+                if errors:
+                    bad_rows = len({error['Рядок'] for error in errors})
+                    st.warning(f"Пропущено рядків з некоректними значеннями: {bad_rows}")
+                    with st.expander("Некоректні значення", expanded=False):
+                        st.dataframe(create_ingest_errors_df(errors), use_container_width=True, hide_index=True)
+                
+                project_df = pd.DataFrame(
+                    {name: projects.column(j) for j, name in enumerate(["Cost", "Profit", "ExpertScore"] + extra_criteria)},
+                    index=[f"Проєкт {i+1}" for i in range(len(projects))]
+                )
+                for name, column in zip(resource_columns, projects.resources):
+                    project_df[name] = column
+                st.dataframe(project_df)
+            except ValueError as e:
+                st.error(str(e))
+                projects = []
             except Exception as e:
-                st.error(f"Помилка читання CSV: {e}")
+                st.error(f"Помилка читання файлу: {e}")
                 projects = []
         else:
             projects = []
     
     # Only proceed if we have project data
-    if not projects:
+    if not len(projects):
         st.warning("Будь ласка, введіть дані про проєкти, щоб продовжити.")
         return
     
+    # Validate the project data once and keep it as typed columns
+    try:
+        projects = as_portfolio(projects)
+    except ValueError as e:
+        st.error(f"Некоректні дані про проєкти: {e}")
+        return
+    
+    # Dependency and mutual exclusion rules between the projects
+    with st.expander("Залежності та взаємовиключні проєкти", expanded=False):
+        st.markdown("Кожен рядок залежностей має вигляд `x4: x1, x2` (x4 можна вибрати лише разом з x1 і x2), "
+                    "кожен рядок груп - `x3, x5` (з x3 і x5 можна вибрати не більше одного).")
+        rule_cols = st.columns(2)
+        with rule_cols[0]:
+            requires_text = st.text_area("Залежності", value="", key="requires_rules")
+        with rule_cols[1]:
+            exclusive_text = st.text_area("Взаємовиключні проєкти", value="", key="exclusive_rules")
+    try:
+        rules = parse_rules(requires_text, exclusive_text, len(projects))
+    except ValueError as e:
+        st.error(f"Некоректні правила вибору проєктів: {e}")
+        return
+    
+    # Show how the chosen cost precision affects the DP table size
+    plan = plan_precision(projects.cost, budget, precision)
+    with st.expander("Точність вартостей і розмір таблиці ДП", expanded=False):
+        st.dataframe(create_precision_df(projects.cost, budget), use_container_width=True, hide_index=True)
+        st.markdown(f"Вибрано: {plan['decimals']} знаків після коми, одиниця вартості {1 / plan['scale']:g}, "
+                    f"{plan['cells']:,} комірок ({plan['memory_bytes'] / 2**20:.2f} МБ на таблицю).")
+    if not plan['exact']:
+        st.warning("Вибрана точність грубша за точність вартостей: вартості округлено вгору, "
+                   "тому результат динамічного програмування може бути неточним.")
+    if plan['engine'] == 'sparse':
+        st.info("Таблиця ДП для такої точності завелика, тому використовується розріджений метод.")
+    
     # Initialize session state for sequential concessions method
     if 'concessions_state' not in st.session_state:
         st.session_state.concessions_state = None
@@ -229,56 +323,103 @@ def main():
             st.session_state.solution_accepted = False
             st.session_state.just_clicked = False
         
-        # Create two columns for side-by-side display
-        col1, col2 = st.columns(2)
+        # Per-stage timings are always recorded; they are logged and memory is traced only with diagnostics on
+        stages = []
+        if show_diagnostics:
+            enable_stage_logging()
+            start_memory_tracing()
+        else:
+            disable_stage_logging()
+        profiler = start_profiler() if capture_profile else None
         
-        # Run Ideal Point method in first column
-        with col1:
-            run_ideal_point_analysis(
-                projects, budget, show_normalization, show_knapsack, 
-                show_combinations, num_top_combinations
-            )
+        # Tracing is stopped even if the run stops early, so it never stays on after diagnostics are turned off
+        try:
+            # Create two columns for side-by-side display
+            col1, col2 = st.columns(2)
         
-        # Run Sequential Concessions method in second column
-        with col2:
-            # Initialize state if needed
-            if st.session_state.concessions_state is None:
-                st.session_state.concessions_state = initialize_sequential_concessions(
-                    projects, budget, primary_criterion_index, secondary_criterion_index
+            # Run Ideal Point method in first column
+            with col1:
+                run_ideal_point_analysis(
+                    projects, budget, show_normalization, show_knapsack, 
+                    show_combinations, num_top_combinations,
+                    show_budget_sweep, budget_sweep_percent,
+                    show_metric_comparison, profit_weight, show_nearest_search,
+                    criteria_names, precision, show_disk_store, stages, show_robustness,
+                    num_best_portfolios, capacities, rules
                 )
-                st.session_state.show_continue_button = True
+        
+            # Run Sequential Concessions method in second column
+            with col2:
+                # Initialize state if needed
+                if st.session_state.concessions_state is None:
+                    with record_stage(stages, "Поступки: початкове рішення", len(projects)):
+                        st.session_state.concessions_state = initialize_sequential_concessions(
+                            projects, budget, primary_criterion_index, secondary_criterion_index, precision,
+                            capacities, rules
+                        )
+                    st.session_state.show_continue_button = True
             
-            # Show initial solution
-            run_sequential_concessions_analysis(
-                projects, budget, primary_criterion, 
-                primary_criterion_index, secondary_criterion_index
+                # Show initial solution
+                run_sequential_concessions_analysis(
+                    projects, budget, primary_criterion, 
+                    primary_criterion_index, secondary_criterion_index, precision, stages,
+                    capacities, rules
+                )
+            if st.session_state.get('solution_accepted') and 'ideal_point_solution' in st.session_state:
+                st.divider()
+                primary_name = "Прибуток" if primary_criterion == "Прибуток" else "Експертна оцінка"
+                secondary_name = "Експертна оцінка" if primary_criterion == "Прибуток" else "Прибуток"
+                show_methods_comparison(primary_name, secondary_name)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            if show_diagnostics:
+                stop_memory_tracing()
+        
+        if show_diagnostics or profiler is not None:
+            show_diagnostics_panel(stages, profiler)
+
+def show_diagnostics_panel(stages, profiler=None):
+    """Show the per-stage timings and the optional profiler capture of this run"""
+    with st.expander("Діагностика", expanded=True):
+        if stages:
+            st.markdown("**Етапи аналізу:**")
+            st.dataframe(create_stages_df(stages), use_container_width=True, hide_index=True)
+        
+        if profiler is not None:
+            st.markdown("**Профіль виконання (найдовші функції):**")
+            st.dataframe(create_profile_df(profiler), use_container_width=True, hide_index=True)
+            st.download_button(
+                label="Завантажити профіль (.prof)",
+                data=profile_to_bytes(profiler),
+                file_name="analysis_profile.prof",
+                mime="application/octet-stream",
             )
-        if st.session_state.get('solution_accepted') and 'ideal_point_solution' in st.session_state:
-            st.divider()
-            primary_name = "Прибуток" if primary_criterion == "Прибуток" else "Експертна оцінка"
-            secondary_name = "Експертна оцінка" if primary_criterion == "Прибуток" else "Прибуток"
-            show_methods_comparison(primary_name, secondary_name)
 
 def run_sequential_concessions_analysis(projects, budget, primary_criterion, 
-                                       primary_criterion_index, secondary_criterion_index):
+                                       primary_criterion_index, secondary_criterion_index, precision=None,
+                                       stages=None, capacities=None, rules=None):
     """Run initial analysis with sequential concessions method"""
     
     st.header("Метод послідовних поступок")
     
     # Initialize the state if needed
     if st.session_state.concessions_state is None:
-        st.session_state.concessions_state = initialize_sequential_concessions(
-            projects, budget, primary_criterion_index, secondary_criterion_index
-        )
+        with record_stage(stages, "Поступки: початкове рішення", len(projects)):
+            st.session_state.concessions_state = initialize_sequential_concessions(
+                projects, budget, primary_criterion_index, secondary_criterion_index, precision,
+                capacities=capacities, rules=rules
+            )
         st.session_state.show_continue_button = True
     
     # Display initial solution
     if not st.session_state.solution_accepted:
-        display_sequential_concessions_results(
-            st.session_state.concessions_state, 
-            primary_criterion,
-            1  # Initial concession amount
-        )
+        with record_stage(stages, "Поступки: відображення"):
+            display_sequential_concessions_results(
+                st.session_state.concessions_state, 
+                primary_criterion,
+                1  # Initial concession amount
+            )
     
     # Sequential concessions iteration controls (if already initialized)
     if (st.session_state.concessions_state is not None and 
@@ -319,10 +460,13 @@ def run_sequential_concessions_analysis(projects, budget, primary_criterion,
                     )
                 else:
                     # Apply next concession
-                    st.session_state.concessions_state = make_next_concession(
-                        st.session_state.concessions_state, 
-                        new_concession
-                    )
+                    with record_stage(stages, "Поступки: ітерація") as stage:
+                        st.session_state.concessions_state = make_next_concession(
+                            st.session_state.concessions_state, 
+                            new_concession
+                        )
+                        stage['items'] = len(st.session_state.concessions_state["history"][-1]
+                                             .get("acceptable_combinations", []))
                     
                     # Check if we still have acceptable combinations
                     latest_history = st.session_state.concessions_state["history"][-1]
@@ -351,17 +495,14 @@ def run_sequential_concessions_analysis(projects, budget, primary_criterion,
             primary_criterion
         )
     
-    # Add download button for history CSV
-    if st.session_state.solution_accepted and 'history_csv_data' in st.session_state:
-        st.download_button(
-            label="Завантажити історію ітерацій як CSV",
-            data=st.session_state.history_csv_data,
-            file_name="sequential_concessions_history.csv",
-            mime="text/csv",
-        )  
+    # Add download button for the iteration history
+    if st.session_state.solution_accepted and 'history_df' in st.session_state:
+        show_export(lambda: [st.session_state.history_df], "sequential_concessions_history",
+                    key="history_export")
 
 def show_methods_comparison(primary_name, secondary_name):
     """Display enhanced comparison between both methods with more data analysis"""
+    import plotly.graph_objects as go
     
     st.markdown("""
     ### Порівняння методів багатокритеріальної оптимізації
@@ -574,8 +715,8 @@ def display_final_sequential_solution(state, primary_criterion):
     with st.expander("Історія ітерацій", expanded=False):
         st.dataframe(history_df, use_container_width=True)
 
-    # Store CSV data in session state for download button outside of form
-    st.session_state.history_csv_data = history_df.to_csv(index=False)
+    # Store the history in session state for the download button outside of form
+    st.session_state.history_df = history_df
     
     # Visualize the final solution
     st.markdown("### Візуалізація фінального рішення")
@@ -591,40 +732,31 @@ def display_final_sequential_solution(state, primary_criterion):
         final_solution = state["current_solution"]
         
         # Convert to plotting format
-        plot_data = []
-        for combo, cost, primary_value, secondary_value in latest_entry["acceptable_combinations"]:
-            combo_str = ", ".join([f"x{j+1}" for j, x in enumerate(combo) if x == 1]) or "Жодного"
-            point_type = "Фінальне рішення" if np.array_equal(combo, final_solution) else "Інші можливі рішення"
-            
-            plot_data.append({
-                "Комбінація": combo_str,
-                primary_name: primary_value,
-                secondary_name: secondary_value,
-                "Вартість": cost,
-                "Тип": point_type
-            })
-        
-        plot_df = pd.DataFrame(plot_data)
+        combinations = latest_entry["acceptable_combinations"]
+        values = np.array([[primary_value, secondary_value] for _, _, primary_value, secondary_value in combinations],
+                          dtype=float).reshape(-1, 2)
+        point_types = np.array(["Фінальне рішення" if np.array_equal(combo, final_solution) else "Інші можливі рішення"
+                                for combo, _, _, _ in combinations], dtype=object)
         
         # Create scatter plot with Plotly
-        fig = px.scatter(
-            plot_df, 
-            x=primary_name, 
-            y=secondary_name,
-            color="Тип",
-            symbol="Тип",
-            hover_name="Комбінація",
-            hover_data=["Вартість"],
+        fig = plot_solutions(
+            values[:, 0],
+            values[:, 1],
+            point_types,
+            label=lambda i: ", ".join([f"x{j+1}" for j, x in enumerate(combinations[i][0]) if x == 1]) or "Жодного",
+            hover_data={"Вартість": lambda i: combinations[i][1]},
+            x_title=primary_name,
+            y_title=secondary_name,
             title=f"{primary_name} vs {secondary_name} для фінального рішення",
-            color_discrete_map={
+            colors={
                 "Фінальне рішення": "#FF5733",
                 "Інші можливі рішення": "#BEBEBE"
             },
-            symbol_map={
+            symbols={
                 "Фінальне рішення": "star",
                 "Інші можливі рішення": "circle"
             },
-            size_max=15
+            background="Інші можливі рішення"
         )
         
         # Customize layout
@@ -678,55 +810,41 @@ def display_sequential_concessions_results(state, primary_criterion, concession_
         st.markdown("### Прийнятні комбінації на поточній ітерації")
         
         final_solution = state["current_solution"]
-        combinations_df = create_concessions_df(latest_entry["acceptable_combinations"], final_solution)
-        
-        # Rename columns based on primary criterion
-        column_mapping = {
-            'Критерій 1': primary_name,
-            'Критерій 2': secondary_name
-        }
-        combinations_df = combinations_df.rename(columns=column_mapping)
-        
-        st.dataframe(combinations_df, use_container_width=True)
+        store = build_concessions_store(latest_entry["acceptable_combinations"])
+        final_index = next((i for i, (combo, _, _, _) in enumerate(latest_entry["acceptable_combinations"])
+                            if np.array_equal(combo, final_solution)), None)
+        show_candidate_grid(store, [primary_name, secondary_name], key="concessions_results",
+                            marked=final_index)
         
         # Create visualization
         st.markdown("### Візуалізація")
         
         # Convert to plotting format
-        plot_data = []
-        for combo, cost, primary_value, secondary_value in latest_entry["acceptable_combinations"]:
-            combo_str = ", ".join([f"x{j+1}" for j, x in enumerate(combo) if x == 1]) or "Жодного"
-            point_type = "Поточне рішення" if np.array_equal(combo, final_solution) else "Можливе рішення"
-            
-            plot_data.append({
-                "Комбінація": combo_str,
-                primary_name: primary_value,
-                secondary_name: secondary_value,
-                "Вартість": cost,
-                "Тип": point_type
-            })
-        
-        plot_df = pd.DataFrame(plot_data)
+        combinations = latest_entry["acceptable_combinations"]
+        values = np.array([[primary_value, secondary_value] for _, _, primary_value, secondary_value in combinations],
+                          dtype=float).reshape(-1, 2)
+        point_types = np.array(["Поточне рішення" if np.array_equal(combo, final_solution) else "Можливе рішення"
+                                for combo, _, _, _ in combinations], dtype=object)
         
         # Create scatter plot with Plotly
-        fig = px.scatter(
-            plot_df, 
-            x=primary_name, 
-            y=secondary_name,
-            color="Тип",
-            symbol="Тип",
-            hover_name="Комбінація",
-            hover_data=["Вартість"],
+        fig = plot_solutions(
+            values[:, 0],
+            values[:, 1],
+            point_types,
+            label=lambda i: ", ".join([f"x{j+1}" for j, x in enumerate(combinations[i][0]) if x == 1]) or "Жодного",
+            hover_data={"Вартість": lambda i: combinations[i][1]},
+            x_title=primary_name,
+            y_title=secondary_name,
             title=f"{primary_name} vs {secondary_name} для прийнятних комбінацій",
-            color_discrete_map={
+            colors={
                 "Поточне рішення": "#FF5733",
                 "Можливе рішення": "#BEBEBE"
             },
-            symbol_map={
+            symbols={
                 "Поточне рішення": "star",
                 "Можливе рішення": "circle"
             },
-            size_max=15
+            background="Можливе рішення"
         )
         
         # Customize layout
@@ -741,14 +859,148 @@ def display_sequential_concessions_results(state, primary_criterion, concession_
         
         st.plotly_chart(fig)
     
+# Above this many points the solution plots switch to WebGL traces and a density map
+SCATTER_MAX_POINTS = 5000
+
+def plot_solutions(x, y, point_types, label, hover_data, x_title, y_title, title, colors, symbols,
+                   background, max_points=SCATTER_MAX_POINTS, bins=150):
+    """Scatter plot of solutions; large plots draw the dominated background points as a density map"""
+    import plotly.express as px
+    import plotly.graph_objects as go
+    point_types = np.asarray(point_types, dtype=object)
+    
+    if len(x) <= max_points:
+        plot_df = pd.DataFrame({x_title: x, y_title: y, "Тип": point_types,
+                                "Комбінація": [label(i) for i in range(len(x))]})
+        for name, value in hover_data.items():
+            plot_df[name] = [value(i) for i in range(len(x))]
+        
+        return px.scatter(
+            plot_df,
+            x=x_title,
+            y=y_title,
+            color="Тип",
+            symbol="Тип",
+            hover_name="Комбінація",
+            hover_data=list(hover_data),
+            title=title,
+            color_discrete_map=colors,
+            symbol_map=symbols,
+            size_max=15
+        )
+    
+    fig = go.Figure()
+    points = np.column_stack([x, y])
+    is_background = point_types == background
+    
+    # The Pareto frontier of the background points is always drawn exactly
+    background_ids = np.flatnonzero(is_background)
+    front = background_ids[pareto_front(points[background_ids])]
+    cloud = np.ones(len(x), dtype=bool)
+    cloud[front] = False
+    cloud &= is_background
+    
+    # Dominated points are binned on the server and sent as one heatmap
+    counts, x_edges, y_edges = np.histogram2d(x[cloud], y[cloud], bins=bins)
+    fig.add_trace(go.Heatmap(
+        z=np.where(counts > 0, counts, np.nan).T,
+        x=(x_edges[:-1] + x_edges[1:]) / 2,
+        y=(y_edges[:-1] + y_edges[1:]) / 2,
+        colorscale="Greys",
+        showscale=False,
+        hoverinfo="skip",
+        name="Щільність рішень"
+    ))
+    
+    def add_points(ids, name, color, symbol):
+        text = ["<br>".join([f"<b>{label(i)}</b>"] + [f"{key}: {value(i)}" for key, value in hover_data.items()])
+                for i in ids]
+        fig.add_trace(go.Scattergl(
+            x=x[ids], y=y[ids], mode="markers", name=name, text=text, hoverinfo="text",
+            marker=dict(color=color, symbol=symbol, size=10)
+        ))
+    
+    add_points(front, "Фронт Парето", colors[background], "circle-open")
+    for point_type in dict.fromkeys(point_types[~is_background]):
+        add_points(np.flatnonzero(point_types == point_type), point_type,
+                   colors[point_type], symbols[point_type])
+    
+    fig.update_layout(title=title)
+    return fig
+
+def build_concessions_store(acceptable_combinations):
+    """Columnar store of the acceptable combinations of a concessions iteration"""
+    n = len(acceptable_combinations[0][0]) if acceptable_combinations else 0
+    return {
+        'masks': np.array([combo for combo, _, _, _ in acceptable_combinations], dtype=bool).reshape(-1, n),
+        'cost': np.array([cost for _, cost, _, _ in acceptable_combinations]),
+        'values': np.array([[primary, secondary] for _, _, primary, secondary in acceptable_combinations]).reshape(-1, 2),
+        'rank': np.arange(1, len(acceptable_combinations) + 1)
+    }
+
+def show_candidate_grid(store, criteria_names, key, page_size=20, marked=None):
+    """Browse the candidate store page by page; sorting and filtering run on the arrays, not on a DataFrame"""
+    sort_options = {"Ранг": 'rank', "Вартість": 'cost'} if 'rank' in store else {"Відстань": 'distance', "Вартість": 'cost'}
+    sort_options.update({name: j for j, name in enumerate(criteria_names)})
+    
+    cols = st.columns(3)
+    with cols[0]:
+        sort_label = st.selectbox("Сортувати за", list(sort_options), key=f"{key}_sort")
+        ascending = st.radio("Порядок", ["За зростанням", "За спаданням"], horizontal=True,
+                             key=f"{key}_order") == "За зростанням"
+    with cols[1]:
+        cost_range = None
+        if len(store['cost']) and store['cost'].min() < store['cost'].max():
+            low, high = float(store['cost'].min()), float(store['cost'].max())
+            cost_range = st.slider("Вартість", min_value=low, max_value=high, value=(low, high),
+                                   key=f"{key}_cost")
+    with cols[2]:
+        project_names = [f"x{j+1}" for j in range(store['masks'].shape[1])]
+        include = st.multiselect("Містить проєкти", project_names, key=f"{key}_include")
+        exclude = st.multiselect("Не містить проєктів", project_names, key=f"{key}_exclude")
+    
+    include_ids = [project_names.index(name) for name in include]
+    exclude_ids = [project_names.index(name) for name in exclude]
+    
+    if 'directory' in store:
+        # On-disk store: scan the mapped arrays in chunks and keep only the rows up to this page
+        page = st.number_input("Сторінка", min_value=1, value=1, key=f"{key}_page")
+        indices, total = query_store_chunked(store, sort_options[sort_label], ascending, cost_range,
+                                             include_ids, exclude_ids, limit=page * page_size)
+    else:
+        indices = query_candidates(store, sort_options[sort_label], ascending, cost_range,
+                                   include_ids, exclude_ids)
+        total = len(indices)
+        page = st.number_input("Сторінка", min_value=1, max_value=max(1, -(-total // page_size)), value=1,
+                               key=f"{key}_page")
+    
+    pages = max(1, -(-total // page_size))
+    st.caption(f"Знайдено комбінацій: {total}, сторінка {page} з {pages}")
+    
+    # Only the current page is turned into a DataFrame
+    page_indices = indices[(page - 1) * page_size:page * page_size]
+    page_df = create_candidate_page_df(store, page_indices, criteria_names)
+    if marked is not None:
+        page_df['Фінальне'] = np.where(page_indices == marked, '✓', '')
+    st.dataframe(page_df, use_container_width=True, hide_index=True)
+
 def run_ideal_point_analysis(projects, budget, show_normalization, show_knapsack, 
-                            show_combinations, num_top_combinations):
+                            show_combinations, num_top_combinations,
+                            show_budget_sweep=False, budget_sweep_percent=20,
+                            show_metric_comparison=False, profit_weight=0.5,
+                            show_nearest_search=False, criteria_names=("Прибуток", "Експертна оцінка"),
+                            precision=None, show_disk_store=False, stages=None, show_robustness=False,
+                            num_best_portfolios=1, capacities=None, rules=None):
     """Run the ideal point method analysis"""
     
+    # Steps that only know the budget constraint are skipped for resources and selection rules
+    budget_only = capacities is None and rules is None
+    
     st.header("Метод ідеальної точки")
     
     # Крок 1: Нормалізація даних
-    norm_profits, norm_expert, norm_data = normalize_data(projects)
+    with record_stage(stages, "Нормалізація", len(projects)):
+        norm_profits, norm_expert, norm_data = normalize_data(projects)
     
     if show_normalization:
         with st.expander("Крок 1: Нормалізація даних", expanded=True):
@@ -782,13 +1034,37 @@ def run_ideal_point_analysis(projects, budget, show_normalization, show_knapsack
         з урахуванням бюджетних обмежень. Ці значення представляють ідеальні (але зазвичай недосяжні) точки.
         """)
         
-        # Розв'язати задачу про рюкзак для прибутку
-        profit_solution, max_profit, profit_dp, profit_path = solve_knapsack(
-            projects, budget, 1)
+        plan = plan_precision(projects.cost, budget, precision)
+        if not budget_only:
+            # Кілька обмежень або правила вибору - розріджений метод з відсіканням під час пошуку
+            st.markdown("Крім бюджету, враховуються обмеження ресурсів або правила вибору проєктів, "
+                        "тому використовується розріджений метод без таблиці ДП.")
+            with record_stage(stages, "Кілька обмежень: прибуток", len(projects)):
+                profit_solution, max_profit, profit_dp, profit_path = solve_criterion_knapsack(
+                    projects, budget, 1, precision, capacities, rules)
+            with record_stage(stages, "Кілька обмежень: експертна оцінка", len(projects)):
+                expert_solution, max_expert, expert_dp, expert_path = solve_criterion_knapsack(
+                    projects, budget, 2, precision, capacities, rules)
+        elif plan['engine'] == 'dense':
+            # Розв'язати задачу про рюкзак для прибутку
+            with record_stage(stages, "ДП: прибуток", plan['cells']):
+                profit_solution, max_profit, profit_dp, profit_path = solve_criterion_knapsack(
+                    projects, budget, 1, precision)
+            
+            # Розв'язати задачу про рюкзак для експертної оцінки
+            with record_stage(stages, "ДП: експертна оцінка", plan['cells']):
+                expert_solution, max_expert, expert_dp, expert_path = solve_criterion_knapsack(
+                    projects, budget, 2, precision)
+        else:
+            # Таблиця ДП завелика - розріджений метод без таблиці
+            with record_stage(stages, "Розріджений метод: прибуток", len(projects)):
+                profit_solution, max_profit = solve_knapsack_sparse(projects, budget, 1)
+            with record_stage(stages, "Розріджений метод: експертна оцінка", len(projects)):
+                expert_solution, max_expert = solve_knapsack_sparse(projects, budget, 2)
+            profit_dp = expert_dp = None
         
-        # Розв'язати задачу про рюкзак для експертної оцінки
-        expert_solution, max_expert, expert_dp, expert_path = solve_knapsack(
-            projects, budget, 2)
+        if show_knapsack and profit_dp is not None and plan['scale'] != 1:
+            st.markdown(f"Стовпці таблиць ДП задано в одиницях вартості {1 / plan['scale']:g}.")
         
         # Знайти нормалізовані значення
         ideal_profit = sum([norm_profits[i] for i, x in enumerate(profit_solution) if x == 1])
@@ -803,11 +1079,13 @@ def run_ideal_point_analysis(projects, budget, show_normalization, show_knapsack
             st.markdown(f"Максимальний прибуток: {max_profit}")
             st.markdown(f"Нормалізоване значення: {ideal_profit:.4f}")
             
-            if show_knapsack:
+            if num_best_portfolios > 1 and budget_only:
+                show_k_best_portfolios(projects, budget, 1, "Прибуток", num_best_portfolios, precision, stages)
+            
+            if show_knapsack and profit_dp is not None:
                 st.markdown("#### Рішення методу динамічного програмування для прибутку")
                 st.markdown("**Таблиця динамічного програмування:**")
-                dp_df = create_dp_table_df(profit_dp, budget, "Прибуток")
-                st.dataframe(dp_df, hide_index=True)
+                show_dp_table(profit_dp, plan['budget'], "Прибуток", profit_path, key="profit_dp")
         
         with cols[1]:
             st.markdown("**Максимізація експертної оцінки:**")
@@ -816,11 +1094,14 @@ def run_ideal_point_analysis(projects, budget, show_normalization, show_knapsack
             st.markdown(f"Максимальна експертна оцінка: {max_expert}")
             st.markdown(f"Нормалізоване значення: {ideal_expert:.4f}")
             
-            if show_knapsack:
+            if num_best_portfolios > 1 and budget_only:
+                show_k_best_portfolios(projects, budget, 2, "Експертна оцінка", num_best_portfolios,
+                                       precision, stages)
+            
+            if show_knapsack and expert_dp is not None:
                 st.markdown("#### Рішення методу динамічного програмування для експертної оцінки")
                 st.markdown("**Таблиця динамічного програмування:**")
-                dp_df = create_dp_table_df(expert_dp, budget, "Експертна оцінка")
-                st.dataframe(dp_df, hide_index=True)
+                show_dp_table(expert_dp, plan['budget'], "Експертна оцінка", expert_path, key="expert_dp")
         
         st.markdown("**Ідеальна точка:**")
         st.markdown(f"(Прибуток, Експертна оцінка) = ({max_profit}, {max_expert})")
@@ -842,11 +1123,19 @@ def run_ideal_point_analysis(projects, budget, show_normalization, show_knapsack
         - $r_j^+$ - ідеальне значення для критерію $j$
         """)
         
-        combinations = generate_combinations(projects, budget)
+        with record_stage(stages, "Перебір комбінацій") as stage:
+            combinations = feasible_combinations(projects, budget, capacities, rules)
+            stage['items'] = len(combinations)
+        
+        classes, _, _ = group_identical_projects(projects)
+        if len(classes) < len(projects):
+            st.info(f"Однакові проєкти об'єднано в {len(classes)} класів. "
+                    "Комбінації, що відрізняються лише вибором серед однакових проєктів, показано один раз.")
         
-        # Розрахунок відстаней
-        distances = calculate_distances(
-            combinations, norm_profits, norm_expert, ideal_profit, ideal_expert)
+        with record_stage(stages, "Ранжування за відстанню", len(combinations)):
+            # Відстані та сховище кандидатів кешуються, тому зміна ваг чи ідеальної точки їх не перераховує
+            distances, store = rank_feasible_combinations(projects, budget, (ideal_profit, ideal_expert),
+                                                          capacities, rules)
         
         # Показати результати
         best_combo, best_cost, best_profit, best_expert, best_norm_profit, best_norm_expert, best_distance = distances[0]
@@ -865,72 +1154,58 @@ def run_ideal_point_analysis(projects, budget, show_normalization, show_knapsack
         # Показати всі комбінації
         st.markdown("**Візуалізація рішень:**")
         
-        # Створити дані для візуалізації
-        plot_data = []
-        for combo, cost, profit, expert, norm_profit, norm_expert, distance in distances:
-            combo_str = ", ".join([f"x{j+1}" for j, x in enumerate(combo) if x == 1]) or "Жодного"
-            is_best = (combo == best_combo)
-            is_ideal_profit = (norm_profit == ideal_profit)
-            is_ideal_expert = (norm_expert == ideal_expert)
-            
-            point_type = "Звичайна точка"
-            if is_best:
-                point_type = "Найкраще рішення"
-            elif is_ideal_profit and is_ideal_expert:
-                point_type = "Ідеальна точка"
-            elif is_ideal_profit:
-                point_type = "Ідеальний прибуток"
-            elif is_ideal_expert:
-                point_type = "Ідеальна експертна оцінка"
-            
-            plot_data.append({
-                "Комбінація": combo_str,
-                "Нормалізований прибуток": norm_profit,
-                "Нормалізована експертна оцінка": norm_expert,
-                "Прибуток": profit,
-                "Експертна оцінка": expert,
-                "Відстань": distance,
-                "Тип": point_type
-            })
-        
-        plot_df = pd.DataFrame(plot_data)
-        
-        # Створити графік з Plotly
-        fig = px.scatter(
-            plot_df, 
-            x="Нормалізований прибуток", 
-            y="Нормалізована експертна оцінка",
-            color="Тип",
-            symbol="Тип",
-            hover_name="Комбінація",
-            hover_data=["Прибуток", "Експертна оцінка", "Відстань"],
-            title="Рішення в просторі нормалізованих критеріїв",
-            color_discrete_map={
-                "Найкраще рішення": "#FF5733",
-                "Ідеальний прибуток": "#33A8FF",
-                "Ідеальна експертна оцінка": "#33FF57",
-                "Ідеальна точка": "#9E33FF",
-                "Звичайна точка": "#BEBEBE"
-            },
-            symbol_map={
-                "Найкраще рішення": "star",
-                "Ідеальний прибуток": "diamond",
-                "Ідеальна експертна оцінка": "diamond",
-                "Ідеальна точка": "circle",
-                "Звичайна точка": "circle"
-            },
-            size_max=15
-        )
+        with record_stage(stages, "Побудова графіка", len(distances)):
+            # Створити дані для візуалізації
+            norm_points = np.array([[d[4], d[5]] for d in distances], dtype=float)
+            is_ideal_profit = norm_points[:, 0] == ideal_profit
+            is_ideal_expert = norm_points[:, 1] == ideal_expert
         
-        # Add ideal point (if not already in the solutions)
-        fig.add_scatter(
-            x=[ideal_profit], 
-            y=[ideal_expert],
-            mode="markers",
-            marker=dict(color="purple", size=15, symbol="x"),
-            name="Ідеальна точка",
-            hoverinfo="name"
-        )
+            point_types = np.full(len(distances), "Звичайна точка", dtype=object)
+            point_types[is_ideal_expert] = "Ідеальна експертна оцінка"
+            point_types[is_ideal_profit] = "Ідеальний прибуток"
+            point_types[is_ideal_profit & is_ideal_expert] = "Ідеальна точка"
+            point_types[0] = "Найкраще рішення"
+        
+            # Створити графік з Plotly
+            fig = plot_solutions(
+                norm_points[:, 0],
+                norm_points[:, 1],
+                point_types,
+                label=lambda i: ", ".join([f"x{j+1}" for j, x in enumerate(distances[i][0]) if x == 1]) or "Жодного",
+                hover_data={
+                    "Прибуток": lambda i: distances[i][2],
+                    "Експертна оцінка": lambda i: distances[i][3],
+                    "Відстань": lambda i: distances[i][6]
+                },
+                x_title="Нормалізований прибуток",
+                y_title="Нормалізована експертна оцінка",
+                title="Рішення в просторі нормалізованих критеріїв",
+                colors={
+                    "Найкраще рішення": "#FF5733",
+                    "Ідеальний прибуток": "#33A8FF",
+                    "Ідеальна експертна оцінка": "#33FF57",
+                    "Ідеальна точка": "#9E33FF",
+                    "Звичайна точка": "#BEBEBE"
+                },
+                symbols={
+                    "Найкраще рішення": "star",
+                    "Ідеальний прибуток": "diamond",
+                    "Ідеальна експертна оцінка": "diamond",
+                    "Ідеальна точка": "circle",
+                    "Звичайна точка": "circle"
+                },
+                background="Звичайна точка"
+            )
+        
+            # Add ideal point (if not already in the solutions)
+            fig.add_scatter(
+                x=[ideal_profit], 
+                y=[ideal_expert],
+                mode="markers",
+                marker=dict(color="purple", size=15, symbol="x"),
+                name="Ідеальна точка",
+                hoverinfo="name"
+            )
         
         # Customize layout to make the plot square
         fig.update_layout(
@@ -946,22 +1221,67 @@ def run_ideal_point_analysis(projects, budget, show_normalization, show_knapsack
             )
         )
         
-        st.plotly_chart(fig, use_container_width=False)
+        with record_stage(stages, "Відображення графіка", len(distances)):
+            st.plotly_chart(fig, use_container_width=False)
         
         # Show all combinations if requested
         if show_combinations:
-            st.markdown(f"**Топ {min(num_top_combinations, len(distances))} рішень:**")
-            combinations_df = create_combinations_df(distances[:num_top_combinations])
-            st.dataframe(combinations_df, use_container_width=True)
+            st.markdown("**Усі рішення:**")
+            with record_stage(stages, "Таблиця результатів", num_top_combinations):
+                show_candidate_grid(store, ["Прибуток", "Експертна оцінка"], key="ideal_results",
+                                    page_size=num_top_combinations)
             
-            # Option to download full results
-            csv = combinations_df.to_csv(index=False)
-            st.download_button(
-                label="Завантажити результати як CSV",
-                data=csv,
-                file_name="project_selection_results.csv",
-                mime="text/csv",
-            )
+            # Option to download the full ranked results
+            show_export(lambda: iter_candidate_frames(store), "project_selection_results",
+                        key="ideal_results_export")
+        
+        # Порівняти рекомендовані портфелі за різними метриками
+        if show_metric_comparison:
+            st.markdown("**Порівняння метрик відстані:**")
+            weights = (profit_weight, 1 - profit_weight)
+            metrics = DEFAULT_METRICS + [
+                {'name': f"{metric['name']} зважена", 'p': metric['p'], 'weights': weights}
+                for metric in DEFAULT_METRICS
+            ]
+            
+            distance_matrix = calculate_distance_matrix(store, (ideal_profit, ideal_expert), metrics)
+            metrics_df = create_metric_comparison_df(store, distance_matrix, metrics)
+            metrics_df['Збігається з L2'] = np.where(metrics_df['Комбінація'] == selected, '✓', '')
+            st.dataframe(metrics_df, use_container_width=True, hide_index=True)
+        
+        # Повний перелік комбінацій у файлах на диску
+        if show_disk_store and budget_only:
+            st.markdown("**Повний перелік комбінацій (на диску):**")
+            disk_store = build_disk_store(projects, budget, np.column_stack([norm_profits, norm_expert]),
+                                          (ideal_profit, ideal_expert))
+            show_candidate_grid(disk_store, ["Прибуток", "Експертна оцінка"], key="disk_results",
+                                page_size=num_top_combinations)
+            show_export(lambda: iter_candidate_frames(disk_store), "all_combinations", key="disk_export")
+        
+        # Пошук найближчих рішень відносно зміненої ідеальної точки
+        if show_nearest_search:
+            show_nearest_search_results(projects, budget, store, ideal_profit, ideal_expert,
+                                        profit_weight, num_top_combinations, capacities, rules)
+    
+    # Ранжування за всіма критеріями, якщо їх більше двох
+    if len(criteria_names) > 2:
+        with st.expander("Крок 3б: Ранжування за всіма критеріями", expanded=True):
+            show_all_criteria_ranking(projects, budget, combinations, criteria_names, num_top_combinations, precision,
+                                      capacities, rules)
+    
+    # Крок 4: Чутливість до бюджету
+    if not budget_only and (show_budget_sweep or show_robustness or show_disk_store):
+        st.info("Чутливість до бюджету, стійкість рекомендації та перелік на диску враховують лише бюджет, "
+                "тому для обмежених ресурсів і правил вибору проєктів не показуються.")
+    
+    if show_budget_sweep and budget_only:
+        with st.expander("Крок 4: Чутливість до бюджету", expanded=True):
+            show_budget_sweep_analysis(projects, budget, budget_sweep_percent, precision)
+    
+    # Крок 5: Стійкість рекомендації до похибок оцінок
+    if show_robustness and budget_only:
+        with st.expander("Крок 5: Стійкість рекомендації", expanded=True):
+            show_robustness_analysis(projects, budget, stages)
             
     st.session_state.ideal_point_solution = {
         'selected': selected,
@@ -971,5 +1291,300 @@ def run_ideal_point_analysis(projects, budget, show_normalization, show_knapsack
         'distance': best_distance
     }
 
+def show_all_criteria_ranking(projects, budget, combinations, criteria_names, num_top_combinations, precision=None,
+                              capacities=None, rules=None):
+    """Rank the combinations by the distance to the ideal point over all selected criteria"""
+    
+    st.markdown(f"""
+    Нормалізація, пошук ідеальної точки методом динамічного програмування та обчислення відстаней
+    виконуються над матрицею критеріїв ({len(criteria_names)} стовпців) одночасно для всіх критеріїв.
+    """)
+    
+    criterion_indices = list(range(1, len(criteria_names) + 1))
+    _, values = criteria_matrix(projects, criterion_indices)
+    norm_values, _ = normalize_matrix(values)
+    ideal, max_values, _, _ = calculate_ideal_point(projects, budget, criterion_indices, precision, capacities, rules)
+    
+    ideal_df = pd.DataFrame({
+        'Критерій': criteria_names,
+        'Максимум': max_values,
+        'Нормалізоване значення': np.round(ideal, 4)
+    })
+    st.dataframe(ideal_df, use_container_width=True, hide_index=True)
+    
+    store = build_candidate_store(combinations, values, norm_values)
+    metrics = [{'name': 'L2', 'p': 2, 'weights': None}]
+    distance_matrix = calculate_distance_matrix(store, ideal, metrics)
+    
+    top = np.argsort(distance_matrix[:, 0], kind='stable')[:num_top_combinations]
+    rows = []
+    for rank, i in enumerate(top, start=1):
+        row = {
+            'Ранг': rank,
+            'Комбінація': ', '.join(f'x{j+1}' for j in np.flatnonzero(store['masks'][i])) or "Жодного",
+            'Вартість': store['cost'][i]
+        }
+        row.update(zip(criteria_names, store['values'][i]))
+        row['Відстань'] = round(distance_matrix[i, 0], 4)
+        rows.append(row)
+    
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+def show_export(frames, file_name, key):
+    """Stream a full table to a temporary gzip CSV or Parquet file and offer it for download"""
+    file_format = st.radio("Формат експорту", list(EXPORT_FORMATS), horizontal=True, key=f"{key}_format")
+    st.caption(f"Файл для завантаження не може перевищувати {MAX_DOWNLOAD_BYTES // 2**20} МБ; "
+               "для більших результатів використовуйте пакетний режим (batch.py).")
+    
+    if st.button("Підготувати файл для завантаження", key=f"{key}_prepare"):
+        try:
+            path, total = export_to_tempfile(frames(), file_format)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        
+        # The download button keeps the whole file in memory, so the temporary file is removed right after reading
+        try:
+            size = os.path.getsize(path)
+            if size > MAX_DOWNLOAD_BYTES:
+                st.error(f"Файл експорту займає {size / 2**20:.0f} МБ, що більше за "
+                         f"{MAX_DOWNLOAD_BYTES // 2**20} МБ. Використовуйте пакетний режим (batch.py).")
+                return
+            with open(path, "rb") as file:
+                data = file.read()
+        finally:
+            os.remove(path)
+        
+        st.download_button(
+            label=f"Завантажити ({total} рядків)",
+            data=data,
+            file_name=file_name + EXPORT_FORMATS[file_format]['suffix'],
+            mime=EXPORT_FORMATS[file_format]['mime'],
+            key=f"{key}_download"
+        )
+
+def show_dp_table(dp, budget, criterion_name, solution_path, key, max_cells=5000, page_columns=50):
+    """Show a DP table, or a window of it with a downsampled heatmap when the table is large"""
+    import plotly.express as px
+    if dp.size <= max_cells:
+        st.dataframe(create_dp_table_df(dp, budget, criterion_name), hide_index=True)
+        show_export(lambda: iter_dp_frames(dp, budget, criterion_name), f"dp_table_{key}", key=f"{key}_export")
+        return
+    
+    st.markdown(f"Таблиця має {dp.shape[0]} × {dp.shape[1]} комірок, тому показано лише її вікно.")
+    
+    # Heatmap of the whole table with block maxima
+    reduced, row_starts, column_starts = downsample_dp(dp)
+    fig = px.imshow(reduced, x=column_starts, y=row_starts, aspect="auto",
+                    labels={"x": "Бюджет", "y": "i", "color": criterion_name},
+                    title=f"Таблиця ДП ({criterion_name}), зменшена")
+    path_rows, path_columns = zip(*solution_path) if solution_path else ((), ())
+    fig.add_scatter(x=path_columns, y=path_rows, mode="markers", marker=dict(color="red", size=6),
+                    name="Шлях рішення")
+    st.plotly_chart(fig, use_container_width=True)
+    
+    window = st.radio("Вікно таблиці", ["Навколо шляху рішення", "Діапазон стовпців"],
+                      horizontal=True, key=f"{key}_window")
+    if window == "Навколо шляху рішення":
+        columns = dp_path_window(solution_path, budget)
+    else:
+        pages = budget // page_columns + 1
+        page = st.number_input("Сторінка стовпців", min_value=1, max_value=pages, value=pages,
+                               key=f"{key}_page")
+        columns = np.arange((page - 1) * page_columns, min(page * page_columns, budget + 1))
+    
+    # Page through the rows the same way when there are many projects
+    row_pages = (len(dp) - 1) // page_columns + 1
+    row_page = 1
+    if row_pages > 1:
+        row_page = st.number_input("Сторінка рядків", min_value=1, max_value=row_pages, value=row_pages,
+                                   key=f"{key}_row_page")
+    rows = np.arange((row_page - 1) * page_columns, min(row_page * page_columns, len(dp)))
+    
+    st.dataframe(create_dp_table_df(dp, budget, criterion_name, rows, columns), hide_index=True)
+    show_export(lambda: iter_dp_frames(dp, budget, criterion_name), f"dp_table_{key}", key=f"{key}_export")
+
+@st.cache_data(show_spinner=False)
+def solve_criterion_knapsack(projects, budget, criterion_index, precision=None, capacities=None, rules=None):
+    """Solve (and cache by project data) the knapsack problem for one criterion"""
+    return solve_knapsack(projects, budget, criterion_index, precision, capacities, rules)
+
+@st.cache_data(show_spinner=False)
+def solve_criterion_k_best(projects, budget, criterion_index, k, precision=None):
+    """Find (and cache by project data) the k best knapsack portfolios for one criterion"""
+    return solve_knapsack_k_best(projects, budget, criterion_index, k, precision)
+
+def show_k_best_portfolios(projects, budget, criterion_index, criterion_name, k, precision=None, stages=None):
+    """Show the best portfolio for one criterion together with its runner-ups"""
+    with record_stage(stages, f"{k} найкращих: {criterion_name.lower()}", len(projects)):
+        solutions, values = solve_criterion_k_best(projects, budget, criterion_index, k, precision)
+    
+    st.markdown(f"**{len(solutions)} найкращих портфелів:**")
+    st.dataframe(create_k_best_df(projects, solutions, values, criterion_name),
+                 use_container_width=True, hide_index=True)
+
+@st.cache_data(show_spinner=False)
+def feasible_combinations(projects, budget, capacities=None, rules=None):
+    """Enumerate (and cache by project data) all combinations allowed by the budget, capacities and rules"""
+    return generate_combinations(projects, budget, capacities, rules)
+
+@st.cache_data(show_spinner=False)
+def run_robustness_study(projects, budget, samples, noise, seed):
+    """Run (and cache by project data and noise settings) the Monte Carlo robustness analysis"""
+    return robustness_analysis(projects, budget, samples, noise, seed)
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def build_disk_store(projects, budget, norm_values, ideal):
+    """Enumerate all combinations into (and cache) a memory-mapped store in a temporary directory"""
+    # The store owns its directory: once the cache evicts the store, the files are removed with it
+    directory = tempfile.TemporaryDirectory(prefix="candidate_store_", ignore_cleanup_errors=True)
+    store = build_memmap_store(projects, budget, directory.name, norm_values=norm_values)
+    store['temporary_directory'] = directory
+    return compute_store_distances(store, ideal)
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def rank_feasible_combinations(projects, budget, ideal, capacities=None, rules=None):
+    """Rank (and cache by project data, budget, ideal point and constraints) the feasible combinations by distance"""
+    combinations = feasible_combinations(projects, budget, capacities, rules)
+    norm_profits, norm_expert, _ = normalize_data(projects)
+    distances = calculate_distances(combinations, norm_profits, norm_expert, *ideal)
+    
+    # Columnar candidate store for the results grid and the metric comparison
+    store = build_candidate_store(combinations, criteria_matrix(projects, [1, 2])[1],
+                                  np.column_stack([norm_profits, norm_expert]))
+    return distances, rank_candidates(store, ideal)
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def build_candidate_index(projects, budget, capacities=None, rules=None, _store=None):
+    """Build (and cache by project data, budget and constraints) the k-d tree over the Pareto-optimal candidates"""
+    # The normalized points depend only on the feasible set, so the store itself is not hashed
+    front = pareto_front(_store['norm'])
+    return build_kd_tree(_store['norm'][front]), front
+
+def show_nearest_search_results(projects, budget, store, ideal_profit, ideal_expert, profit_weight,
+                                num_top_combinations, capacities=None, rules=None):
+    """Query the Pareto-front index for the solutions nearest to a user-adjusted ideal point"""
+    
+    st.markdown("**Пошук відносно зміненої ідеальної точки:**")
+    st.markdown("""
+    Нормалізовані точки Парето-оптимальних комбінацій зберігаються в k-d дереві, тому зміна ідеальної
+    точки або ваг критеріїв не потребує перерахунку відстаней для всіх комбінацій. Для ідеальної точки,
+    не гіршої за всі комбінації, найближча комбінація за будь-якими вагами завжди Парето-оптимальна.
+    """)
+    
+    tree, front = build_candidate_index(projects, budget, capacities, rules, _store=store)
+    
+    cols = st.columns(2)
+    with cols[0]:
+        query_profit = st.number_input("Ідеальний нормалізований прибуток", 
+                                       min_value=0.0, value=float(ideal_profit), 
+                                       step=0.01, format="%.4f")
+    with cols[1]:
+        query_expert = st.number_input("Ідеальна нормалізована експертна оцінка", 
+                                       min_value=0.0, value=float(ideal_expert), 
+                                       step=0.01, format="%.4f")
+    
+    weights = (profit_weight, 1 - profit_weight)
+    query_distances, front_ids = query_nearest(tree, (query_profit, query_expert),
+                                               k=num_top_combinations, weights=weights)
+    indices = front[front_ids]
+    
+    nearest = [
+        (store['masks'][i].astype(int).tolist(), store['cost'][i], store['values'][i, 0], store['values'][i, 1],
+         store['norm'][i, 0], store['norm'][i, 1], distance)
+        for i, distance in zip(indices, query_distances)
+    ]
+    st.dataframe(create_combinations_df(nearest), use_container_width=True, hide_index=True)
+
+def show_budget_sweep_analysis(projects, budget, budget_sweep_percent, precision=None):
+    """Show how the optimum and the ideal point choice change across a budget range"""
+    import plotly.graph_objects as go
+    
+    st.markdown(f"""
+    Оптимальні значення критеріїв і найкраще рішення для бюджетів у межах ±{budget_sweep_percent}% від заданого.
+    Таблиці динамічного програмування та комбінації обчислюються один раз для найбільшого бюджету,
+    а результати для менших бюджетів зчитуються з них без повторного розв'язання.
+    """)
+    
+    delta = budget * budget_sweep_percent / 100
+    min_budget = max(1, int(np.floor(budget - delta)))
+    max_budget = int(np.ceil(budget + delta))
+    
+    budgets = sorted(set(range(min_budget, max_budget + 1)) | {budget})
+    try:
+        sweep = budget_sweep(projects, budgets, precision)
+    except ValueError as e:
+        st.warning(str(e))
+        return
+    sweep_df = create_budget_sweep_df(sweep)
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=sweep_df["Бюджет"], y=sweep_df["Макс. прибуток"],
+                             mode="lines", line=dict(color="#33A8FF", dash="dash"),
+                             name="Макс. прибуток"))
+    fig.add_trace(go.Scatter(x=sweep_df["Бюджет"], y=sweep_df["Макс. експертна оцінка"],
+                             mode="lines", line=dict(color="#33FF57", dash="dash"),
+                             name="Макс. експертна оцінка"))
+    fig.add_trace(go.Scatter(x=sweep_df["Бюджет"], y=sweep_df["Прибуток"],
+                             mode="lines+markers", line=dict(color="#33A8FF"),
+                             name="Прибуток найкращого рішення",
+                             hovertext=sweep_df["Найкраща комбінація"]))
+    fig.add_trace(go.Scatter(x=sweep_df["Бюджет"], y=sweep_df["Експертна оцінка"],
+                             mode="lines+markers", line=dict(color="#33FF57"),
+                             name="Експертна оцінка найкращого рішення",
+                             hovertext=sweep_df["Найкраща комбінація"]))
+    fig.add_vline(x=budget, line_dash="dot", line_color="#FF5733")
+    
+    fig.update_layout(
+        title="Залежність рішення від бюджету",
+        xaxis_title="Бюджет",
+        yaxis_title="Значення критерію",
+        height=500
+    )
+    
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(sweep_df, use_container_width=True, hide_index=True)
+
+# Noise models offered in the robustness analysis
+NOISE_MODEL_LABELS = {"Нормальна": "normal", "Рівномірна": "uniform", "Логнормальна": "lognormal"}
+
+def show_robustness_analysis(projects, budget, stages=None):
+    """Show how often the recommended portfolio stays the best when the criteria estimates are perturbed"""
+    st.markdown("""
+    Прибуток і експертна оцінка кожного проєкту випадково змінюються в межах заданої відносної похибки,
+    і для кожної вибірки заново знаходиться ідеальна точка та найближча до неї комбінація.
+    Множина допустимих комбінацій від оцінок не залежить, тому перераховуються лише нормалізовані суми.
+    """)
+    
+    cols = st.columns(2)
+    with cols[0]:
+        model = st.selectbox("Модель похибки", list(NOISE_MODEL_LABELS), key="robustness_model")
+        samples = st.number_input("Кількість вибірок", min_value=100, max_value=100_000, value=2000,
+                                  step=100, key="robustness_samples")
+        seed = st.number_input("Зерно генератора", min_value=0, value=0, key="robustness_seed")
+    with cols[1]:
+        profit_scale = st.slider("Похибка прибутку (%)", min_value=0, max_value=50, value=10,
+                                 key="robustness_profit_scale")
+        expert_scale = st.slider("Похибка експертної оцінки (%)", min_value=0, max_value=50, value=10,
+                                 key="robustness_expert_scale")
+    
+    noise = [{'model': NOISE_MODEL_LABELS[model], 'scale': profit_scale / 100},
+             {'model': NOISE_MODEL_LABELS[model], 'scale': expert_scale / 100}]
+    
+    with st.spinner("Моделювання похибок..."), record_stage(stages, "Стійкість: Монте-Карло", samples):
+        result = run_robustness_study(projects, budget, int(samples), noise, int(seed))
+    
+    st.markdown(f"Номінальна рекомендація залишається найкращою у "
+                f"**{result['nominal_frequency']:.1%}** вибірок "
+                f"(перевірено {result['candidates']} максимальних комбінацій з {len(result['masks'])}).")
+    
+    cols = st.columns(2)
+    with cols[0]:
+        st.markdown("**Частота виграшу комбінацій:**")
+        st.dataframe(create_robustness_df(result), use_container_width=True, hide_index=True)
+    with cols[1]:
+        st.markdown("**Частота вибору проєктів:**")
+        st.dataframe(create_project_frequency_df(result), use_container_width=True, hide_index=True)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
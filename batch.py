@@ -0,0 +1,185 @@
+"""Headless batch analysis of scenario files (no Streamlit or plotly imports)"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from utils.ingest import FILE_FORMATS, read_projects
+from utils.normalize import normalize_data
+from utils.knapsack import solve_knapsack, solve_knapsack_sparse
+from utils.scaling import plan_precision
+from utils.combinations import generate_combinations, calculate_distances
+from utils.sequential_concessions import initialize_sequential_concessions, make_next_concession
+from utils.meet_in_middle import mitm_ideal_point, mitm_sequential_concessions
+from utils.tables import create_combinations_df, get_history_df
+from utils.export import write_frames
+
+# Output formats of the result tables
+OUTPUT_FORMATS = {'csv': '.csv', 'csv.gz': '.csv.gz', 'parquet': '.parquet'}
+
+# Larger scenarios are solved exactly by meet in the middle instead of enumerating every combination
+MAX_ENUMERATED_PROJECTS = 20
+
+def find_scenarios(directory):
+    """List the scenario files of a directory in name order"""
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if os.path.splitext(name)[1].lower() in FILE_FORMATS
+    )
+
+def analyze_scenario(path, budget, primary_criterion_index=1, concessions=(), top=10, precision=None):
+    """Run normalization, both knapsack optima, the ideal point ranking and a concessions schedule for one file"""
+    scenario = os.path.basename(path)
+    projects, errors = read_projects(path)
+
+    if len(projects) > MAX_ENUMERATED_PROJECTS:
+        return _analyze_large_scenario(scenario, projects, errors, budget, primary_criterion_index, concessions)
+
+    # Ideal point method
+    norm_profits, norm_expert, _ = normalize_data(projects)
+    plan = plan_precision(projects.cost, budget, precision)
+    if plan['engine'] == 'dense':
+        profit_solution, max_profit, _, _ = solve_knapsack(projects, budget, 1, precision)
+        expert_solution, max_expert, _, _ = solve_knapsack(projects, budget, 2, precision)
+    else:
+        profit_solution, max_profit = solve_knapsack_sparse(projects, budget, 1)
+        expert_solution, max_expert = solve_knapsack_sparse(projects, budget, 2)
+
+    ideal_profit = sum(norm_profits[i] for i, x in enumerate(profit_solution) if x == 1)
+    ideal_expert = sum(norm_expert[i] for i, x in enumerate(expert_solution) if x == 1)
+
+    distances = calculate_distances(generate_combinations(projects, budget),
+                                    norm_profits, norm_expert, ideal_profit, ideal_expert)
+    ranking = create_combinations_df(distances[:top])
+    ranking.insert(0, 'Сценарій', scenario)
+
+    # Sequential concessions with a fixed schedule of concession amounts
+    secondary_criterion_index = 2 if primary_criterion_index == 1 else 1
+    state = initialize_sequential_concessions(projects, budget, primary_criterion_index,
+                                              secondary_criterion_index, precision)
+    for amount in concessions:
+        state = make_next_concession(state, amount)
+    history = get_history_df(state)
+    history.insert(0, 'Сценарій', scenario)
+
+    best_combo, best_cost, best_profit, best_expert, _, _, best_distance = distances[0]
+    summary = {
+        'Сценарій': scenario,
+        'Проєктів': len(projects),
+        'Пропущено рядків': len({error['Рядок'] for error in errors}),
+        'Бюджет': budget,
+        'Макс. прибуток': max_profit,
+        'Макс. експертна оцінка': max_expert,
+        'Найкраща комбінація': ranking['Комбінація'].iloc[0],
+        'Вартість': best_cost,
+        'Прибуток': best_profit,
+        'Експертна оцінка': best_expert,
+        'Відстань': round(best_distance, 4),
+        'Поступки: комбінація': history['Вибрані проєкти'].iloc[-1],
+        'Поступки: основний критерій': state['current_primary_value'],
+        'Поступки: другорядний критерій': state['current_secondary_value'],
+        'Поступки: вартість': state['current_cost']
+    }
+
+    return summary, ranking, history
+
+def _analyze_large_scenario(scenario, projects, errors, budget, primary_criterion_index, concessions):
+    """Meet-in-the-middle variant of analyze_scenario: the ranking holds only the nearest combination"""
+    best = mitm_ideal_point(projects, budget)
+    distances = [(best['solution'], best['cost'], *best['values'], *best['norm'], best['distance'])]
+    ranking = create_combinations_df(distances)
+    ranking.insert(0, 'Сценарій', scenario)
+
+    state = mitm_sequential_concessions(projects, budget, primary_criterion_index, concessions)
+    history = get_history_df(state)
+    history.insert(0, 'Сценарій', scenario)
+
+    summary = {
+        'Сценарій': scenario,
+        'Проєктів': len(projects),
+        'Пропущено рядків': len({error['Рядок'] for error in errors}),
+        'Бюджет': budget,
+        'Макс. прибуток': best['max_values'][0].item(),
+        'Макс. експертна оцінка': best['max_values'][1].item(),
+        'Найкраща комбінація': ranking['Комбінація'].iloc[0],
+        'Вартість': best['cost'],
+        'Прибуток': best['values'][0],
+        'Експертна оцінка': best['values'][1],
+        'Відстань': round(best['distance'], 4),
+        'Поступки: комбінація': history['Вибрані проєкти'].iloc[-1],
+        'Поступки: основний критерій': state['current_primary_value'],
+        'Поступки: другорядний критерій': state['current_secondary_value'],
+        'Поступки: вартість': state['current_cost']
+    }
+
+    return summary, ranking, history
+
+def _run_scenario(args):
+    # Worker entry point: report a failed scenario instead of stopping the whole batch
+    path = args[0]
+    try:
+        return analyze_scenario(*args)
+    except Exception as e:
+        return {'Сценарій': os.path.basename(path), 'Помилка': str(e)}, None, None
+
+def run_batch(paths, budget, primary_criterion_index=1, concessions=(), top=10, precision=None, workers=None):
+    """Analyse the scenario files on a process pool and collect the result tables"""
+    tasks = [(path, budget, primary_criterion_index, tuple(concessions), top, precision) for path in paths]
+
+    if workers == 1:
+        results = list(map(_run_scenario, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_scenario, tasks))
+
+    summary = pd.DataFrame([summary for summary, _, _ in results])
+    rankings = [ranking for _, ranking, _ in results if ranking is not None]
+    histories = [history for _, _, history in results if history is not None]
+
+    # If every scenario failed there is nothing to concatenate, but the summary with errors is still written
+    ranking = pd.concat(rankings, ignore_index=True) if rankings else pd.DataFrame()
+    history = pd.concat(histories, ignore_index=True) if histories else pd.DataFrame()
+    return summary, ranking, history
+
+def write_table(df, path, file_format):
+    """Write one result table as CSV, gzip CSV or Parquet"""
+    if file_format == 'csv':
+        df.to_csv(path, index=False)
+    else:
+        write_frames([df], path, file_format)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетний аналіз сценаріїв вибору проєктів без інтерфейсу")
+    parser.add_argument("scenarios", help="Каталог з файлами сценаріїв (CSV, Parquet або Arrow IPC)")
+    parser.add_argument("--budget", type=float, required=True, help="Доступний бюджет")
+    parser.add_argument("--output", default="results", help="Каталог для результатів")
+    parser.add_argument("--format", choices=list(OUTPUT_FORMATS), default="csv", help="Формат результатів")
+    parser.add_argument("--primary", choices=["profit", "expert"], default="profit",
+                        help="Основний критерій послідовних поступок")
+    parser.add_argument("--concessions", type=float, nargs="*", default=[],
+                        help="Розміри поступок для кожної ітерації")
+    parser.add_argument("--top", type=int, default=10, help="Кількість найкращих комбінацій у ранжуванні")
+    parser.add_argument("--precision", type=int, default=None, help="Кількість знаків після коми у вартостях")
+    parser.add_argument("--workers", type=int, default=None, help="Кількість процесів")
+    args = parser.parse_args(argv)
+
+    paths = find_scenarios(args.scenarios)
+    if not paths:
+        parser.error(f"У каталозі {args.scenarios} немає файлів сценаріїв")
+
+    summary, ranking, history = run_batch(paths, args.budget, 1 if args.primary == "profit" else 2,
+                                          args.concessions, args.top, args.precision, args.workers)
+
+    os.makedirs(args.output, exist_ok=True)
+    suffix = OUTPUT_FORMATS[args.format]
+    for name, df in (("summary", summary), ("ranking", ranking), ("concessions", history)):
+        write_table(df, os.path.join(args.output, name + suffix), args.format)
+
+    failed = summary['Помилка'].notna().sum() if 'Помилка' in summary else 0
+    print(f"Проаналізовано сценаріїв: {len(paths) - failed}, з помилками: {failed}. Результати: {args.output}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
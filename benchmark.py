@@ -0,0 +1,216 @@
+"""
+Offline benchmark suite for the solver modules.
+
+Timings depend on the machine and on the library versions the baseline was recorded with
+(both are stored in the baseline file), so a baseline is only comparable with runs on the same
+setup. Re-record benchmark_baseline.json with --save-baseline after changes that are meant to
+change solver timings, and when moving to another machine.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+import tracemalloc
+
+import numpy as np
+
+from utils.instances import FAMILIES, generate_instance
+from utils.normalize import normalize_data
+from utils.knapsack import solve_knapsack
+from utils.combinations import generate_combinations, calculate_distances
+from utils.sequential_concessions import (initialize_sequential_concessions, make_next_concession,
+                                         generate_all_combinations)
+
+# Sizes of the sweep; functions that enumerate all combinations only run up to ENUMERATION_MAX_N
+SIZES = [10, 14, 18, 100, 400]
+BUDGET_RATIOS = [0.25, 0.5]
+ENUMERATION_MAX_N = 18
+
+# Fewer and smaller cases for a quick run
+QUICK_SIZES = [10, 14, 100]
+QUICK_BUDGET_RATIOS = [0.5]
+
+# Modules whose cold import time is tracked (each is imported in a fresh interpreter)
+IMPORT_MODULES = ['utils.knapsack', 'utils.combinations', 'utils.sequential_concessions', 'utils.tables',
+                  'batch', 'app']
+
+# A case is reported as a regression when it is this many times slower than the baseline
+DEFAULT_THRESHOLD = 1.5
+
+def prepare(projects, budget):
+    """Inputs shared by the benchmarked functions, computed outside the timed region"""
+    norm_profits, norm_expert, _ = normalize_data(projects)
+    enumerate_all = len(projects) <= ENUMERATION_MAX_N
+    concessions_state = None
+    if enumerate_all:
+        # The combinations are generated by the first concession; generate them here, outside the timed calls
+        concessions_state = initialize_sequential_concessions(projects, budget)
+        concessions_state['all_combinations'] = generate_all_combinations(projects, budget)
+    return {
+        'norm_profits': norm_profits,
+        'norm_expert': norm_expert,
+        'combinations': generate_combinations(projects, budget) if enumerate_all else None,
+        'concessions_state': concessions_state
+    }
+
+def benchmark_cases(projects, budget, inputs):
+    """Callables to measure for one instance, keyed by function name"""
+    cases = {
+        'normalize_data': lambda: normalize_data(projects),
+        'solve_knapsack': lambda: solve_knapsack(projects, budget, 1),
+        'initialize_sequential_concessions': lambda: initialize_sequential_concessions(projects, budget),
+    }
+
+    if inputs['combinations'] is not None:
+        cases['generate_combinations'] = lambda: generate_combinations(projects, budget)
+        cases['calculate_distances'] = lambda: calculate_distances(
+            inputs['combinations'], inputs['norm_profits'], inputs['norm_expert'], 1.0, 1.0)
+        # Each call gets its own copy of the state, because a concession updates it
+        state = inputs['concessions_state']
+        cases['make_next_concession'] = lambda: make_next_concession(
+            dict(state, history=list(state['history'])), 10)
+
+    return cases
+
+def measure(function, repeats):
+    """Best time per call over repeats and the tracemalloc peak of one separate call"""
+    # Fast functions are called many times per repeat, so the timer resolution does not dominate
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    seconds = min(timer.repeat(repeats, number)) / number
+
+    # Memory is measured separately, because tracing slows the call down
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return seconds, peak
+
+def run_suite(sizes=SIZES, budget_ratios=BUDGET_RATIOS, families=FAMILIES, repeats=3, seed=0):
+    """Run every function on every generated instance and return one record per case"""
+    records = []
+
+    for family in families:
+        for n in sizes:
+            for budget_ratio in budget_ratios:
+                projects, budget = generate_instance(family, n, seed=seed, budget_ratio=budget_ratio)
+                inputs = prepare(projects, budget)
+
+                for name, function in benchmark_cases(projects, budget, inputs).items():
+                    seconds, peak = measure(function, repeats)
+                    records.append({
+                        'function': name,
+                        'family': family,
+                        'n': n,
+                        'budget_ratio': budget_ratio,
+                        'budget': budget,
+                        'seconds': seconds,
+                        'peak_bytes': peak
+                    })
+
+    return records
+
+def measure_import_times(modules=IMPORT_MODULES, repeats=3):
+    """Best cold import time of each module, measured in a fresh interpreter per repeat"""
+    records = []
+    code = ("import sys, time; start = time.perf_counter(); import {module}; "
+            "print(time.perf_counter() - start, ','.join(m for m in ('pandas', 'plotly.express') if m in sys.modules))")
+
+    for module in modules:
+        times = []
+        for _ in range(repeats):
+            output = subprocess.run([sys.executable, "-c", code.format(module=module)], capture_output=True,
+                                    text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+            seconds, _, loaded = output.stdout.strip().splitlines()[-1].partition(' ')
+            times.append(float(seconds))
+        records.append({
+            'function': f'import {module}',
+            'family': 'import',
+            'n': 0,
+            'budget_ratio': 0,
+            'budget': 0,
+            'seconds': min(times),
+            'peak_bytes': 0,
+            'loaded': loaded
+        })
+
+    return records
+
+def compare(records, baseline, threshold=DEFAULT_THRESHOLD):
+    """Compare records with baseline records of the same case; returns the cases slower or larger than the baseline"""
+    def key(record):
+        return record['function'], record['family'], record['n'], record['budget_ratio']
+
+    reference = {key(record): record for record in baseline}
+    regressions = []
+
+    for record in records:
+        base = reference.get(key(record))
+        if base is None:
+            continue
+        record['time_ratio'] = record['seconds'] / base['seconds'] if base['seconds'] > 0 else 1.0
+        record['memory_ratio'] = record['peak_bytes'] / base['peak_bytes'] if base['peak_bytes'] > 0 else 1.0
+        if record['time_ratio'] > threshold or record['memory_ratio'] > threshold:
+            regressions.append(record)
+
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Вимірювання швидкодії та пам'яті модулів розв'язувача")
+    parser.add_argument("--output", help="Файл JSON для результатів (за замовчуванням - стандартний вивід)")
+    parser.add_argument("--baseline", help="Файл JSON з базовими результатами для порівняння")
+    parser.add_argument("--save-baseline", help="Зберегти результати як базові в цей файл")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="У скільки разів повільніше вважається регресією")
+    parser.add_argument("--families", nargs="*", choices=FAMILIES, default=list(FAMILIES))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="Менший набір розмірів задач")
+    parser.add_argument("--skip-imports", action="store_true", help="Не вимірювати час імпорту модулів")
+    args = parser.parse_args(argv)
+
+    sizes, budget_ratios = (QUICK_SIZES, QUICK_BUDGET_RATIOS) if args.quick else (SIZES, BUDGET_RATIOS)
+    records = run_suite(sizes, budget_ratios, args.families, args.repeats, args.seed)
+    if not args.skip_imports:
+        records += measure_import_times(repeats=args.repeats)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if (baseline.get('numpy'), baseline.get('machine')) != (np.__version__, platform.machine()):
+            print(f"Базові результати записано з numpy {baseline.get('numpy')} на {baseline.get('machine')}: "
+                  "порівняння з іншою конфігурацією ненадійне", file=sys.stderr)
+        regressions = compare(records, baseline['records'], args.threshold)
+
+    result = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'records': records
+    }
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    for record in regressions:
+        print(f"Регресія: {record['function']} ({record['family']}, n={record['n']}, "
+              f"бюджет {record['budget_ratio']:g}): час ×{record['time_ratio']:.2f}, "
+              f"пам'ять ×{record['memory_ratio']:.2f}", file=sys.stderr)
+
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""Load-test client for the local solver service: throughput and latency percentiles"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from utils.instances import FAMILIES, generate_instance
+from service import DEFAULT_HOST, DEFAULT_PORT, ENDPOINTS
+
+def build_payloads(endpoint, distinct, n, seed=0):
+    """Distinct request bodies for one endpoint; a small number of them exercises request coalescing"""
+    payloads = []
+    for i in range(distinct):
+        projects, budget = generate_instance(FAMILIES[i % len(FAMILIES)], n, seed=seed + i)
+        body = {'projects': projects.to_rows(), 'budget': budget}
+        if endpoint == '/ideal-point':
+            body['top'] = 5
+        elif endpoint == '/concessions':
+            body['concessions'] = [5, 10]
+        payloads.append(json.dumps(body).encode('utf-8'))
+    return payloads
+
+async def send(reader, writer, host, path, data):
+    """Send one POST request over an open keep-alive connection and read the response"""
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(data)}\r\n\r\n".encode('latin-1') + data
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+async def get_json(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode('latin-1'))
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    return json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+async def run_load(host, port, path, payloads, requests, concurrency):
+    """Send requests over concurrency connections; returns per-request latencies, error count and elapsed time"""
+    latencies = []
+    errors = 0
+    next_request = 0
+
+    async def connection():
+        nonlocal errors, next_request
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while next_request < requests:
+                data = payloads[next_request % len(payloads)]
+                next_request += 1
+                start = time.perf_counter()
+                status, _ = await send(reader, writer, host, path, data)
+                latencies.append(time.perf_counter() - start)
+                errors += status != 200
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(connection() for _ in range(concurrency)))
+    return np.array(latencies), errors, time.perf_counter() - start
+
+def start_server(port, workers):
+    """Start service.py in a subprocess and wait until it answers /health"""
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "service.py"),
+               "--port", str(port)]
+    if workers:
+        command += ["--workers", str(workers)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            asyncio.run(get_json(DEFAULT_HOST, port, "/health"))
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Сервіс не запустився за 30 секунд")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Навантажувальний тест локального сервісу розв'язувача")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--endpoint", choices=[path.lstrip('/') for path in ENDPOINTS], default="knapsack")
+    parser.add_argument("--requests", type=int, default=2000, help="Загальна кількість запитів")
+    parser.add_argument("--concurrency", type=int, default=32, help="Кількість одночасних з'єднань")
+    parser.add_argument("--projects", type=int, default=12, help="Кількість проєктів у портфелі запиту")
+    parser.add_argument("--warmup", type=int, default=100, help="Кількість запитів для прогріву (не враховуються)")
+    parser.add_argument("--distinct", type=int, default=200, help="Кількість різних тіл запитів")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start-server", action="store_true", help="Запустити сервіс у окремому процесі")
+    parser.add_argument("--workers", type=int, default=None, help="Кількість процесів запущеного сервісу")
+    args = parser.parse_args(argv)
+
+    path = '/' + args.endpoint
+    payloads = build_payloads(path, args.distinct, args.projects, args.seed)
+    process = start_server(args.port, args.workers) if args.start_server else None
+
+    try:
+        # Warm-up requests start the worker processes of the service
+        if args.warmup:
+            asyncio.run(run_load(args.host, args.port, path, payloads, args.warmup, args.concurrency))
+        latencies, errors, elapsed = asyncio.run(
+            run_load(args.host, args.port, path, payloads, args.requests, args.concurrency))
+        stats = asyncio.run(get_json(args.host, args.port, "/stats"))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000
+    print(f"Шлях: {path}, запитів: {len(latencies)}, помилок: {errors}, з'єднань: {args.concurrency}")
+    print(f"Пропускна здатність: {len(latencies) / elapsed:.1f} запитів/с за {elapsed:.2f} с")
+    print(f"Затримка, мс: p50 {p50:.2f}, p90 {p90:.2f}, p99 {p99:.2f}, макс. {latencies.max() * 1000:.2f}")
+    print(f"Сервіс: об'єднано однакових запитів {stats.get('coalesced', 0)}, "
+          f"пакетів /knapsack {stats.get('batches', 0)} на {stats.get('batched_requests', 0)} запитів")
+
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,377 @@
+"""Local HTTP/JSON service for the solver modules (asyncio front end, process pool for compute)"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import signal
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+
+import numpy as np
+
+from utils.portfolio import Portfolio
+from utils.normalize import normalize_data
+from utils.knapsack import solve_knapsack_batch, calculate_ideal_point
+from utils.scaling import plan_precision
+from utils.combinations import generate_combinations, calculate_distances
+from utils.sequential_concessions import initialize_sequential_concessions, make_next_concession
+from utils.meet_in_middle import MAX_MITM_PROJECTS, mitm_ideal_point, mitm_sequential_concessions
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Criterion names accepted in requests (same names as the batch CLI)
+CRITERIA = {'profit': 1, 'expert': 2}
+
+# Larger portfolios are solved by meet in the middle instead of enumerating every combination
+MAX_ENUMERATED_PROJECTS = 20
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+# Single knapsack requests arriving within this window are solved together in one vectorized call
+DEFAULT_BATCH_WINDOW = 0.002
+DEFAULT_MAX_BATCH = 256
+
+def parse_projects(body, max_projects=None):
+    """Validate the 'projects' and 'budget' fields of a request body"""
+    if not isinstance(body, dict):
+        raise ValueError("Тіло запиту має бути об'єктом JSON")
+    if not isinstance(body.get('projects'), list):
+        raise ValueError("Поле 'projects' має бути списком проєктів [вартість, прибуток, експертна_оцінка]")
+
+    # NaN та Infinity (json.loads їх приймає) відхиляє Portfolio разом з нечисловими значеннями
+    projects = Portfolio.from_rows(body['projects'])
+    if len(projects) == 0 or projects.n_criteria < 2:
+        raise ValueError("Кожен проєкт повинен мати вартість, прибуток і експертну оцінку")
+    if max_projects is not None and len(projects) > max_projects:
+        raise ValueError(f"Точний розв'язок доступний не більше ніж для {max_projects} проєктів")
+
+    budget = body.get('budget')
+    if isinstance(budget, bool) or not isinstance(budget, (int, float)) or not math.isfinite(budget) or budget < 0:
+        raise ValueError("Поле 'budget' має бути невід'ємним скінченним числом")
+
+    return projects, budget
+
+def parse_criterion(body, field='criterion', default='profit'):
+    """Criterion index of a 'profit' or 'expert' request field"""
+    name = body.get(field, default)
+    if name not in CRITERIA:
+        raise ValueError(f"Поле '{field}' має бути 'profit' або 'expert'")
+    return CRITERIA[name]
+
+def parse_precision(body):
+    precision = body.get('precision')
+    if precision is not None and (isinstance(precision, bool) or not isinstance(precision, int) or precision < 0):
+        raise ValueError("Поле 'precision' має бути невід'ємним цілим числом")
+    return precision
+
+def run_normalize(body):
+    """Normalized criteria values and normalization factors"""
+    projects, _ = parse_projects(dict(body, budget=0))
+    norm_profits, norm_expert, data = normalize_data(projects)
+    return {
+        'norm_profits': norm_profits,
+        'norm_expert': norm_expert,
+        'norm_factor_profits': data['norm_factor_profits'],
+        'norm_factor_expert': data['norm_factor_expert']
+    }
+
+def run_knapsack_batch(bodies, criterion_index, precision=None):
+    """Solve many knapsack requests in one vectorized call; an invalid request only fails its own result"""
+    results = [None] * len(bodies)
+    valid, portfolios, budgets, plans = [], [], [], []
+    for i, body in enumerate(bodies):
+        try:
+            projects, budget = parse_projects(body)
+            plan = plan_precision(projects.cost, budget, precision)
+        except (ValueError, OverflowError) as e:
+            results[i] = {'error': str(e)}
+            continue
+        valid.append(i)
+        portfolios.append(projects)
+        budgets.append(budget)
+        plans.append(plan)
+
+    solutions, max_values = solve_knapsack_batch(portfolios, budgets, criterion_index, precision, plans=plans)
+    for i, solution, max_value in zip(valid, solutions, max_values):
+        results[i] = {'solution': solution, 'max_value': max_value}
+
+    return results
+
+def run_knapsack(body):
+    """Knapsack optimum of one portfolio, or of every portfolio in 'portfolios'"""
+    criterion_index, precision = parse_criterion(body), parse_precision(body)
+    if 'portfolios' in body:
+        if not isinstance(body['portfolios'], list):
+            raise ValueError("Поле 'portfolios' має бути списком об'єктів {projects, budget}")
+        return {'results': run_knapsack_batch(body['portfolios'], criterion_index, precision)}
+
+    result, = run_knapsack_batch([body], criterion_index, precision)
+    if 'error' in result:
+        raise ValueError(result['error'])
+    return result
+
+def run_ideal_point(body):
+    """Ideal point and the top-k combinations nearest to it"""
+    projects, budget = parse_projects(body, MAX_MITM_PROJECTS)
+    precision = parse_precision(body)
+    top = body.get('top', 10)
+    if isinstance(top, bool) or not isinstance(top, int) or top < 1:
+        raise ValueError("Поле 'top' має бути додатним цілим числом")
+
+    if len(projects) > MAX_ENUMERATED_PROJECTS:
+        # Meet in the middle finds only the nearest combination, without enumerating the rest
+        best = mitm_ideal_point(projects, budget)
+        return {
+            'ideal': best['ideal'].tolist(),
+            'max_values': best['max_values'].tolist(),
+            'norm_factors': best['norm_factors'].tolist(),
+            'engine': 'meet-in-the-middle',
+            'top': [{'solution': best['solution'], 'cost': best['cost'],
+                     'profit': best['values'][0], 'expert': best['values'][1],
+                     'norm_profit': best['norm'][0], 'norm_expert': best['norm'][1],
+                     'distance': best['distance']}]
+        }
+
+    ideal, max_values, _, norm_factors = calculate_ideal_point(projects, budget, [1, 2], precision)
+    norm_profits, norm_expert, _ = normalize_data(projects)
+    distances = calculate_distances(generate_combinations(projects, budget),
+                                    norm_profits, norm_expert, ideal[0], ideal[1])
+
+    return {
+        'ideal': ideal.tolist(),
+        'max_values': max_values.tolist(),
+        'norm_factors': norm_factors.tolist(),
+        'engine': 'enumeration',
+        'combinations_total': len(distances),
+        'top': [
+            {'solution': combo, 'cost': cost, 'profit': profit, 'expert': expert,
+             'norm_profit': norm_profit, 'norm_expert': norm_expert_total, 'distance': distance}
+            for combo, cost, profit, expert, norm_profit, norm_expert_total, distance in distances[:top]
+        ]
+    }
+
+def run_concessions(body):
+    """Sequential concessions for a schedule of concession amounts"""
+    projects, budget = parse_projects(body, MAX_MITM_PROJECTS)
+    precision = parse_precision(body)
+    primary_criterion_index = parse_criterion(body, 'primary')
+    concessions = body.get('concessions', [])
+    if not isinstance(concessions, list) or not all(
+            isinstance(amount, (int, float)) and not isinstance(amount, bool) and amount >= 0
+            for amount in concessions):
+        raise ValueError("Поле 'concessions' має бути списком невід'ємних чисел")
+
+    if len(projects) > MAX_ENUMERATED_PROJECTS:
+        state = mitm_sequential_concessions(projects, budget, primary_criterion_index, concessions)
+    else:
+        state = initialize_sequential_concessions(projects, budget, primary_criterion_index,
+                                                  3 - primary_criterion_index, precision)
+        for amount in concessions:
+            state = make_next_concession(state, amount)
+
+    steps = [{key: value for key, value in step.items() if key != 'acceptable_combinations'}
+             for step in state['history']]
+    return {
+        'solution': state['current_solution'],
+        'primary_value': state['current_primary_value'],
+        'secondary_value': state['current_secondary_value'],
+        'cost': state['current_cost'],
+        'total_concession': state['original_primary_max'] - state['current_primary_value'],
+        'history': steps
+    }
+
+ENDPOINTS = {
+    '/normalize': run_normalize,
+    '/knapsack': run_knapsack,
+    '/ideal-point': run_ideal_point,
+    '/concessions': run_concessions,
+}
+
+def _json_default(value):
+    # Solver results may still contain NumPy scalars or arrays
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class SolverService:
+    """Request routing, coalescing of identical requests and batching of small knapsack requests"""
+
+    def __init__(self, workers=None, batch_window=DEFAULT_BATCH_WINDOW, max_batch=DEFAULT_MAX_BATCH):
+        # Spawned workers do not inherit the listening socket of the server
+        self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.inflight = {}
+        self.pending = {}
+        self.stats = Counter()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    async def call(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, function, *args)
+
+    async def dispatch(self, path, body):
+        """Compute a response, sharing one computation between identical concurrent requests"""
+        key = (path, json.dumps(body, sort_keys=True, separators=(',', ':')))
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.compute(path, body))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            self.stats['coalesced'] += 1
+        # A client that disconnects must not cancel the computation shared with other clients
+        return await asyncio.shield(task)
+
+    async def compute(self, path, body):
+        if path == '/knapsack' and 'portfolios' not in body:
+            return await self.enqueue_knapsack(body)
+        return await self.call(ENDPOINTS[path], body)
+
+    async def enqueue_knapsack(self, body):
+        key = (parse_criterion(body), parse_precision(body))
+        future = asyncio.get_running_loop().create_future()
+        queue = self.pending.setdefault(key, [])
+        queue.append((body, future))
+
+        if len(queue) >= self.max_batch:
+            self.flush(key)
+        elif len(queue) == 1:
+            asyncio.get_running_loop().call_later(self.batch_window, self.flush, key)
+
+        result = await future
+        if 'error' in result:
+            raise ValueError(result['error'])
+        return result
+
+    def flush(self, key):
+        queue = self.pending.pop(key, None)
+        if queue:
+            asyncio.ensure_future(self.run_batch(key, queue))
+
+    async def run_batch(self, key, queue):
+        self.stats['batches'] += 1
+        self.stats['batched_requests'] += len(queue)
+        try:
+            results = await self.call(run_knapsack_batch, [body for body, _ in queue], *key)
+        except Exception as e:
+            results = [e] * len(queue)
+
+        for (_, future), result in zip(queue, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def respond(self, method, path, body):
+        """Status and JSON payload of one request"""
+        if path == '/health' and method == 'GET':
+            return HTTPStatus.OK, {'status': 'ok'}
+        if path == '/stats' and method == 'GET':
+            return HTTPStatus.OK, dict(self.stats)
+        if path not in ENDPOINTS:
+            return HTTPStatus.NOT_FOUND, {'error': f"Невідомий шлях: {path}"}
+        if method != 'POST':
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': "Використовуйте метод POST"}
+
+        self.stats['requests'] += 1
+        try:
+            data = json.loads(body or b'{}')
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, {'error': "Тіло запиту не є коректним JSON"}
+        if not isinstance(data, dict):
+            return HTTPStatus.BAD_REQUEST, {'error': "Тіло запиту має бути об'єктом JSON"}
+
+        try:
+            return HTTPStatus.OK, await self.dispatch(path, data)
+        except ValueError as e:
+            self.stats['errors'] += 1
+            return HTTPStatus.BAD_REQUEST, {'error': str(e)}
+        except Exception as e:
+            self.stats['errors'] += 1
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"{type(e).__name__}: {e}"}
+
+    async def handle(self, reader, writer):
+        """Serve the HTTP/1.1 requests of one connection (keep-alive unless the client closes it)"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                parts = request_line.decode('latin-1').split()
+                length = headers.get('content-length', '0')
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                if len(parts) != 3 or not length.isdigit():
+                    status, payload, keep_alive = HTTPStatus.BAD_REQUEST, {'error': "Некоректний запит HTTP"}, False
+                elif int(length) > MAX_BODY_BYTES:
+                    status, payload, keep_alive = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': "Завеликий запит"}, False
+                else:
+                    method, target, version = parts
+                    keep_alive = keep_alive and version == 'HTTP/1.1'
+                    body = await reader.readexactly(int(length))
+                    status, payload = await self.respond(method, target.split('?')[0], body)
+
+                data = json.dumps(payload, ensure_ascii=False, default=_json_default).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, batch_window=DEFAULT_BATCH_WINDOW,
+                max_batch=DEFAULT_MAX_BATCH):
+    """Run the service until it is cancelled"""
+    service = SolverService(workers, batch_window, max_batch)
+    try:
+        server = await asyncio.start_server(service.handle, host, port)
+        # SIGTERM stops the server like Ctrl+C, so the worker pool is shut down too
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        print(f"Сервіс розв'язувача: http://{host}:{port}", flush=True)
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Локальний HTTP/JSON сервіс розв'язувача вибору проєктів")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="Кількість процесів для обчислень")
+    parser.add_argument("--batch-window", type=float, default=DEFAULT_BATCH_WINDOW * 1000,
+                        help="Скільки мілісекунд збирати запити /knapsack в один пакет")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH,
+                        help="Найбільша кількість запитів /knapsack в одному пакеті")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.batch_window / 1000, args.max_batch))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+import numpy as np
+from .normalize import criteria_matrix, normalize_matrix
+from .knapsack import solve_knapsack_multi
+from .portfolio import as_portfolio
+from .scaling import plan_precision, to_budget_units
+from .combinations import generate_combinations, build_candidate_store
+
+def budget_sweep(projects, budgets, precision=None):
+    """
+    Обчислює оптимальні значення критеріїв і рішення методу ідеальної точки
+    для діапазону бюджетів за одне обчислення.
+
+    Таблиця ДП будується один раз для максимального бюджету: останній рядок
+    таблиці містить оптимум для кожного бюджету w <= B. Комбінації також
+    генеруються один раз, а для кожного бюджету відбираються лише ті, що в нього вкладаються.
+
+    Аргументи:
+        projects: Список проєктів, кожен містить [вартість, прибуток, експертна_оцінка]
+        budgets: Список бюджетів для аналізу
+        precision: Кількість знаків після коми у вартостях (None - найменша точна)
+
+    Повертає:
+        list: Список словників з результатами для кожного бюджету
+    """
+    budgets = sorted(set(budgets))
+    max_budget = budgets[-1]
+
+    # Одна таблиця ДП для обох критеріїв і найбільшого бюджету
+    _, _, dp, _ = solve_knapsack_multi(projects, max_budget, [1, 2], precision)
+    if dp is None:
+        raise ValueError("Таблиця ДП для такого бюджету та точності вартостей завелика")
+    plan = plan_precision(as_portfolio(projects).cost, max_budget, precision)
+    optimum_row = dp[-1]
+
+    _, values = criteria_matrix(projects, [1, 2])
+    norm_values, norm_factors = normalize_matrix(values)
+
+    # Одна генерація комбінацій для найбільшого бюджету
+    store = build_candidate_store(generate_combinations(projects, max_budget), values, norm_values)
+    costs = store['cost']
+    
+    # Вартості комбінацій в одиницях таблиці ДП, щоб бюджет перевірявся так само, як у ДП
+    cost_units = store['masks'] @ plan['costs']
+
+    results = []
+    for b in budgets:
+        # Ідеальна точка для бюджету b: оптимум з останнього рядка таблиці ДП
+        w = to_budget_units(plan, b)
+        max_profit, max_expert = optimum_row[w].tolist()
+        ideal = optimum_row[w] / np.where(norm_factors > 0, norm_factors, 1)
+
+        # Відстані лише для комбінацій, що вкладаються в бюджет b
+        feasible = np.flatnonzero(cost_units <= w)
+        distances = np.sqrt(((store['norm'][feasible] - ideal)**2).sum(axis=1))
+        best = feasible[np.argmin(distances)]
+        best_profit, best_expert = store['values'][best].tolist()
+
+        results.append({
+            'budget': b,
+            'max_profit': max_profit,
+            'max_expert': max_expert,
+            'ideal_profit': ideal[0],
+            'ideal_expert': ideal[1],
+            'best_combo': store['masks'][best].astype(int).tolist(),
+            'best_cost': costs[best].item(),
+            'best_profit': best_profit,
+            'best_expert': best_expert,
+            'best_distance': distances.min()
+        })
+
+    return results
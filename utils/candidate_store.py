@@ -0,0 +1,242 @@
+import os
+import numpy as np
+from .portfolio import as_portfolio
+from .multiplicity import group_identical_projects
+from .scaling import feasibility_units
+from .combinations import calculate_distance_matrix
+
+# Кількість кандидатів, які обробляються (записуються чи читаються) за один крок
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+# Найбільша кількість варіантів половини класів, що перебираються за один крок
+_HALF_CHUNK = 1_000_000
+
+def build_memmap_store(projects, budget, directory, criterion_indices=(1, 2), norm_values=None,
+                       chunksize=DEFAULT_CHUNK_ROWS):
+    """
+    Перебирає всі допустимі комбінації і записує сховище кандидатів у файли .npy на диску.
+
+    Класи однакових проєктів ділляться на дві половини, варіанти кожної половини
+    перебираються векторно, а допустимі пари половин записуються частинами
+    у відображені в пам'ять масиви. У пам'яті одночасно тримаються лише варіанти
+    половин і одна частина результату.
+
+    Аргументи:
+        projects: Portfolio або список проєктів [вартість, критерій1, ..., критерійm]
+        budget: Доступний бюджет
+        directory: Каталог для файлів сховища
+        criterion_indices: Індекси стовпців критеріїв
+        norm_values: Матриця нормалізованих значень критеріїв розміром n × m (необов'язково)
+        chunksize: Кількість кандидатів в одній частині запису
+
+    Повертає:
+        dict: Сховище кандидатів ('masks', 'cost', 'values', 'norm') з масивами np.memmap
+    """
+    portfolio = as_portfolio(projects)
+    n = len(portfolio)
+    classes, counts, members = group_identical_projects(portfolio)
+    criterion_indices = list(criterion_indices)
+
+    # Бюджет перевіряється в цілих одиницях, як у таблиці ДП і при переборі в пам'яті
+    unit_costs, budget_units, _ = feasibility_units(classes.cost, budget)
+    unit_costs = np.array(unit_costs, dtype=np.int64)
+
+    # Ділимо класи так, щоб кількість варіантів обох половин була близькою
+    log_sizes = np.cumsum(np.log(np.asarray(counts, dtype=float) + 1))
+    split = int(np.searchsorted(log_sizes, log_sizes[-1] / 2)) + 1 if len(counts) else 0
+    halves = [_enumerate_half(classes, counts, members, n, range(0, split), unit_costs, budget_units,
+                              criterion_indices, norm_values),
+              _enumerate_half(classes, counts, members, n, range(split, len(counts)), unit_costs, budget_units,
+                              criterion_indices, norm_values)]
+    left, right = halves
+
+    # Права половина сортується за вартістю, тоді допустимі пари для кожного
+    # варіанта лівої половини - це префікс правої
+    order = np.argsort(right['units'], kind='stable')
+    right = {key: value[order] for key, value in right.items()}
+    limits = _pair_limits(left['units'], right['units'], budget_units)
+    total = int(limits.sum())
+
+    os.makedirs(directory, exist_ok=True)
+    m = len(criterion_indices)
+    store = {
+        'masks': _open_array(directory, 'masks', (total, n), bool),
+        'cost': _open_array(directory, 'cost', (total,), right['cost'].dtype),
+        'values': _open_array(directory, 'values', (total, m), right['values'].dtype)
+    }
+    if norm_values is not None:
+        store['norm'] = _open_array(directory, 'norm', (total, m), float)
+
+    # Записуємо пари частинами приблизно по chunksize рядків
+    ends = np.cumsum(limits)
+    position = 0
+    start = 0
+    while start < len(limits):
+        stop = max(int(np.searchsorted(ends, ends[start] - limits[start] + chunksize, side='right')), start + 1)
+        left_ids = np.repeat(np.arange(start, stop), limits[start:stop])
+        right_ids = np.arange(len(left_ids)) - np.repeat(ends[start:stop] - limits[start:stop] - position,
+                                                         limits[start:stop])
+        rows = slice(position, position + len(left_ids))
+
+        store['masks'][rows] = left['masks'][left_ids] | right['masks'][right_ids]
+        store['cost'][rows] = left['cost'][left_ids] + right['cost'][right_ids]
+        store['values'][rows] = left['values'][left_ids] + right['values'][right_ids]
+        if norm_values is not None:
+            store['norm'][rows] = left['norm'][left_ids] + right['norm'][right_ids]
+
+        position += len(left_ids)
+        start = stop
+
+    for array in store.values():
+        array.flush()
+
+    store['directory'] = directory
+    return store
+
+def open_memmap_store(directory):
+    """
+    Відкриває сховище кандидатів, записане build_memmap_store, лише для читання.
+
+    Аргументи:
+        directory: Каталог з файлами сховища
+
+    Повертає:
+        dict: Сховище кандидатів з масивами np.memmap
+    """
+    store = {'directory': directory}
+    for name in ('masks', 'cost', 'values', 'norm', 'distance'):
+        path = os.path.join(directory, f'{name}.npy')
+        if os.path.exists(path):
+            store[name] = np.load(path, mmap_mode='r')
+    return store
+
+def compute_store_distances(store, ideal, chunksize=DEFAULT_CHUNK_ROWS):
+    """
+    Обчислює евклідові відстані кандидатів до ідеальної точки частинами і записує їх на диск.
+
+    Аргументи:
+        store: Сховище кандидатів з build_memmap_store
+        ideal: Нормалізована ідеальна точка
+        chunksize: Кількість кандидатів в одній частині
+
+    Повертає:
+        dict: Те саме сховище з масивом 'distance'
+    """
+    total = len(store['cost'])
+    distance = _open_array(store['directory'], 'distance', (total,), float)
+    metrics = [{'name': 'L2', 'p': 2, 'weights': None}]
+
+    for start in range(0, total, chunksize):
+        chunk = {'norm': np.asarray(store['norm'][start:start + chunksize])}
+        distance[start:start + chunksize] = calculate_distance_matrix(chunk, ideal, metrics)[:, 0]
+
+    distance.flush()
+    store['distance'] = distance
+    return store
+
+def query_store_chunked(store, sort_by='distance', ascending=True, cost_range=None, include=(), exclude=(),
+                        limit=20, chunksize=DEFAULT_CHUNK_ROWS):
+    """
+    Відбирає та сортує кандидатів сховища частинами, зберігаючи в пам'яті лише перші limit.
+
+    Аргументи:
+        store: Сховище кандидатів
+        sort_by: Стовпець сортування: 'cost', 'distance' або номер критерію (0, 1, ...)
+        ascending: Сортувати за зростанням
+        cost_range: Межі вартості (мінімум, максимум) або None
+        include: Номери проєктів, які мають бути в комбінації
+        exclude: Номери проєктів, яких не має бути в комбінації
+        limit: Кількість перших кандидатів у порядку сортування
+        chunksize: Кількість кандидатів в одній частині
+
+    Повертає:
+        tuple: (індекси перших limit кандидатів у порядку сортування, кількість усіх відібраних кандидатів)
+    """
+    best_ids = np.array([], dtype=np.int64)
+    best_keys = np.array([], dtype=float)
+    matched = 0
+
+    for start in range(0, len(store['cost']), chunksize):
+        rows = slice(start, start + chunksize)
+        cost = np.asarray(store['cost'][rows])
+        keep = np.ones(len(cost), dtype=bool)
+
+        if cost_range is not None:
+            keep &= (cost >= cost_range[0]) & (cost <= cost_range[1])
+        if len(include) or len(exclude):
+            masks = np.asarray(store['masks'][rows])
+            if len(include):
+                keep &= masks[:, list(include)].all(axis=1)
+            if len(exclude):
+                keep &= ~masks[:, list(exclude)].any(axis=1)
+
+        ids = np.flatnonzero(keep)
+        matched += len(ids)
+        if isinstance(sort_by, (int, np.integer)):
+            keys = np.asarray(store['values'][rows][ids, sort_by], dtype=float)
+        else:
+            keys = np.asarray(store[sort_by][rows], dtype=float)[ids]
+
+        # Об'єднуємо з найкращими кандидатами попередніх частин і залишаємо перші limit
+        # у порядку (ключ, номер), щоб рівні ключі на межі відбиралися так само, як при повному сортуванні
+        best_ids = np.concatenate([best_ids, ids + start])
+        best_keys = np.concatenate([best_keys, keys if ascending else -keys])
+        top = np.lexsort((best_ids, best_keys))[:max(limit, 0)]
+        best_ids, best_keys = best_ids[top], best_keys[top]
+
+    return best_ids, matched
+
+def _enumerate_half(classes, counts, members, n, class_ids, unit_costs, budget_units, criterion_indices, norm_values):
+    # Усі варіанти кількостей проєктів для частини класів, що вкладаються в бюджет
+    class_ids = list(class_ids)
+    radices = np.array([counts[c] + 1 for c in class_ids], dtype=np.int64)
+    size = int(np.prod(radices)) if len(radices) else 1
+
+    class_costs = classes.cost[class_ids]
+    class_units = unit_costs[class_ids]
+    class_values = classes.columns(criterion_indices)[class_ids]
+    parts = []
+
+    for start in range(0, size, _HALF_CHUNK):
+        # Номер варіанта розкладаємо за змішаною системою числення з основами counts + 1
+        index = np.arange(start, min(start + _HALF_CHUNK, size))
+        chosen = np.empty((len(index), len(class_ids)), dtype=np.int64)
+        for j, radix in enumerate(radices):
+            index, chosen[:, j] = np.divmod(index, radix)
+
+        units = chosen @ class_units
+        feasible = units <= budget_units
+        chosen = chosen[feasible]
+
+        masks = np.zeros((len(chosen), n), dtype=bool)
+        for j, c in enumerate(class_ids):
+            # З кожного класу вибираються проєкти з найменшими номерами
+            for k, project in enumerate(members[c]):
+                masks[:, project] = chosen[:, j] > k
+
+        part = {'masks': masks, 'cost': chosen @ class_costs, 'units': units[feasible], 'values': chosen @ class_values}
+        if norm_values is not None:
+            part['norm'] = masks @ np.asarray(norm_values, dtype=float)
+        parts.append(part)
+
+    return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+def _pair_limits(left_cost, right_cost, budget):
+    # Кількість варіантів правої половини (відсортованої за вартістю) для кожного варіанта лівої
+    limits = np.searchsorted(right_cost, budget - left_cost, side='right')
+
+    # Уточнюємо межу, щоб сума вартостей порівнювалась з бюджетом так само, як при переборі
+    while True:
+        over = (limits > 0) & (left_cost + right_cost[np.maximum(limits - 1, 0)] > budget)
+        under = (limits < len(right_cost)) & (left_cost + right_cost[np.minimum(limits, len(right_cost) - 1)] <= budget)
+        if not over.any() and not under.any():
+            return limits
+        limits = limits - over + under
+
+def _open_array(directory, name, shape, dtype):
+    # Файл .npy, відображений у пам'ять (порожній масив не можна відобразити)
+    path = os.path.join(directory, f'{name}.npy')
+    if shape[0] == 0:
+        np.save(path, np.zeros(shape, dtype=dtype))
+        return np.load(path, mmap_mode='r+')
+    return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
@@ -1,41 +1,45 @@
-import math
-import pandas as pd
+import numpy as np
+from .multiplicity import group_identical_projects, generate_class_combinations, expand_class_counts
+from .resources import resource_limits
+from .dependencies import generate_rule_combinations
 
-def generate_combinations(projects, budget):
+# Стандартний набір метрик для порівняння: p-норма відстані та ваги критеріїв
+# (None - однакові ваги для всіх критеріїв)
+DEFAULT_METRICS = [
+    {'name': 'L1', 'p': 1, 'weights': None},
+    {'name': 'L2', 'p': 2, 'weights': None},
+    {'name': 'L∞', 'p': np.inf, 'weights': None},
+]
+
+def generate_combinations(projects, budget, capacities=None, rules=None):
     """
-    Генерує всі можливі комбінації проєктів, які не перевищують бюджет.
+    Генерує всі можливі комбінації проєктів, які не перевищують бюджет
+    (і доступні обсяги додаткових ресурсів, якщо їх задано). Якщо задано правила
+    вибору проєктів, недопустимі гілки перебору відкидаються одразу (див. generate_rule_combinations).
+    Комбінації, що відрізняються лише вибором серед однакових проєктів,
+    повертаються один раз (з проєктами з найменшими номерами).
     
     Аргументи:
-        projects: Список проєктів, кожен містить [вартість, прибуток, експертна_оцінка]
+        projects: Portfolio або список проєктів [вартість, прибуток, експертна_оцінка]
         budget: Доступний бюджет
+        capacities: Доступні обсяги додаткових ресурсів портфеля (None - лише бюджет)
+        rules: Залежності та групи взаємовиключних проєктів (див. project_rules) або None
         
     Повертає:
         list: Список кортежів (комбінація, вартість, прибуток, експертна_оцінка)
     """
-    n = len(projects)
-    result = []
-    
-    def backtrack(index, current_combo, current_cost, current_profit, current_expert):
-        if index == n:
-            # Додаємо поточну комбінацію до результатів
-            result.append((current_combo.copy(), current_cost, current_profit, current_expert))
-            return
-        
-        # Пропускаємо поточний проєкт
-        backtrack(index + 1, current_combo + [0], current_cost, current_profit, current_expert)
-        
-        # Включаємо поточний проєкт, якщо це можливо
-        if current_cost + projects[index][0] <= budget:
-            backtrack(
-                index + 1,
-                current_combo + [1],
-                current_cost + projects[index][0],
-                current_profit + projects[index][1],
-                current_expert + projects[index][2]
-            )
-    
-    backtrack(0, [], 0, 0, 0)
-    return result
+    # Однакові проєкти об'єднуємо в класи і перебираємо кількості копій кожного класу,
+    # а не всі еквівалентні підмножини
+    if rules is not None:
+        return generate_rule_combinations(projects, budget, rules, capacities)
+    if capacities is not None:
+        resource_limits(projects, budget, capacities)
+    classes, counts, members = group_identical_projects(projects)
+    
+    return [
+        (expand_class_counts(class_counts, members, len(projects)), cost, profit, expert)
+        for class_counts, cost, profit, expert in generate_class_combinations(classes, counts, budget, capacities)
+    ]
 
 def calculate_distances(combinations, norm_profits, norm_expert, ideal_profit, ideal_expert):
     """
@@ -51,45 +55,130 @@ def calculate_distances(combinations, norm_profits, norm_expert, ideal_profit, i
     Повертає:
         list: Список кортежів з інформацією про відстані
     """
-    distances = []
+    n = len(norm_profits)
+    masks = np.array([combo for combo, _, _, _ in combinations], dtype=bool).reshape(len(combinations), n)
     
-    for combo, total_cost, total_profit, total_expert in combinations:
-        # Обчислюємо нормалізовані суми для комбінації
-        norm_total_profit = sum([norm_profits[i] for i, x in enumerate(combo) if x == 1])
-        norm_total_expert = sum([norm_expert[i] for i, x in enumerate(combo) if x == 1])
-        
-        # Обчислюємо евклідову відстань до ідеальної точки
-        distance = math.sqrt((norm_total_profit - ideal_profit)**2 + (norm_total_expert - ideal_expert)**2)
-        distances.append((combo, total_cost, total_profit, total_expert, norm_total_profit, norm_total_expert, distance))
+    # Обчислюємо нормалізовані суми для всіх комбінацій одним множенням матриць
+    norm_totals = masks @ np.column_stack([norm_profits, norm_expert]).astype(float)
+    
+    # Евклідова відстань до ідеальної точки тим самим ядром, що й для m критеріїв
+    ideal_distances = calculate_distance_matrix({'norm': norm_totals}, (ideal_profit, ideal_expert),
+                                                [{'name': 'L2', 'p': 2, 'weights': None}])[:, 0]
+    
+    distances = [
+        (combo, total_cost, total_profit, total_expert, norm_total[0], norm_total[1], distance)
+        for (combo, total_cost, total_profit, total_expert), norm_total, distance
+        in zip(combinations, norm_totals.tolist(), ideal_distances.tolist())
+    ]
     
     # Сортуємо за відстанню (за зростанням)
     distances.sort(key=lambda x: x[6])
     return distances
 
-def create_combinations_df(distances):
+def build_candidate_store(combinations, values, norm_values):
     """
-    Створює pandas DataFrame з деталями комбінацій для відображення
+    Перетворює список комбінацій на стовпцеве сховище кандидатів (масиви NumPy).
     
     Аргументи:
-        distances: Список кортежів з інформацією про відстані
+        combinations: Список кортежів, перші елементи яких - (комбінація, вартість, ...)
+        values: Матриця значень критеріїв проєктів розміром n × m
+        norm_values: Матриця нормалізованих значень критеріїв розміром n × m
         
     Повертає:
-        pandas.DataFrame: DataFrame з інформацією про комбінації
+        dict: Маски вибору проєктів, вартості, сумарні та нормалізовані значення критеріїв
+    """
+    masks = np.array([combination[0] for combination in combinations], dtype=bool).reshape(len(combinations), len(values))
+    
+    return {
+        'masks': masks,
+        'cost': np.array([combination[1] for combination in combinations]),
+        'values': masks @ np.asarray(values),
+        'norm': masks @ np.asarray(norm_values, dtype=float)
+    }
+
+def calculate_distance_matrix(store, ideal, metrics=DEFAULT_METRICS):
     """
-    rows = []
+    Обчислює відстані від усіх кандидатів до ідеальної точки одразу для набору метрик.
     
-    for i, (combo, cost, profit, expert, norm_profit, norm_expert, distance) in enumerate(distances, start=1):
-        combo_str = ', '.join([f'x{j+1}' for j, x in enumerate(combo) if x == 1]) or "Жодного"
+    Аргументи:
+        store: Сховище кандидатів з build_candidate_store
+        ideal: Нормалізована ідеальна точка (по одному значенню на критерій)
+        metrics: Список метрик {'name', 'p', 'weights'}, де p - 1, 2 або np.inf
         
-        rows.append({
-            'Ранг': i,
-            'Комбінація': combo_str,
-            'Вартість': cost,
-            'Прибуток': profit,
-            'Експертна оцінка': expert,
-            'Норм. прибуток': round(norm_profit, 4),
-            'Норм. експертна оцінка': round(norm_expert, 4),
-            'Відстань': round(distance, 4)
-        })
-    
-    return pd.DataFrame(rows)
\ No newline at end of file
+    Повертає:
+        numpy.ndarray: Матриця відстаней розміром (кандидати × метрики)
+    """
+    diffs = np.abs(store['norm'] - np.asarray(ideal, dtype=float))
+    m = diffs.shape[1]
+    weights = np.array([np.ones(m) if metric['weights'] is None else metric['weights']
+                        for metric in metrics], dtype=float).reshape(len(metrics), m)
+    p = np.array([metric['p'] for metric in metrics], dtype=float)
+    
+    distances = np.empty((len(diffs), len(metrics)))
+    
+    # Зважені суми модулів та квадратів різниць для всіх метрик одним множенням матриць
+    l1 = p == 1
+    l2 = p == 2
+    linf = np.isinf(p)
+    if l1.any():
+        distances[:, l1] = diffs @ weights[l1].T
+    if l2.any():
+        distances[:, l2] = np.sqrt((diffs**2) @ weights[l2].T)
+    if linf.any():
+        distances[:, linf] = (diffs[:, None, :] * weights[linf]).max(axis=2)
+    
+    # Інші p-норми обчислюємо за загальною формулою
+    other = ~(l1 | l2 | linf)
+    if other.any():
+        p_other = p[other]
+        distances[:, other] = ((diffs[:, None, :]**p_other[:, None]) * weights[other]).sum(axis=2)**(1 / p_other)
+    
+    return distances
+
+def rank_candidates(store, ideal):
+    """
+    Додає до сховища кандидатів евклідову відстань до ідеальної точки та ранг за нею.
+    
+    Аргументи:
+        store: Сховище кандидатів з build_candidate_store
+        ideal: Нормалізована ідеальна точка
+        
+    Повертає:
+        dict: Те саме сховище з масивами 'distance' та 'rank' (1 - найближчий кандидат)
+    """
+    store['distance'] = calculate_distance_matrix(store, ideal, [{'name': 'L2', 'p': 2, 'weights': None}])[:, 0]
+    
+    # Стабільне сортування зберігає порядок перебору для однакових відстаней
+    order = np.argsort(store['distance'], kind='stable')
+    store['rank'] = np.empty(len(order), dtype=int)
+    store['rank'][order] = np.arange(1, len(order) + 1)
+    return store
+
+def query_candidates(store, sort_by='rank', ascending=True, cost_range=None, include=(), exclude=()):
+    """
+    Відбирає та сортує кандидатів векторними операціями над стовпцями сховища.
+    
+    Аргументи:
+        store: Сховище кандидатів
+        sort_by: Стовпець сортування: 'rank', 'cost', 'distance' або номер критерію (0, 1, ...)
+        ascending: Сортувати за зростанням
+        cost_range: Межі вартості (мінімум, максимум) або None
+        include: Номери проєктів, які мають бути в комбінації
+        exclude: Номери проєктів, яких не має бути в комбінації
+        
+    Повертає:
+        numpy.ndarray: Індекси кандидатів у порядку сортування
+    """
+    keep = np.ones(len(store['cost']), dtype=bool)
+    
+    if cost_range is not None:
+        keep &= (store['cost'] >= cost_range[0]) & (store['cost'] <= cost_range[1])
+    if len(include):
+        keep &= store['masks'][:, list(include)].all(axis=1)
+    if len(exclude):
+        keep &= ~store['masks'][:, list(exclude)].any(axis=1)
+    
+    indices = np.flatnonzero(keep)
+    key = store['values'][indices, sort_by] if isinstance(sort_by, (int, np.integer)) else store[sort_by][indices]
+    order = np.argsort(key if ascending else -key, kind='stable')
+    return indices[order]
@@ -0,0 +1,350 @@
+import re
+import numpy as np
+from .portfolio import as_portfolio
+from .normalize import criterion_lists
+from .multiplicity import group_identical_projects
+from .resources import resource_limits, _dominated, DEFAULT_BLOCK_CELLS
+
+def project_rules(n, requires=(), exclusive=()):
+    """
+    Перевіряє правила вибору проєктів і зводить їх до єдиного вигляду.
+
+    Аргументи:
+        n: Кількість проєктів
+        requires: Пари (проєкт, потрібний проєкт): проєкт можна вибрати лише разом з потрібним
+        exclusive: Групи проєктів, з яких можна вибрати не більше одного
+
+    Повертає:
+        dict: Правила {'requires': кортеж пар, 'exclusive': кортеж груп} з номерами від 0
+    """
+    requires = tuple(sorted({(int(project), int(prerequisite)) for project, prerequisite in requires}))
+    exclusive = tuple(tuple(sorted({int(i) for i in group})) for group in exclusive)
+
+    used = [i for pair in requires for i in pair] + [i for group in exclusive for i in group]
+    if any(i < 0 or i >= n for i in used):
+        raise ValueError(f"Номери проєктів у правилах мають бути від 1 до {n}")
+    if any(project == prerequisite for project, prerequisite in requires):
+        raise ValueError("Проєкт не може залежати сам від себе")
+    if any(len(group) < 2 for group in exclusive):
+        raise ValueError("Група взаємовиключних проєктів повинна містити хоча б два проєкти")
+
+    grouped = [i for group in exclusive for i in group]
+    if len(grouped) != len(set(grouped)):
+        raise ValueError("Проєкт може входити лише в одну групу взаємовиключних проєктів")
+
+    rules = {'requires': requires, 'exclusive': exclusive}
+    rule_units(rules, n)
+    return rules
+
+def parse_rules(requires_text, exclusive_text, n):
+    """
+    Зчитує правила з тексту: рядок "x4: x1, x2" означає, що x4 потребує x1 і x2,
+    а рядок "x3, x5" - що з x3 і x5 можна вибрати не більше одного.
+
+    Аргументи:
+        requires_text: Рядки залежностей
+        exclusive_text: Рядки груп взаємовиключних проєктів
+        n: Кількість проєктів
+
+    Повертає:
+        dict: Правила (див. project_rules) або None, якщо правил немає
+    """
+    requires = []
+    for line in requires_text.splitlines():
+        if line.strip():
+            project, _, prerequisites = line.partition(':')
+            requires += [(_project_number(project), _project_number(item)) for item in prerequisites.split(',')]
+
+    exclusive = [[_project_number(item) for item in line.split(',')]
+                 for line in exclusive_text.splitlines() if line.strip()]
+
+    if not requires and not exclusive:
+        return None
+    return project_rules(n, requires, exclusive)
+
+def _project_number(text):
+    # "x3" або "3" -> 2
+    match = re.fullmatch(r'\s*[xX]?(\d+)\s*', text)
+    if match is None:
+        raise ValueError(f"Некоректний номер проєкту: '{text.strip()}'")
+    return int(match.group(1)) - 1
+
+def rule_units(rules, n):
+    """
+    Ділить проєкти на кроки пошуку в порядку залежностей.
+
+    Кожна група взаємовиключних проєктів - один крок (клас задачі з вибором не більше
+    одного варіанта), кожен інший проєкт - окремий крок. Крок іде після кроків,
+    що містять потрібні його проєктам проєкти.
+
+    Аргументи:
+        rules: Правила з project_rules
+        n: Кількість проєктів
+
+    Повертає:
+        tuple: (список кроків - кортежів номерів проєктів, бітові маски потрібних проєктів кожного проєкту)
+    """
+    unit_of = list(range(n))
+    units = [(i,) for i in range(n)]
+    for group in rules['exclusive']:
+        for i in group:
+            unit_of[i] = len(units)
+        units.append(group)
+
+    prerequisites = [0] * n
+    for project, prerequisite in rules['requires']:
+        prerequisites[project] |= 1 << prerequisite
+
+    # Топологічне сортування кроків (серед готових першим іде крок з найменшим номером проєкту)
+    active = sorted(set(unit_of), key=lambda u: units[u][0])
+    after = {u: set() for u in active}
+    waiting = {u: 0 for u in active}
+    for project, prerequisite in rules['requires']:
+        source, target = unit_of[prerequisite], unit_of[project]
+        if source != target and target not in after[source]:
+            after[source].add(target)
+            waiting[target] += 1
+
+    ready = [u for u in active if waiting[u] == 0]
+    order = []
+    while ready:
+        u = min(ready, key=lambda unit: units[unit][0])
+        ready.remove(u)
+        order.append(units[u])
+        for v in after[u]:
+            waiting[v] -= 1
+            if waiting[v] == 0:
+                ready.append(v)
+
+    if len(order) < len(active):
+        raise ValueError("Залежності проєктів утворюють цикл")
+    return order, prerequisites
+
+def allowed_projects(usage, limits, rules, units, prerequisites):
+    """
+    Позначає проєкти, які можуть увійти хоча б в одне допустиме рішення.
+
+    Проєкт разом з усіма (транзитивно) потрібними йому проєктами має вкладатися в межі
+    і не містити двох проєктів однієї групи взаємовиключних. Проєкти, що потребують
+    недопустимого проєкту, теж недопустимі.
+
+    Аргументи:
+        usage: Матриця витрат проєктів n × (1 + r)
+        limits: Межі обмежень
+        rules: Правила з project_rules
+        units: Кроки пошуку з rule_units
+        prerequisites: Бітові маски потрібних проєктів
+
+    Повертає:
+        numpy.ndarray: Булевий масив розміром n
+    """
+    n = len(usage)
+    group_of = {i: g for g, group in enumerate(rules['exclusive']) for i in group}
+    closure = [0] * n
+    allowed = np.zeros(n, dtype=bool)
+    tolerance = 1e-9 * np.maximum(1.0, limits)
+
+    # Кроки впорядковані за залежностями, тож замикання потрібних проєктів уже пораховані
+    for unit in units:
+        for i in unit:
+            closure[i] = 1 << i
+            for j in _bits(prerequisites[i]):
+                closure[i] |= closure[j]
+            members = list(_bits(closure[i]))
+            groups = [group_of[j] for j in members if j in group_of]
+            allowed[i] = (all(allowed[j] for j in _bits(prerequisites[i]))
+                          and len(groups) == len(set(groups))
+                          and (usage[members].sum(axis=0) <= limits + tolerance).all())
+
+    return allowed
+
+def _usage_limits(portfolio, budget, capacities):
+    # Витрати та межі всіх обмежень; без обсягів ресурсів - лише бюджет
+    if capacities is not None:
+        return resource_limits(portfolio, budget, capacities)
+    return portfolio.cost.astype(float).reshape(-1, 1), np.array([budget], dtype=float)
+
+def _bits(mask):
+    # Номери одиничних бітів маски
+    i = 0
+    while mask:
+        if mask & 1:
+            yield i
+        mask >>= 1
+        i += 1
+
+def solve_knapsack_rules(projects, budget, criterion_index, rules, secondary_criterion_index=None,
+                         capacities=None, block_cells=DEFAULT_BLOCK_CELLS):
+    """
+    Розв'язує задачу про рюкзак із залежностями та взаємовиключними проєктами.
+
+    Проєкти розглядаються кроками в порядку залежностей (див. rule_units); група
+    взаємовиключних проєктів - один крок, на якому стан доповнюється не більше ніж
+    одним проєктом групи. Проєкт додається лише до станів, що вже містять усі потрібні
+    йому проєкти. Стани порівнюються лише тоді, коли вони однаково вибирають проєкти,
+    потрібні ще не розглянутим проєктам; серед таких відкидаються стани, для яких є стан
+    з не більшими витратами і не меншим значенням. Чим жорсткіші правила, тим менше
+    станів залишається.
+
+    Аргументи:
+        projects: Portfolio або список проєктів [вартість, прибуток, експертна_оцінка]
+        budget: Доступний бюджет
+        criterion_index: Індекс критерію, який максимізується
+        rules: Правила з project_rules
+        secondary_criterion_index: Індекс критерію, який максимізується серед рівних за основним
+        capacities: Доступні обсяги додаткових ресурсів портфеля (None - лише бюджет)
+        block_cells: Найбільша кількість пар станів в одному векторному кроці
+
+    Повертає:
+        tuple: (рішення, максимальне значення)
+    """
+    portfolio = as_portfolio(projects)
+    usage, limits = _usage_limits(portfolio, budget, capacities)
+    values = portfolio.column(criterion_index)
+    secondary = portfolio.column(secondary_criterion_index) if secondary_criterion_index is not None else None
+    n = len(portfolio)
+    tolerance = 1e-9 * np.maximum(1.0, limits)
+
+    units, prerequisites = rule_units(rules, n)
+    allowed = allowed_projects(usage, limits, rules, units, prerequisites)
+
+    # Проєкти, потрібні кроку t або пізнішим крокам
+    needed_later = [0] * (len(units) + 1)
+    for t in range(len(units) - 1, -1, -1):
+        needed_later[t] = needed_later[t + 1]
+        for i in units[t]:
+            needed_later[t] |= prerequisites[i]
+
+    state_usage = np.zeros((1, len(limits)))
+    state_values = np.zeros(1, dtype=values.dtype)
+    state_secondary = np.zeros(1, dtype=secondary.dtype if secondary is not None else values.dtype)
+    state_masks = np.array([0], dtype=object)
+
+    for t, unit in enumerate(units):
+        parts = [(state_usage, state_values, state_secondary, state_masks)]
+        for i in unit:
+            if not allowed[i]:
+                continue
+            fits = (state_usage + usage[i] <= limits + tolerance).all(axis=1)
+            if prerequisites[i]:
+                fits &= ((state_masks & prerequisites[i]) == prerequisites[i]).astype(bool)
+            parts.append((state_usage[fits] + usage[i], state_values[fits] + values[i],
+                          state_secondary[fits] + (secondary[i] if secondary is not None else 0),
+                          state_masks[fits] | (1 << i)))
+
+        all_usage, all_values, all_secondary, all_masks = (np.concatenate(column) for column in zip(*parts))
+        keep = _undominated(all_usage, all_values, all_secondary, all_masks & needed_later[t + 1], block_cells)
+        state_usage, state_values = all_usage[keep], all_values[keep]
+        state_secondary, state_masks = all_secondary[keep], all_masks[keep]
+
+    # Найкращий стан за значенням (і за другорядним критерієм серед рівних)
+    best = np.lexsort((-state_secondary, -state_values))[0]
+    mask = state_masks[best]
+    solution = [(mask >> i) & 1 for i in range(n)]
+
+    return solution, state_values[best].item()
+
+def _undominated(usage, values, secondary, keys, block_cells):
+    """Індекси станів, не домінованих станами з тим самим вибором потрібних далі проєктів"""
+    _, group = np.unique(keys, return_inverse=True)
+    group = group.ravel()
+
+    if usage.shape[1] == 1:
+        # Одне обмеження: у кожній групі за зростанням вартості значення має строго зростати
+        ranks = _pair_ranks(values, secondary)
+        order = np.lexsort((-ranks, usage[:, 0], group))
+        combined = group[order] * (ranks.max() + 1) + ranks[order]
+        previous_max = np.maximum.accumulate(np.concatenate([[-1], combined[:-1]]))
+        return np.sort(order[combined > previous_max])
+
+    # Кілька обмежень: у кожній групі стани за спаданням значення, доміновані попередніми відкидаються
+    order = np.lexsort((usage.sum(axis=1), -secondary, -values, group))
+    starts = np.flatnonzero(np.diff(group[order], prepend=-1))
+    keep = [ranked[~_dominated(usage[ranked], block_cells)] for ranked in np.split(order, starts[1:])]
+    return np.sort(np.concatenate(keep))
+
+def _pair_ranks(primary, secondary):
+    # Номер кожної пари (основний, другорядний) серед різних пар у лексикографічному порядку
+    order = np.lexsort((secondary, primary))
+    changed = (np.diff(primary[order]) != 0) | (np.diff(secondary[order]) != 0)
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.concatenate([[0], np.cumsum(changed)])
+    return ranks
+
+def generate_rule_combinations(projects, budget, rules, capacities=None):
+    """
+    Генерує всі допустимі комбінації проєктів з урахуванням правил вибору.
+
+    Перебір іде кроками в порядку залежностей: з групи взаємовиключних проєктів
+    вибирається не більше одного, а проєкт розглядається лише тоді, коли вже вибрано
+    всі потрібні йому проєкти, тож недопустимі гілки відкидаються одразу. Проєкти
+    без правил перебираються останніми, однакові з них - як один клас із кількістю копій.
+
+    Аргументи:
+        projects: Portfolio або список проєктів [вартість, прибуток, експертна_оцінка]
+        budget: Доступний бюджет
+        rules: Правила з project_rules
+        capacities: Доступні обсяги додаткових ресурсів портфеля (None - лише бюджет)
+
+    Повертає:
+        list: Список кортежів (комбінація, вартість, прибуток, експертна_оцінка)
+    """
+    portfolio = as_portfolio(projects)
+    n = len(portfolio)
+    usage, limits = _usage_limits(portfolio, budget, capacities)
+    units, prerequisites = rule_units(rules, n)
+    allowed = allowed_projects(usage, limits, rules, units, prerequisites)
+
+    # Проєкти без правил об'єднуються в класи однакових проєктів
+    constrained = {i for pair in rules['requires'] for i in pair} | {i for group in rules['exclusive'] for i in group}
+    free = [i for i in range(n) if i not in constrained]
+    _, _, members = group_identical_projects(portfolio.take(np.array(free, dtype=int)))
+    steps = [('choice', unit) for unit in units if unit[0] in constrained]
+    steps += [('class', tuple(free[j] for j in member)) for member in members]
+
+    # Перетворюємо стовпці на числа Python один раз перед перебором
+    costs = portfolio.cost.tolist()
+    profits, experts = criterion_lists(portfolio)
+    usage_rows = usage.tolist()
+
+    # Та сама відносна похибка, що й у solve_knapsack_rules
+    limits = (limits + 1e-9 * np.maximum(1.0, limits)).tolist()
+    solution = [0] * n
+    result = []
+
+    def fits(current_usage, i, count=1):
+        return all(used + count * amount <= limit for used, amount, limit in zip(current_usage, usage_rows[i], limits))
+
+    def backtrack(step, mask, current_usage, current_cost, current_profit, current_expert):
+        if step == len(steps):
+            result.append((solution.copy(), current_cost, current_profit, current_expert))
+            return
+
+        kind, unit = steps[step]
+        if kind == 'choice':
+            # Не вибираємо жодного проєкту кроку або вибираємо один допустимий
+            backtrack(step + 1, mask, current_usage, current_cost, current_profit, current_expert)
+            for i in unit:
+                if allowed[i] and mask & prerequisites[i] == prerequisites[i] and fits(current_usage, i):
+                    solution[i] = 1
+                    backtrack(step + 1, mask | (1 << i),
+                              [used + amount for used, amount in zip(current_usage, usage_rows[i])],
+                              current_cost + costs[i], current_profit + profits[i], current_expert + experts[i])
+                    solution[i] = 0
+            return
+
+        # Клас однакових проєктів: перебираємо кількість копій, доки вони вкладаються
+        first = unit[0]
+        for count in range(len(unit) + 1):
+            if not fits(current_usage, first, count):
+                break
+            for i in unit[:count]:
+                solution[i] = 1
+            backtrack(step + 1, mask,
+                      [used + count * amount for used, amount in zip(current_usage, usage_rows[first])],
+                      current_cost + count * costs[first], current_profit + count * profits[first], current_expert + count * experts[first])
+            for i in unit[:count]:
+                solution[i] = 0
+
+    backtrack(0, 0, [0] * len(limits), 0, 0, 0)
+    return result
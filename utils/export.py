@@ -0,0 +1,124 @@
+import gzip
+import os
+import tempfile
+import numpy as np
+from .combinations import query_candidates
+from .tables import create_candidate_page_df, create_dp_table_df
+from .ingest import _import_pyarrow
+
+# Формати експорту: розширення файлу та MIME-тип
+EXPORT_FORMATS = {
+    'csv.gz': {'suffix': '.csv.gz', 'mime': 'application/gzip'},
+    'parquet': {'suffix': '.parquet', 'mime': 'application/vnd.apache.parquet'},
+}
+
+# Найбільший розмір файлу, який застосунок віддає кнопкою завантаження: кнопка тримає весь
+# файл у пам'яті й передає його одним повідомленням (типове обмеження Streamlit - 200 МБ)
+MAX_DOWNLOAD_BYTES = 200 * 2**20
+
+# Кількість рядків (або комірок таблиці ДП) в одній частині експорту
+DEFAULT_CHUNK_ROWS = 50_000
+DEFAULT_CHUNK_CELLS = 5_000_000
+
+def iter_candidate_frames(store, criteria_names=("Прибуток", "Експертна оцінка"), indices=None,
+                          chunksize=DEFAULT_CHUNK_ROWS):
+    """
+    Повертає кандидатів сховища частинами у вигляді DataFrame (за рангом, якщо він є).
+
+    Аргументи:
+        store: Сховище кандидатів
+        criteria_names: Назви критеріїв для стовпців таблиці
+        indices: Індекси кандидатів у потрібному порядку (за замовчуванням усі)
+        chunksize: Кількість рядків в одній частині
+
+    Повертає:
+        generator: Частини таблиці кандидатів
+    """
+    if indices is None:
+        indices = query_candidates(store) if 'rank' in store else np.arange(len(store['cost']))
+
+    for start in range(0, len(indices), chunksize):
+        yield create_candidate_page_df(store, indices[start:start + chunksize], criteria_names)
+
+def iter_dp_frames(dp, budget, criterion_name, chunk_cells=DEFAULT_CHUNK_CELLS):
+    """
+    Повертає таблицю ДП частинами по кілька рядків у вигляді DataFrame.
+
+    Аргументи:
+        dp: Таблиця динамічного програмування
+        budget: Максимальний бюджет (в одиницях таблиці ДП)
+        criterion_name: Назва критерію, який максимізується
+        chunk_cells: Найбільша кількість комірок в одній частині
+
+    Повертає:
+        generator: Частини таблиці ДП
+    """
+    rows_per_chunk = max(1, chunk_cells // (budget + 1))
+
+    for start in range(0, len(dp), rows_per_chunk):
+        rows = np.arange(start, min(start + rows_per_chunk, len(dp)))
+        yield create_dp_table_df(dp, budget, criterion_name, rows)
+
+def write_frames(frames, path, file_format='csv.gz'):
+    """
+    Записує частини таблиці у файл gzip CSV або Parquet одну за одною.
+
+    Аргументи:
+        frames: Ітерований набір DataFrame з однаковими стовпцями
+        path: Шлях до файлу
+        file_format: Формат файлу ('csv.gz' або 'parquet')
+
+    Повертає:
+        int: Кількість записаних рядків
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Непідтримуваний формат експорту: {file_format}")
+
+    total = 0
+
+    if file_format == 'parquet':
+        pa = _import_pyarrow('lib')
+        pq = _import_pyarrow('parquet')
+        writer = None
+        try:
+            for frame in frames:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema, compression='zstd')
+                writer.write_table(table.cast(writer.schema))
+                total += len(frame)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            # Порожній результат - файл без стовпців
+            pq.write_table(pa.table({}), path)
+    else:
+        with gzip.open(path, 'wt', encoding='utf-8', newline='') as file:
+            for i, frame in enumerate(frames):
+                frame.to_csv(file, index=False, header=i == 0)
+                total += len(frame)
+
+    return total
+
+def export_to_tempfile(frames, file_format='csv.gz'):
+    """
+    Записує частини таблиці в тимчасовий файл, щоб не тримати весь експорт у пам'яті.
+
+    Аргументи:
+        frames: Ітерований набір DataFrame з однаковими стовпцями
+        file_format: Формат файлу ('csv.gz' або 'parquet')
+
+    Повертає:
+        tuple: (шлях до тимчасового файлу, кількість записаних рядків)
+    """
+    handle, path = tempfile.mkstemp(suffix=EXPORT_FORMATS[file_format]['suffix'])
+    os.close(handle)
+
+    try:
+        total = write_frames(frames, path, file_format)
+    except Exception:
+        os.remove(path)
+        raise
+
+    return path, total
@@ -0,0 +1,186 @@
+import os
+import numpy as np
+import pandas as pd
+from .portfolio import Portfolio
+
+# Обов'язкові стовпці файлу з даними про проєкти (у порядку рядка проєкту)
+REQUIRED_COLUMNS = ["Cost", "Profit", "ExpertScore"]
+
+# Розширення файлів для кожного підтримуваного формату
+FILE_FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow',
+}
+
+def detect_format(source, file_format=None):
+    """
+    Визначає формат файлу (csv, parquet або arrow) за його назвою.
+
+    Аргументи:
+        source: Шлях до файлу або завантажений файл з атрибутом name
+        file_format: Явно заданий формат (має пріоритет)
+
+    Повертає:
+        str: Формат файлу
+    """
+    if file_format is not None:
+        return file_format
+
+    name = source if isinstance(source, (str, os.PathLike)) else getattr(source, 'name', '')
+    extension = os.path.splitext(str(name))[1].lower()
+    return FILE_FORMATS.get(extension, 'csv')
+
+def read_columns(source, file_format=None):
+    """
+    Зчитує лише назви стовпців файлу без завантаження даних.
+
+    Аргументи:
+        source: Шлях до файлу або файловий об'єкт
+        file_format: Формат файлу (за замовчуванням визначається за назвою)
+
+    Повертає:
+        list: Назви стовпців
+    """
+    file_format = detect_format(source, file_format)
+    _rewind(source)
+
+    if file_format == 'parquet':
+        pq = _import_pyarrow('parquet')
+        columns = pq.ParquetFile(source).schema_arrow.names
+    elif file_format == 'arrow':
+        columns = _open_arrow(source).schema.names
+    else:
+        columns = pd.read_csv(source, nrows=0).columns.tolist()
+
+    _rewind(source)
+    return list(columns)
+
+def resolve_columns(columns, required=REQUIRED_COLUMNS):
+    """
+    Знаходить фактичні назви обов'язкових стовпців без урахування регістру та пробілів.
+
+    Аргументи:
+        columns: Назви стовпців файлу
+        required: Назви обов'язкових стовпців
+
+    Повертає:
+        list: Фактичні назви стовпців у порядку required
+    """
+    lookup = {}
+    for column in columns:
+        lookup.setdefault(str(column).strip().lower(), column)
+
+    missing = [name for name in required if name.lower() not in lookup]
+    if missing:
+        raise ValueError(f"Файл повинен містити стовпці {', '.join(required)} (відсутні: {', '.join(missing)})")
+
+    return [lookup[name.lower()] for name in required]
+
+def read_projects(source, file_format=None, extra_columns=(), chunksize=50_000, resource_columns=()):
+    """
+    Зчитує дані про проєкти з CSV, Parquet або Arrow IPC файлу частинами.
+
+    Стовпці визначаються один раз за заголовком, кожна частина перетворюється на
+    типізовані масиви, а некоректні рядки пропускаються і повертаються списком.
+
+    Аргументи:
+        source: Шлях до файлу або файловий об'єкт
+        file_format: Формат файлу (за замовчуванням визначається за назвою)
+        extra_columns: Додаткові стовпці, які використовуються як критерії
+        chunksize: Кількість рядків в одній частині
+        resource_columns: Стовпці витрат додаткових обмежених ресурсів (години, обладнання)
+
+    Повертає:
+        tuple: (Portfolio з коректних рядків, список помилок {'Рядок', 'Стовпець', 'Значення'})
+    """
+    columns = resolve_columns(read_columns(source, file_format)) + list(extra_columns) + list(resource_columns)
+
+    parts = []
+    errors = []
+    offset = 0
+
+    for chunk in _iter_chunks(source, detect_format(source, file_format), columns, chunksize):
+        values, chunk_errors = _validate_chunk(chunk, columns, offset, len(resource_columns))
+        parts.append(values)
+        errors.extend(chunk_errors)
+        offset += len(chunk)
+
+    errors.sort(key=lambda error: error['Рядок'])
+
+    if parts:
+        data = [np.concatenate([part[j] for part in parts]) for j in range(len(columns))]
+    else:
+        data = [np.array([]) for _ in columns]
+
+    n_criteria = len(columns) - len(resource_columns) - 1
+    return Portfolio(data[0], data[1:1 + n_criteria], data[1 + n_criteria:]), errors
+
+def _iter_chunks(source, file_format, columns, chunksize):
+    # Повертає частини файлу як DataFrame лише з потрібними стовпцями
+    _rewind(source)
+
+    if file_format == 'parquet':
+        pq = _import_pyarrow('parquet')
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    elif file_format == 'arrow':
+        reader = _open_arrow(source)
+        if hasattr(reader, 'num_record_batches'):
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        else:
+            batches = reader
+        for batch in batches:
+            for start in range(0, batch.num_rows, chunksize):
+                yield batch.slice(start, chunksize).select(columns).to_pandas()
+    else:
+        wanted = set(columns)
+        yield from pd.read_csv(source, usecols=lambda column: column in wanted, chunksize=chunksize)
+
+def _validate_chunk(chunk, columns, offset, n_resources=0):
+    # Перетворює стовпці частини на числа і знаходить некоректні рядки одразу для всієї частини
+    numeric = [pd.to_numeric(chunk[column], errors='coerce').to_numpy(dtype=float) for column in columns]
+
+    invalid = [~np.isfinite(values) for values in numeric]
+    cost = numeric[0]
+    invalid[0] |= cost < 0
+
+    # Витрати ресурсів (останні стовпці), як і вартість, не можуть бути від'ємними
+    for j in range(len(columns) - n_resources, len(columns)):
+        invalid[j] |= numeric[j] < 0
+
+    bad_rows = np.logical_or.reduce(invalid)
+    errors = []
+    for j in np.flatnonzero([mask.any() for mask in invalid]):
+        raw = chunk[columns[j]].to_numpy()
+        for i in np.flatnonzero(invalid[j]):
+            errors.append({
+                'Рядок': int(offset + i + 1),
+                'Стовпець': columns[j],
+                'Значення': str(raw[i])
+            })
+
+    return [values[~bad_rows] for values in numeric], errors
+
+def _open_arrow(source):
+    # Arrow IPC може бути у форматі файлу (Feather v2) або потоку
+    ipc = _import_pyarrow('ipc')
+    _rewind(source)
+    try:
+        return ipc.open_file(source)
+    except Exception:
+        _rewind(source)
+        return ipc.open_stream(source)
+
+def _import_pyarrow(module):
+    try:
+        return __import__(f'pyarrow.{module}', fromlist=[module])
+    except ImportError:
+        raise ValueError("Для читання файлів Parquet та Arrow потрібен пакет pyarrow")
+
+def _rewind(source):
+    if hasattr(source, 'seek'):
+        source.seek(0)
@@ -0,0 +1,52 @@
+import numpy as np
+from .portfolio import Portfolio
+
+# Стандартні сімейства задач про рюкзак для вимірювання продуктивності
+FAMILIES = ('uncorrelated', 'weakly_correlated', 'strongly_correlated', 'many_duplicates')
+
+def generate_instance(family, n, seed=0, value_range=100, budget_ratio=0.5, duplicate_classes=5):
+    """
+    Генерує випадкову задачу вибору проєктів заданого сімейства.
+
+    Сімейства відповідають стандартним тестовим задачам про рюкзак:
+    - uncorrelated: вартість і прибуток незалежні, рівномірні на [1, R];
+    - weakly_correlated: прибуток = вартість ± R/10;
+    - strongly_correlated: прибуток = вартість + R/10;
+    - many_duplicates: кілька різних проєктів, повторених багато разів.
+    Експертна оцінка завжди рівномірна на [1, R] і не залежить від вартості.
+
+    Аргументи:
+        family: Назва сімейства (див. FAMILIES)
+        n: Кількість проєктів
+        seed: Зерно генератора випадкових чисел
+        value_range: Найбільше значення вартості та критеріїв R
+        budget_ratio: Бюджет як частка сумарної вартості
+        duplicate_classes: Кількість різних проєктів для сімейства many_duplicates
+
+    Повертає:
+        tuple: (Portfolio проєктів, бюджет)
+    """
+    if family not in FAMILIES:
+        raise ValueError(f"Невідоме сімейство задач: {family}")
+
+    rng = np.random.default_rng(seed)
+    R = value_range
+
+    if family == 'many_duplicates':
+        # Генеруємо кілька різних проєктів і вибираємо кожен проєкт з них
+        projects, _ = generate_instance('uncorrelated', duplicate_classes, seed, value_range)
+        rows = rng.integers(0, duplicate_classes, n)
+        portfolio = projects.take(rows)
+    else:
+        cost = rng.integers(1, R + 1, n)
+        if family == 'uncorrelated':
+            profit = rng.integers(1, R + 1, n)
+        elif family == 'weakly_correlated':
+            profit = np.maximum(cost + rng.integers(-(R // 10), R // 10 + 1, n), 1)
+        else:
+            profit = cost + R // 10
+        expert = rng.integers(1, R + 1, n)
+        portfolio = Portfolio(cost, [profit, expert])
+
+    budget = int(portfolio.cost.sum() * budget_ratio)
+    return portfolio, budget
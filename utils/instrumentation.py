@@ -0,0 +1,120 @@
+import cProfile
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# tracemalloc спільний для всього процесу, тому запуски, яким він потрібен, рахуються
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+@contextmanager
+def record_stage(records, name, items=None):
+    """
+    Вимірює час виконання етапу та пікове виділення пам'яті (якщо ввімкнено tracemalloc).
+
+    Після завершення етапу запис додається до records і виводиться в журнал
+    одним рядком JSON. Етапи не повинні бути вкладеними, бо вимірювання пам'яті
+    скидає пік, спільний для всього процесу. З тієї ж причини пік не надійний,
+    коли етапи кількох сесій Streamlit виконуються одночасно: він включає їхні
+    виділення і скидається ними, тож peak_bytes тоді лише орієнтовний.
+
+    Аргументи:
+        records: Список, до якого додається запис етапу (None - лише журнал)
+        name: Назва етапу
+        items: Кількість оброблених елементів (можна задати пізніше через запис)
+
+    Повертає:
+        dict: Запис етапу {'stage', 'items', 'seconds', 'peak_bytes'}
+    """
+    record = {'stage': name, 'items': items}
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+
+    try:
+        yield record
+    finally:
+        record['seconds'] = time.perf_counter() - start
+        # Трасування могли вимкнути під час етапу, тоді пік невідомий
+        tracing = tracing and tracemalloc.is_tracing()
+        record['peak_bytes'] = tracemalloc.get_traced_memory()[1] - start_memory if tracing else None
+        if records is not None:
+            records.append(record)
+        logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+def enable_stage_logging(level=logging.INFO):
+    """
+    Вмикає виведення записів етапів у стандартний потік помилок рядками JSON.
+
+    Аргументи:
+        level: Рівень журналу
+    """
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+    logger.setLevel(level)
+
+def disable_stage_logging():
+    """Вимикає виведення записів етапів (записи в records додаються й далі)"""
+    logger.setLevel(logging.WARNING)
+
+def start_memory_tracing():
+    """
+    Вмикає tracemalloc для одного запуску аналізу.
+
+    Трасування спільне для процесу, тому кожен виклик треба завершити stop_memory_tracing:
+    tracemalloc вимикається лише після завершення останнього запуску, який його використовує.
+    """
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0:
+            tracemalloc.start()
+        _tracing_users += 1
+
+def stop_memory_tracing():
+    """Завершує трасування пам'яті, розпочате start_memory_tracing"""
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users = max(_tracing_users - 1, 0)
+        if _tracing_users == 0:
+            tracemalloc.stop()
+
+def profile_to_bytes(profiler):
+    """
+    Зберігає результати cProfile у форматі pstats (для snakeviz, pstats тощо).
+
+    Аргументи:
+        profiler: Об'єкт cProfile.Profile
+
+    Повертає:
+        bytes: Вміст файлу .prof
+    """
+    handle, path = tempfile.mkstemp(suffix='.prof')
+    os.close(handle)
+    try:
+        profiler.dump_stats(path)
+        with open(path, 'rb') as file:
+            return file.read()
+    finally:
+        os.remove(path)
+
+def start_profiler():
+    """
+    Створює та запускає cProfile для одного запуску аналізу.
+
+    Повертає:
+        cProfile.Profile: Запущений профайлер
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
@@ -1,22 +1,64 @@
-import pandas as pd
+import heapq
 import numpy as np
+from .normalize import criteria_matrix, normalize_matrix
+from .portfolio import as_portfolio
+from .scaling import plan_precision, DEFAULT_MAX_DP_CELLS
+from .multiplicity import group_identical_projects, binary_split, expand_class_counts
+from .resources import solve_knapsack_resources
+from .dependencies import solve_knapsack_rules
 
-def solve_knapsack(projects, budget, criterion_index):
-    n = len(projects)
+def solve_knapsack(projects, budget, criterion_index, precision=None, capacities=None, rules=None):
+    """
+    Розв'язує задачу про рюкзак 0/1 для одного критерію.
+    
+    Вартості та бюджет переводяться в цілі одиниці (див. plan_precision), тому
+    стовпці таблиці ДП і шлях рішення задані в цих одиницях. Якщо задано обсяги
+    додаткових ресурсів, задача розв'язується розрідженим методом з кількома
+    обмеженнями (solve_knapsack_resources), і таблиця ДП не будується. Так само
+    задача з правилами вибору проєктів розв'язується методом solve_knapsack_rules,
+    а задача, таблиця ДП якої для вибраної точності завелика, - методом solve_knapsack_sparse.
+    
+    Аргументи:
+        projects: Portfolio або список проєктів [вартість, прибуток, експертна_оцінка]
+        budget: Доступний бюджет
+        criterion_index: Індекс критерію, який максимізується
+        precision: Кількість знаків після коми у вартостях (None - найменша точна)
+        capacities: Доступні обсяги додаткових ресурсів портфеля (None - лише бюджет)
+        rules: Залежності та групи взаємовиключних проєктів (див. project_rules) або None
+        
+    Повертає:
+        tuple: (рішення, максимальне значення, таблиця ДП або None, шлях комірок рішення)
+    """
+    if rules is not None:
+        solution, max_value = solve_knapsack_rules(projects, budget, criterion_index, rules, capacities=capacities)
+        return solution, max_value, None, []
+    if capacities is not None:
+        solution, max_value = solve_knapsack_resources(projects, budget, capacities, criterion_index)
+        return solution, max_value, None, []
+    
+    portfolio = as_portfolio(projects)
+    plan = plan_precision(portfolio.cost, budget, precision)
+    if plan['engine'] == 'sparse':
+        # Таблиця ДП для такої точності завелика - розріджений метод без таблиці
+        solution, max_value = solve_knapsack_sparse(portfolio, budget, criterion_index)
+        return solution, max_value, None, []
+    
+    costs = plan['costs']
+    budget = plan['budget']
+    values = portfolio.column(criterion_index)
+    n = len(portfolio)
     
     # Створюємо таблицю ДП
-    dp = [[0] * (budget + 1) for _ in range(n + 1)]
+    dp = np.zeros((n + 1, budget + 1), dtype=values.dtype)
     
-    # Заповнюємо таблицю
+    # Заповнюємо таблицю: кожен рядок - одна векторна операція над попереднім рядком
     for i in range(1, n + 1):
-        cost = projects[i-1][0]
-        value = projects[i-1][criterion_index]
+        cost = costs[i-1]
+        value = values[i-1]
         
-        for w in range(budget + 1):
-            if cost <= w:
-                dp[i][w] = max(dp[i-1][w], dp[i-1][w-cost] + value)
-            else:
-                dp[i][w] = dp[i-1][w]
+        dp[i] = dp[i-1]
+        if cost <= budget:
+            dp[i, cost:] = np.maximum(dp[i-1, cost:], dp[i-1, :budget + 1 - cost] + value)
     
     # Відновлюємо рішення
     solution = [0] * n
@@ -26,10 +68,10 @@ def solve_knapsack(projects, budget, criterion_index):
     solution_path = []
     
     for i in range(n, 0, -1):
-        cost = projects[i-1][0]
-        value = projects[i-1][criterion_index]
+        cost = costs[i-1].item()
+        value = values[i-1]
         
-        if w >= cost and dp[i][w] == dp[i-1][w-cost] + value:
+        if w >= cost and dp[i, w] == dp[i-1, w-cost] + value:
             solution[i-1] = 1
             solution_path.append((i, w))
             w -= cost
@@ -43,26 +85,488 @@ def solve_knapsack(projects, budget, criterion_index):
     # Обертаємо для отримання шляху від початку до кінця
     solution_path.reverse()
     
-    return solution, dp[n][budget], dp, solution_path
+    return solution, dp[n, budget].item(), dp, solution_path
+
+def _split_items(projects, criterion_indices, budget, precision):
+    """Групує однакові проєкти і будує псевдопроєкти двійкового розбиття"""
+    classes, counts, members = group_identical_projects(projects)
+    _, values = criteria_matrix(classes, criterion_indices)
+    plan = plan_precision(classes.cost, budget, precision)
+    items = binary_split(counts)
+    
+    class_ids = np.array([class_id for class_id, _ in items], dtype=int)
+    units = np.array([taken for _, taken in items], dtype=int)
+    item_costs = plan['costs'][class_ids] * units
+    item_values = values[class_ids] * units[:, None]
+    
+    return class_ids, units, item_costs, item_values, members, plan
+
+def _restore_solution(dp, item_costs, class_ids, units, members, n, budget, j=0):
+    """Відновлює вектор x_i за таблицею ДП над псевдопроєктами"""
+    class_counts = [0] * len(members)
+    w = budget
+    
+    # Псевдопроєкт узято, якщо значення в комірці змінилося
+    for k in range(len(item_costs), 0, -1):
+        if dp[k, w, j] != dp[k-1, w, j]:
+            class_counts[class_ids[k-1]] += int(units[k-1])
+            w -= int(item_costs[k-1])
+    
+    return expand_class_counts(class_counts, members, n), class_counts
 
-def create_dp_table_df(dp, budget, criterion_name):
+def solve_bounded_knapsack(projects, budget, criterion_index, precision=None):
     """
-    Створює pandas DataFrame з таблиці ДП для відображення
+    Розв'язує задачу про рюкзак, об'єднуючи однакові проєкти в класи.
+    
+    Кожен клас розбивається на псевдопроєкти з 1, 2, 4, ... копій, тому розмір таблиці ДП
+    залежить від log(кількості копій), а не від кількості однакових проєктів.
     
     Аргументи:
-        dp: Таблиця динамічного програмування
-        budget: Максимальний бюджет
-        criterion_name: Назва критерію, який максимізується
+        projects: Portfolio або список проєктів [вартість, прибуток, експертна_оцінка]
+        budget: Доступний бюджет
+        criterion_index: Індекс критерію, який максимізується
+        precision: Кількість знаків після коми у вартостях (None - найменша точна)
+        
+    Повертає:
+        tuple: (рішення, максимальне значення, кількість вибраних проєктів кожного класу)
+    """
+    solutions, max_values, _, class_counts = solve_knapsack_multi(projects, budget, [criterion_index], precision)
+    return solutions[0].tolist(), max_values[0].item(), class_counts[0]
+
+def solve_knapsack_multi(projects, budget, criterion_indices, precision=None):
+    """
+    Розв'язує задачу про рюкзак одночасно для кількох критеріїв.
+    
+    Однакові проєкти об'єднуються в класи з двійковим розбиттям. Таблиця ДП має розмір
+    (кількість псевдопроєктів + 1) × (budget + 1) × m, і кожен рядок заповнюється
+    однією векторною операцією для всіх критеріїв. Якщо таблиця для вибраної точності
+    вартостей завелика, використовується розріджений метод (таблиця ДП не повертається).
+    
+    Аргументи:
+        projects: Portfolio або список проєктів [вартість, критерій1, ..., критерійm]
+        budget: Доступний бюджет
+        criterion_indices: Індекси стовпців критеріїв, які максимізуються
+        precision: Кількість знаків після коми у вартостях (None - найменша точна)
+        
+    Повертає:
+        tuple: (рішення розміром m × n, максимальні значення критеріїв, таблиця ДП або None,
+                кількості вибраних проєктів кожного класу для кожного критерію)
+    """
+    class_ids, units, item_costs, item_values, members, plan = _split_items(projects, criterion_indices, budget, precision)
+    k, m = item_values.shape
+    
+    if plan['engine'] == 'sparse':
+        return _solve_multi_sparse(projects, budget, criterion_indices, members)
+    
+    budget = plan['budget']
+    
+    # Заповнюємо таблицю для всіх критеріїв одночасно
+    dp = np.zeros((k + 1, budget + 1, m), dtype=item_values.dtype)
+    for i in range(1, k + 1):
+        cost = item_costs[i-1]
+        dp[i] = dp[i-1]
+        if cost <= budget:
+            dp[i, cost:] = np.maximum(dp[i-1, cost:], dp[i-1, :budget + 1 - cost] + item_values[i-1])
+    
+    # Відновлюємо рішення для кожного критерію
+    solutions = np.zeros((m, len(projects)), dtype=int)
+    class_counts = []
+    for j in range(m):
+        solution, counts = _restore_solution(dp, item_costs, class_ids, units, members, len(projects), budget, j)
+        solutions[j] = solution
+        class_counts.append(counts)
+    
+    return solutions, dp[k, budget], dp, class_counts
+
+def _solve_multi_sparse(projects, budget, criterion_indices, members):
+    """Розв'язує задачу для кожного критерію розрідженим методом"""
+    results = [solve_knapsack_sparse(projects, budget, index) for index in criterion_indices]
+    solutions = np.array([solution for solution, _ in results], dtype=int).reshape(len(results), len(projects))
+    max_values = np.array([value for _, value in results])
+    
+    # Кількості вибраних проєктів кожного класу
+    class_counts = [[int(solution[member].sum()) for member in members] for solution in solutions]
+    
+    return solutions, max_values, None, class_counts
+
+def solve_knapsack_sparse(projects, budget, criterion_index, secondary_criterion_index=None):
+    """
+    Розв'язує задачу про рюкзак без таблиці ДП, зберігаючи лише недоміновані стани.
+    
+    Стан - це пара (вартість, значення) разом з вибраними проєктами. Стан відкидається,
+    якщо існує не дорожчий стан з не меншим значенням, тому вартості можуть бути дробовими,
+    а розмір задачі не залежить від точності вартостей. Якщо задано другорядний критерій,
+    значення стану - пара (основний, другорядний), яка порівнюється лексикографічно.
+    
+    Аргументи:
+        projects: Portfolio або список проєктів [вартість, прибуток, експертна_оцінка]
+        budget: Доступний бюджет
+        criterion_index: Індекс критерію, який максимізується
+        secondary_criterion_index: Індекс критерію, який максимізується серед рівних за основним
+        
+    Повертає:
+        tuple: (рішення, максимальне значення)
+    """
+    portfolio = as_portfolio(projects)
+    costs = portfolio.cost.astype(float)
+    values = portfolio.column(criterion_index)
+    secondary = portfolio.column(secondary_criterion_index) if secondary_criterion_index is not None else None
+    n = len(portfolio)
+    limit = budget + 1e-9 * max(1.0, abs(budget))
+    
+    # Початковий стан - порожня множина проєктів
+    state_costs = np.zeros(1)
+    state_values = np.zeros(1, dtype=values.dtype)
+    state_secondary = np.zeros(1, dtype=secondary.dtype if secondary is not None else values.dtype)
+    state_masks = np.array([0], dtype=object)
+    
+    for i in range(n):
+        fits = state_costs + costs[i] <= limit
+        all_costs = np.concatenate([state_costs, state_costs[fits] + costs[i]])
+        all_values = np.concatenate([state_values, state_values[fits] + values[i]])
+        all_masks = np.concatenate([state_masks, state_masks[fits] | (1 << i)])
+        if secondary is None:
+            all_secondary = np.concatenate([state_secondary, state_secondary[fits]])
+            keys = all_values
+        else:
+            all_secondary = np.concatenate([state_secondary, state_secondary[fits] + secondary[i]])
+            keys = _lexicographic_rank(all_values, all_secondary)
+        
+        # Сортуємо за вартістю (за зростанням), а однакові вартості - за значенням (за спаданням)
+        order = np.lexsort((-keys, all_costs))
+        all_costs, all_values, all_masks, keys = all_costs[order], all_values[order], all_masks[order], keys[order]
+        all_secondary = all_secondary[order]
+        
+        # Залишаємо стани, значення яких більше, ніж у будь-якого дешевшого стану
+        previous_max = np.maximum.accumulate(np.concatenate([[-np.inf], keys[:-1]]))
+        keep = keys > previous_max
+        state_costs, state_values, state_masks = all_costs[keep], all_values[keep], all_masks[keep]
+        state_secondary = all_secondary[keep]
+    
+    # Значення строго зростають з вартістю, тому найкращий стан - останній
+    mask = state_masks[-1]
+    solution = [(mask >> i) & 1 for i in range(n)]
+    
+    return solution, state_values[-1].item()
+
+def _lexicographic_rank(primary, secondary):
+    """Номер кожної пари (основний, другорядний) серед різних пар у лексикографічному порядку"""
+    order = np.lexsort((secondary, primary))
+    changed = (np.diff(primary[order]) != 0) | (np.diff(secondary[order]) != 0)
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.concatenate([[0], np.cumsum(changed)])
+    return ranks
+
+def solve_lexicographic_knapsack(projects, budget, primary_criterion_index, secondary_criterion_index,
+                                 precision=None):
+    """
+    Розв'язує задачу про рюкзак з лексикографічним порядком критеріїв.
+    
+    Максимізується основний критерій, а серед рішень з однаковим основним критерієм -
+    другорядний. Кожна комірка таблиці ДП зберігає пару (основний, другорядний), і нова
+    пара замінює стару лише тоді, коли вона лексикографічно більша, тож обидва критерії
+    оптимізуються за один прохід. Однакові проєкти об'єднуються в класи з двійковим
+    розбиттям; для завеликої таблиці використовується розріджений метод.
+    
+    Аргументи:
+        projects: Portfolio або список проєктів [вартість, прибуток, експертна_оцінка]
+        budget: Доступний бюджет
+        primary_criterion_index: Індекс основного критерію
+        secondary_criterion_index: Індекс другорядного критерію
+        precision: Кількість знаків після коми у вартостях (None - найменша точна)
+        
+    Повертає:
+        tuple: (рішення, значення основного критерію, значення другорядного критерію)
+    """
+    criterion_indices = [primary_criterion_index, secondary_criterion_index]
+    class_ids, units, item_costs, item_values, members, plan = _split_items(projects, criterion_indices, budget, precision)
+    
+    if plan['engine'] == 'sparse':
+        solution, primary_value = solve_knapsack_sparse(projects, budget, primary_criterion_index,
+                                                        secondary_criterion_index)
+        secondary = as_portfolio(projects).column(secondary_criterion_index)
+        return solution, primary_value, secondary[np.array(solution, dtype=bool)].sum().item()
+    
+    budget = plan['budget']
+    k = len(item_costs)
+    
+    # Пари значень зберігаються як таблиця k+1 × budget+1 × 2
+    dp = np.zeros((k + 1, budget + 1, 2), dtype=item_values.dtype)
+    for i in range(1, k + 1):
+        cost = item_costs[i-1]
+        dp[i] = dp[i-1]
+        if cost <= budget:
+            current = dp[i-1, cost:]
+            taken = dp[i-1, :budget + 1 - cost] + item_values[i-1]
+            better = (taken[:, 0] > current[:, 0]) | ((taken[:, 0] == current[:, 0]) & (taken[:, 1] > current[:, 1]))
+            dp[i, cost:] = np.where(better[:, None], taken, current)
+    
+    # Пара в комірці змінюється лише тоді, коли псевдопроєкт узято
+    class_counts = [0] * len(members)
+    w = budget
+    for i in range(k, 0, -1):
+        if (dp[i, w] != dp[i-1, w]).any():
+            class_counts[class_ids[i-1]] += int(units[i-1])
+            w -= int(item_costs[i-1])
+    
+    primary_value, secondary_value = dp[k, budget].tolist()
+    return expand_class_counts(class_counts, members, len(projects)), primary_value, secondary_value
+
+def solve_knapsack_k_best(projects, budget, criterion_index, k, precision=None):
+    """
+    Знаходить k найкращих різних рішень задачі про рюкзак 0/1 для одного критерію.
+    
+    Кожна комірка таблиці ДП зберігає k найбільших значень серед різних рішень з вартістю
+    не більше за стовпець. Однакові проєкти об'єднуються в класи, і новий рядок - це
+    k найбільших з об'єднання списків "0, 1, ..., m копій класу", які описують різні рішення,
+    тож рішення, що відрізняються лише вибором серед однакових проєктів, не повторюються.
+    Для кожного значення запам'ятовується, зі скількох копій і з якої позиції воно взяте,
+    і всі k рішень відновлюються одним зворотним проходом. Час і пам'ять - порядку
+    k·n·budget, тому для завеликої таблиці використовується розріджений метод.
+    
+    Аргументи:
+        projects: Portfolio або список проєктів [вартість, прибуток, експертна_оцінка]
+        budget: Доступний бюджет
+        criterion_index: Індекс критерію, який максимізується
+        k: Кількість найкращих рішень
+        precision: Кількість знаків після коми у вартостях (None - найменша точна)
+        
+    Повертає:
+        tuple: (рішення, значення критерію) - не більше k рішень за спаданням значення
+    """
+    if k < 1:
+        raise ValueError("Кількість найкращих рішень має бути додатною")
+    
+    portfolio = as_portfolio(projects)
+    classes, counts, members = group_identical_projects(portfolio)
+    plan = plan_precision(classes.cost, budget, precision, DEFAULT_MAX_DP_CELLS // k)
+    if plan['engine'] == 'sparse':
+        return _k_best_sparse(portfolio, classes, counts, members, budget, criterion_index, k)
+    
+    costs = plan['costs']
+    budget = plan['budget']
+    class_values = classes.column(criterion_index)
+    
+    # Рядок таблиці - budget+1 × k значень за спаданням; спочатку є лише порожнє рішення
+    best = np.full((budget + 1, k), -np.inf)
+    best[:, 0] = 0
+    
+    # Позиція кожного значення в об'єднаному списку: позиція // k - кількість узятих копій класу
+    sources = []
+    for c, count in enumerate(counts):
+        cost = costs[c]
+        copies = count if cost == 0 else min(count, budget // cost)
+        merged = np.full((budget + 1, (copies + 1) * k), -np.inf)
+        for t in range(copies + 1):
+            merged[t * cost:, t * k:(t + 1) * k] = best[:budget + 1 - t * cost] + t * class_values[c]
+        
+        order = np.argsort(-merged, axis=1, kind='stable')[:, :k]
+        best = np.take_along_axis(merged, order, axis=1)
+        sources.append(order.astype(np.min_scalar_type(merged.shape[1])))
+    
+    # Відновлюємо всі рішення одночасно, рухаючись від останнього класу
+    found = int(np.isfinite(best[budget]).sum())
+    ranks = np.arange(found)
+    w = np.full(found, budget)
+    class_counts = np.zeros((found, len(counts)), dtype=int)
+    for c in range(len(counts) - 1, -1, -1):
+        source = sources[c][w, ranks].astype(np.int64)
+        class_counts[:, c] = source // k
+        ranks = source % k
+        w -= costs[c] * class_counts[:, c]
+    
+    solutions = [expand_class_counts(row, members, len(portfolio)) for row in class_counts.tolist()]
+    return solutions, (class_counts @ class_values).tolist()
+
+def _k_best_sparse(portfolio, classes, counts, members, budget, criterion_index, k):
+    """k найкращих рішень без таблиці ДП: стан відкидається, якщо є k не дорожчих станів з не меншим значенням"""
+    costs = classes.cost.astype(float)
+    class_values = classes.column(criterion_index)
+    limit = budget + 1e-9 * max(1.0, abs(budget))
+    
+    state_costs = np.zeros(1)
+    state_values = np.zeros(1, dtype=class_values.dtype)
+    state_masks = np.array([0], dtype=object)
+    
+    for c, count in enumerate(counts):
+        # Стани з 0, 1, ..., count копіями класу; t копій - це t перших проєктів класу
+        parts_costs, parts_values, parts_masks = [state_costs], [state_values], [state_masks]
+        for t in range(1, count + 1):
+            fits = state_costs + t * costs[c] <= limit
+            if not fits.any():
+                break
+            bits = sum(1 << int(i) for i in members[c][:t])
+            parts_costs.append(state_costs[fits] + t * costs[c])
+            parts_values.append(state_values[fits] + t * class_values[c])
+            parts_masks.append(state_masks[fits] | bits)
+        all_costs, all_values = np.concatenate(parts_costs), np.concatenate(parts_values)
+        all_masks = np.concatenate(parts_masks)
+        
+        # Переглядаємо стани за зростанням вартості; купа - k найбільших значень залишених станів
+        order = np.lexsort((-all_values, all_costs))
+        keep, heap = [], []
+        for j, value in zip(order.tolist(), all_values[order].tolist()):
+            if len(heap) < k:
+                heapq.heappush(heap, value)
+            elif value > heap[0]:
+                heapq.heapreplace(heap, value)
+            else:
+                continue
+            keep.append(j)
+        state_costs, state_values, state_masks = all_costs[keep], all_values[keep], all_masks[keep]
+    
+    top = np.argsort(-state_values, kind='stable')[:k]
+    solutions = [[(int(mask) >> i) & 1 for i in range(len(portfolio))] for mask in state_masks[top]]
+    return solutions, state_values[top].tolist()
+
+def solve_knapsack_batch(portfolios, budgets, criterion_index, precision=None, max_cells=DEFAULT_MAX_DP_CELLS,
+                         plans=None):
+    """
+    Розв'язує задачу про рюкзак для багатьох невеликих портфелів одночасно.
+
+    Портфелі доповнюються до однакової кількості проєктів нульовими проєктами, а таблиці ДП
+    усіх портфелів складаються в один масив, тож кожен рядок заповнюється однією векторною
+    операцією для всієї групи. Група обмежується max_cells комірками; портфелі, для яких
+    таблиця завелика, розв'язуються розрідженим методом.
+
+    Аргументи:
+        portfolios: Список Portfolio або списків проєктів [вартість, прибуток, експертна_оцінка]
+        budgets: Бюджет кожного портфеля
+        criterion_index: Індекс критерію, який максимізується
+        precision: Кількість знаків після коми у вартостях (None - найменша точна)
+        max_cells: Найбільша кількість комірок спільної таблиці ДП однієї групи
+        plans: Уже обчислені плани масштабування (plan_precision) кожного портфеля
+
+    Повертає:
+        tuple: (список рішень, список максимальних значень) у порядку портфелів
+    """
+    portfolios = [as_portfolio(projects) for projects in portfolios]
+    if len(budgets) != len(portfolios):
+        raise ValueError("Кількість бюджетів не збігається з кількістю портфелів")
+
+    if plans is None:
+        plans = [plan_precision(portfolio.cost, budget, precision, max_cells)
+                 for portfolio, budget in zip(portfolios, budgets)]
+    solutions = [None] * len(portfolios)
+    max_values = [None] * len(portfolios)
+
+    group, group_n, group_budget = [], 0, 0
+    for k, (portfolio, budget, plan) in enumerate(zip(portfolios, budgets, plans)):
+        if plan['engine'] == 'sparse':
+            solutions[k], max_values[k] = solve_knapsack_sparse(portfolio, budget, criterion_index)
+            continue
+
+        # Починаємо нову групу, якщо спільна таблиця перевищить обмеження
+        n, budget_units = max(group_n, len(portfolio)), max(group_budget, plan['budget'])
+        if group and (n + 1) * (len(group) + 1) * (budget_units + 1) > max_cells:
+            _solve_batch_group(group, portfolios, plans, criterion_index, solutions, max_values)
+            group, n, budget_units = [], len(portfolio), plan['budget']
+        group.append(k)
+        group_n, group_budget = n, budget_units
+
+    if group:
+        _solve_batch_group(group, portfolios, plans, criterion_index, solutions, max_values)
+
+    return solutions, max_values
+
+def _solve_batch_group(group, portfolios, plans, criterion_index, solutions, max_values):
+    """Заповнює спільну таблицю ДП для групи портфелів і записує їх рішення"""
+    size = len(group)
+    n = max(len(portfolios[k]) for k in group)
+    budgets = np.array([plans[k]['budget'] for k in group], dtype=np.int64)
+    width = budgets.max() + 1
+
+    # Нульові проєкти доповнення ніколи не змінюють значення в таблиці, тому не потрапляють у рішення
+    dtype = np.result_type(*[portfolios[k].column(criterion_index) for k in group])
+    costs = np.zeros((size, n), dtype=np.int64)
+    values = np.zeros((size, n), dtype=dtype)
+    for row, k in enumerate(group):
+        costs[row, :len(portfolios[k])] = plans[k]['costs']
+        values[row, :len(portfolios[k])] = portfolios[k].column(criterion_index)
+
+    rows = np.arange(size)
+    columns = np.arange(width)
+    dp = np.zeros((n + 1, size, width), dtype=dtype)
+    for i in range(n):
+        # Для кожного портфеля зсуваємо попередній рядок на вартість його i-го проєкту
+        source = columns - costs[:, i, None]
+        taken = dp[i][rows[:, None], np.maximum(source, 0)] + values[:, i, None]
+        dp[i+1] = np.where(source >= 0, np.maximum(dp[i], taken), dp[i])
+
+    # Відновлюємо рішення всіх портфелів одночасно
+    chosen = np.zeros((size, n), dtype=int)
+    w = budgets.copy()
+    for i in range(n, 0, -1):
+        take = dp[i, rows, w] != dp[i-1, rows, w]
+        chosen[:, i-1] = take
+        w -= costs[:, i-1] * take
+
+    for row, k in enumerate(group):
+        solutions[k] = chosen[row, :len(portfolios[k])].tolist()
+        max_values[k] = dp[n, row, budgets[row]].item()
+
+def calculate_ideal_point(projects, budget, criterion_indices, precision=None, capacities=None, rules=None):
+    """
+    Знаходить ідеальну точку в нормалізованому просторі для довільної кількості критеріїв.
+    
+    Аргументи:
+        projects: Portfolio або список проєктів [вартість, критерій1, ..., критерійm]
+        budget: Доступний бюджет
+        criterion_indices: Індекси стовпців критеріїв
+        precision: Кількість знаків після коми у вартостях (None - найменша точна)
+        capacities: Доступні обсяги додаткових ресурсів портфеля (None - лише бюджет)
+        rules: Залежності та групи взаємовиключних проєктів (див. project_rules) або None
         
     Повертає:
-        pandas.DataFrame: Версія таблиці ДП у форматі DataFrame
+        tuple: (нормалізована ідеальна точка, максимальні значення, рішення, нормалізуючі фактори)
     """
-    rows = []
+    _, values = criteria_matrix(projects, criterion_indices)
+    _, norm_factors = normalize_matrix(values)
+    if capacities is None and rules is None:
+        solutions, max_values, _, _ = solve_knapsack_multi(projects, budget, criterion_indices, precision)
+    else:
+        results = [solve_knapsack(projects, budget, index, precision, capacities, rules)[:2]
+                   for index in criterion_indices]
+        solutions = np.array([solution for solution, _ in results], dtype=int).reshape(len(results), len(projects))
+        max_values = np.array([value for _, value in results])
     
-    for i in range(len(dp)):
-        row = {'i\\S': i}
-        for w in range(budget + 1):
-            row[str(w)] = dp[i][w]
-        rows.append(row)
+    # Нормалізація лінійна, тому нормалізований оптимум - це оптимум, поділений на фактор
+    ideal = max_values / np.where(norm_factors > 0, norm_factors, 1)
+    
+    return ideal, max_values, solutions, norm_factors
+
+def dp_path_window(solution_path, budget, radius=5):
+    """
+    Вибирає стовпці таблиці ДП навколо комірок шляху рішення.
+    
+    Аргументи:
+        solution_path: Шлях комірок рішення (i, w) з solve_knapsack
+        budget: Максимальний бюджет (в одиницях таблиці ДП)
+        radius: Кількість сусідніх стовпців з кожного боку комірки шляху
+        
+    Повертає:
+        numpy.ndarray: Відсортовані номери стовпців вікна
+    """
+    centers = np.array([w for _, w in solution_path] or [budget], dtype=int)
+    columns = (centers[:, None] + np.arange(-radius, radius + 1)).ravel()
+    return np.unique(columns[(columns >= 0) & (columns <= budget)])
+
+def downsample_dp(dp, max_rows=100, max_columns=400):
+    """
+    Зменшує таблицю ДП для теплової карти: кожна клітинка - максимум свого блоку.
+    
+    Аргументи:
+        dp: Таблиця динамічного програмування
+        max_rows: Найбільша кількість рядків результату
+        max_columns: Найбільша кількість стовпців результату
+        
+    Повертає:
+        tuple: (зменшена таблиця, номери перших рядків блоків, номери перших стовпців блоків)
+    """
+    dp = np.asarray(dp)
+    row_starts = np.unique(np.linspace(0, dp.shape[0], min(max_rows, dp.shape[0]) + 1).astype(int)[:-1])
+    column_starts = np.unique(np.linspace(0, dp.shape[1], min(max_columns, dp.shape[1]) + 1).astype(int)[:-1])
     
-    return pd.DataFrame(rows)
\ No newline at end of file
+    # Максимум по блоках уздовж обох осей
+    reduced = np.maximum.reduceat(np.maximum.reduceat(dp, row_starts, axis=0), column_starts, axis=1)
+    return reduced, row_starts, column_starts
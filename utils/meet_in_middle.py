@@ -0,0 +1,330 @@
+import bisect
+import numpy as np
+from .portfolio import as_portfolio
+from .normalize import normalize_matrix
+from .candidate_store import _pair_limits
+from .scaling import feasibility_units
+
+# Вибір проєктів зберігається бітовою маскою uint64
+MAX_MITM_PROJECTS = 64
+
+# Найбільша кількість пар (лівий варіант, правий варіант) в одному векторному кроці
+DEFAULT_BLOCK_CELLS = 2_000_000
+
+def enumerate_half(projects, project_ids, budget, costs=None):
+    """
+    Перебирає комбінації частини проєктів у межах бюджету, залишаючи лише недоміновані.
+
+    Проєкти додаються по одному, як у розрідженому методі задачі про рюкзак. Після кожного
+    проєкту відкидаються стани (вартість, прибуток, експертна оцінка), для яких є не дорожчий
+    стан з не меншими обома критеріями: будь-яке доповнення такого стану не краще за те саме
+    доповнення домінуючого, тож для пошуку найближчого до ідеальної точки рішення та оптимуму
+    з поступкою вони не потрібні.
+
+    Аргументи:
+        projects: Portfolio або список проєктів [вартість, прибуток, експертна_оцінка]
+        project_ids: Номери проєктів цієї половини
+        budget: Доступний бюджет
+        costs: Вартості проєктів, у яких перевіряється бюджет (за замовчуванням - вартості портфеля)
+
+    Повертає:
+        dict: Бітові маски ('masks'), вартості ('cost') і значення критеріїв ('values'),
+              упорядковані за зростанням вартості
+    """
+    portfolio = as_portfolio(projects)
+    costs = portfolio.cost if costs is None else np.asarray(costs)
+    values = portfolio.columns([1, 2])
+
+    masks = np.zeros(1, dtype=np.uint64)
+    state_costs = np.zeros(1, dtype=costs.dtype)
+    state_values = np.zeros((1, 2), dtype=values.dtype)
+
+    for j in project_ids:
+        fits = state_costs + costs[j] <= budget
+        masks = np.concatenate([masks, masks[fits] | np.uint64(1 << int(j))])
+        state_costs = np.concatenate([state_costs, state_costs[fits] + costs[j]])
+        state_values = np.concatenate([state_values, state_values[fits] + values[j]])
+
+        keep = _pareto_filter(state_costs, state_values)
+        masks, state_costs, state_values = masks[keep], state_costs[keep], state_values[keep]
+
+    return {'masks': masks, 'cost': state_costs, 'values': state_values}
+
+def _pareto_filter(costs, values):
+    """Індекси недомінованих станів (за зростанням вартості)"""
+    order = np.lexsort((-values[:, 1], -values[:, 0], costs))
+    keep = []
+
+    # Сходинка недомінованих пар уже переглянутих (не дорожчих) станів:
+    # прибуток зростає, експертна оцінка спадає
+    front_profit, front_expert = [], []
+    for i, profit, expert in zip(order.tolist(), values[order, 0].tolist(), values[order, 1].tolist()):
+        k = bisect.bisect_left(front_profit, profit)
+        if k < len(front_profit) and front_expert[k] >= expert:
+            continue
+        keep.append(i)
+
+        # Прибираємо зі сходинки пари, які домінує нова пара
+        start = k
+        while start > 0 and front_expert[start - 1] <= expert:
+            start -= 1
+        stop = k + 1 if k < len(front_profit) and front_profit[k] == profit else k
+        front_profit[start:stop] = [profit]
+        front_expert[start:stop] = [expert]
+
+    return np.array(keep, dtype=np.int64)
+
+def build_halves(projects, budget):
+    """
+    Ділить проєкти на дві половини і перебирає недоміновані комбінації кожної.
+
+    Аргументи:
+        projects: Portfolio або список проєктів [вартість, прибуток, експертна_оцінка]
+        budget: Доступний бюджет
+
+    Повертає:
+        dict: Половини ('left', 'right') з вартостями в одиницях таблиці ДП, кількість допустимих
+              правих варіантів для кожного лівого ('limits'), вартості проєктів ('project_costs')
+              і кількість проєктів ('n')
+    """
+    portfolio = as_portfolio(projects)
+    n = len(portfolio)
+    if n > MAX_MITM_PROJECTS:
+        raise ValueError(f"Метод зустрічі посередині підтримує не більше {MAX_MITM_PROJECTS} проєктів")
+
+    # Бюджет перевіряється в цілих одиницях, як у таблиці ДП і при переборі комбінацій
+    unit_costs, budget_units, _ = feasibility_units(portfolio.cost, budget)
+    unit_costs = np.array(unit_costs, dtype=np.int64)
+    left = enumerate_half(portfolio, range(0, n // 2), budget_units, unit_costs)
+    right = enumerate_half(portfolio, range(n // 2, n), budget_units, unit_costs)
+
+    # Права половина впорядкована за вартістю, тому допустимі пари для кожного лівого варіанта - її префікс
+    limits = _pair_limits(left['cost'], right['cost'], budget_units)
+
+    # Найбільші значення критеріїв на кожному префіксі правої половини - для верхніх меж
+    right['prefix_max'] = np.maximum.accumulate(right['values'], axis=0)
+
+    return {'left': left, 'right': right, 'limits': limits, 'project_costs': portfolio.cost, 'n': n}
+
+def _combine(halves, l, r):
+    """Рішення, вартість і значення критеріїв пари варіантів половин"""
+    left, right = halves['left'], halves['right']
+    mask = int(left['masks'][l] | right['masks'][r])
+    solution = [(mask >> i) & 1 for i in range(halves['n'])]
+    values = left['values'][l] + right['values'][r]
+    return solution, halves['project_costs'][np.array(solution, dtype=bool)].sum().item(), values
+
+def max_criterion(halves, column):
+    """
+    Найбільше значення критерію серед допустимих комбінацій (один прохід по лівій половині).
+
+    Аргументи:
+        halves: Результат build_halves
+        column: Номер критерію (0 - прибуток, 1 - експертна оцінка)
+
+    Повертає:
+        tuple: (рішення, найбільше значення)
+    """
+    left, right, limits = halves['left'], halves['right'], halves['limits']
+    totals = left['values'][:, column] + right['prefix_max'][limits - 1, column]
+    l = int(np.argmax(totals))
+    r = int(np.argmax(right['values'][:limits[l], column]))
+    solution, _, values = _combine(halves, l, r)
+    return solution, values[column].item()
+
+def _scan_blocks(halves, order, block_cells):
+    """Ділить ліві варіанти (у порядку перегляду) на блоки, у яких не більше block_cells пар"""
+    limits = np.maximum(halves['limits'][order], 1)
+    start = 0
+    while start < len(order):
+        # Блок з t варіантів займає t × (найдовший префікс блоку) пар
+        window = limits[start:start + max(1, block_cells // int(limits[start]))]
+        cells = np.maximum.accumulate(window) * np.arange(1, len(window) + 1)
+        stop = start + max(1, int(np.searchsorted(cells, block_cells, side='right')))
+        yield order[start:stop]
+        start = stop
+
+def mitm_ideal_point(projects, budget, halves=None, block_cells=DEFAULT_BLOCK_CELLS):
+    """
+    Знаходить комбінацію, найближчу до ідеальної точки, методом зустрічі посередині.
+
+    Ідеальна точка - найбільші суми критеріїв серед допустимих комбінацій - знаходиться
+    одним проходом по лівій половині з максимумами префіксів правої. Потім ліві варіанти
+    переглядаються в порядку нижньої межі відстані (яку дає поєднання з найкращими значеннями
+    префікса), блоками пар, доки межа не перевищить найкращу знайдену відстань.
+    Результат точний, а обсяг роботи - порядку 2^(n/2) замість 2^n.
+
+    Аргументи:
+        projects: Portfolio або список проєктів [вартість, прибуток, експертна_оцінка]
+        budget: Доступний бюджет
+        halves: Результат build_halves для цих проєктів і бюджету (будується, якщо не задано)
+        block_cells: Найбільша кількість пар в одному векторному кроці
+
+    Повертає:
+        dict: Найближча комбінація ('solution', 'cost', 'values', 'norm', 'distance'),
+              ідеальна точка ('ideal', 'max_values', 'norm_factors') і розміри половин ('states')
+    """
+    portfolio = as_portfolio(projects)
+    if halves is None:
+        halves = build_halves(portfolio, budget)
+    left, right, limits = halves['left'], halves['right'], halves['limits']
+
+    _, norm_factors = normalize_matrix(portfolio.columns([1, 2]))
+    scale = np.where(norm_factors > 0, norm_factors, 1)
+    max_values = np.array([max_criterion(halves, 0)[1], max_criterion(halves, 1)[1]])
+    ideal = max_values / scale
+
+    # Нижня межа відстані для кожного лівого варіанта
+    upper = (left['values'] + right['prefix_max'][limits - 1]) / scale
+    bounds = np.sqrt((np.maximum(ideal - upper, 0)**2).sum(axis=1))
+    order = np.argsort(bounds, kind='stable')
+
+    right_norm = right['values'] / scale
+    best_distance, best_pair = np.inf, None
+    for block in _scan_blocks(halves, order, block_cells):
+        if bounds[block[0]] > best_distance:
+            break
+        width = int(limits[block].max())
+        points = (left['values'][block] / scale)[:, None, :] + right_norm[None, :width]
+        distances = np.sqrt(((points - ideal)**2).sum(axis=2))
+        distances[np.arange(width)[None, :] >= limits[block][:, None]] = np.inf
+
+        i, r = np.unravel_index(np.argmin(distances), distances.shape)
+        if distances[i, r] < best_distance:
+            best_distance, best_pair = distances[i, r].item(), (int(block[i]), int(r))
+
+    solution, cost, values = _combine(halves, *best_pair)
+    return {
+        'solution': solution,
+        'cost': cost,
+        'values': values.tolist(),
+        'norm': (values / scale).tolist(),
+        'distance': best_distance,
+        'ideal': ideal,
+        'max_values': max_values,
+        'norm_factors': norm_factors,
+        'states': (len(left['cost']), len(right['cost']))
+    }
+
+def mitm_concession_optimum(halves, primary_criterion_index, min_primary, block_cells=DEFAULT_BLOCK_CELLS):
+    """
+    Найкраща комбінація за другорядним критерієм серед тих, де основний критерій не менший за min_primary.
+
+    Ліві варіанти переглядаються в порядку спадання верхньої межі другорядного критерію,
+    доки межа не стане меншою за найкраще знайдене значення. Серед рівних за другорядним
+    критерієм вибирається комбінація з більшим основним.
+
+    Аргументи:
+        halves: Результат build_halves
+        primary_criterion_index: Індекс основного критерію (1 або 2)
+        min_primary: Найменше допустиме значення основного критерію
+        block_cells: Найбільша кількість пар в одному векторному кроці
+
+    Повертає:
+        tuple: (рішення, основний критерій, другорядний критерій, вартість) або None, якщо таких комбінацій немає
+    """
+    left, right, limits = halves['left'], halves['right'], halves['limits']
+    primary, secondary = primary_criterion_index - 1, 2 - primary_criterion_index
+
+    # Верхні межі; ліві варіанти, яким не вистачить основного критерію навіть з найкращим префіксом, пропускаються
+    prefix_max = right['prefix_max'][limits - 1]
+    reachable = left['values'][:, primary] + prefix_max[:, primary] >= min_primary
+    bounds = np.where(reachable, left['values'][:, secondary] + prefix_max[:, secondary], -np.inf)
+    order = np.argsort(-bounds, kind='stable')
+    order = order[np.isfinite(bounds[order])]
+
+    best_key, best_pair = None, None
+    for block in _scan_blocks(halves, order, block_cells):
+        if best_key is not None and bounds[block[0]] < best_key[0]:
+            break
+        width = int(limits[block].max())
+        totals = left['values'][block][:, None, :] + right['values'][None, :width]
+        valid = (np.arange(width)[None, :] < limits[block][:, None]) & (totals[:, :, primary] >= min_primary)
+        if not valid.any():
+            continue
+
+        # Лексикографічно найкраща пара блоку: (другорядний, основний)
+        secondary_totals = np.where(valid, totals[:, :, secondary], -np.inf)
+        top = secondary_totals == secondary_totals.max()
+        primary_totals = np.where(top, totals[:, :, primary], -np.inf)
+        i, r = np.unravel_index(np.argmax(primary_totals), primary_totals.shape)
+        key = (totals[i, r, secondary].item(), totals[i, r, primary].item())
+        if best_key is None or key > best_key:
+            best_key, best_pair = key, (int(block[i]), int(r))
+
+    if best_pair is None:
+        return None
+    solution, cost, values = _combine(halves, *best_pair)
+    return solution, values[primary].item(), values[secondary].item(), cost
+
+def mitm_sequential_concessions(projects, budget, primary_criterion_index=1, concessions=()):
+    """
+    Виконує послідовні поступки методом зустрічі посередині без перебору всіх комбінацій.
+
+    Початкове рішення - лексикографічний оптимум (основний, потім другорядний критерій),
+    а кожна поступка - оптимум другорядного критерію за нижньої межі основного.
+    Повертає стан з тими самими полями історії, що й make_next_concession
+    (без списку прийнятних комбінацій).
+
+    Аргументи:
+        projects: Portfolio або список проєктів [вартість, прибуток, експертна_оцінка]
+        budget: Доступний бюджет
+        primary_criterion_index: Індекс основного критерію (1 або 2)
+        concessions: Розміри поступок для кожної ітерації
+
+    Повертає:
+        dict: Стан процесу послідовних поступок після всіх поступок
+    """
+    halves = build_halves(projects, budget)
+    _, primary_max = max_criterion(halves, primary_criterion_index - 1)
+    solution, primary_value, secondary_value, cost = mitm_concession_optimum(
+        halves, primary_criterion_index, primary_max)
+
+    state = {
+        "budget": budget,
+        "primary_criterion_index": primary_criterion_index,
+        "secondary_criterion_index": 3 - primary_criterion_index,
+        "current_solution": solution,
+        "current_primary_value": primary_value,
+        "current_secondary_value": secondary_value,
+        "current_cost": cost,
+        "original_primary_max": primary_max,
+        "iteration": 0,
+        "history": [{
+            "solution": solution,
+            "primary_value": primary_value,
+            "secondary_value": secondary_value,
+            "cost": cost,
+            "concession_amount": 0,
+            "message": "Початкове рішення за основним критерієм."
+        }]
+    }
+
+    for amount in concessions:
+        min_acceptable_primary = state["current_primary_value"] - amount
+        result = mitm_concession_optimum(halves, primary_criterion_index, min_acceptable_primary)
+        if result is None:
+            state["history"].append({
+                "solution": state["current_solution"],
+                "primary_value": state["current_primary_value"],
+                "secondary_value": state["current_secondary_value"],
+                "cost": state["current_cost"],
+                "concession_amount": amount,
+                "message": f"Немає комбінацій з основним критерієм >= {min_acceptable_primary}."
+            })
+            continue
+
+        solution, primary_value, secondary_value, cost = result
+        state.update(current_solution=solution, current_primary_value=primary_value,
+                     current_secondary_value=secondary_value, current_cost=cost)
+        state["iteration"] += 1
+        state["history"].append({
+            "solution": solution,
+            "primary_value": primary_value,
+            "secondary_value": secondary_value,
+            "cost": cost,
+            "concession_amount": amount,
+            "message": f"Поступка {amount}: основний = {primary_value}, другорядний = {secondary_value}."
+        })
+
+    return state
@@ -0,0 +1,172 @@
+import numpy as np
+from .portfolio import as_portfolio
+from .normalize import criterion_lists
+from .scaling import feasibility_units
+
+def group_identical_projects(projects):
+    """
+    Об'єднує однакові проєкти в класи з кількістю копій.
+
+    Аргументи:
+        projects: Portfolio або список проєктів [вартість, критерій1, ..., критерійm]
+
+    Повертає:
+        tuple: (Portfolio класів проєктів, кількість проєктів у кожному класі, індекси проєктів кожного класу)
+    """
+    portfolio = as_portfolio(projects)
+    if len(portfolio) == 0:
+        return portfolio, [], []
+
+    # Однакові рядки матриці всіх стовпців (разом з витратами ресурсів) утворюють один клас
+    table = np.column_stack([portfolio.columns(range(portfolio.n_criteria + 1)),
+                             portfolio.usage()[:, 1:]]).astype(float)
+    _, first, inverse, counts = np.unique(table, axis=0, return_index=True,
+                                          return_inverse=True, return_counts=True)
+
+    # Нумеруємо класи в порядку першої появи проєкту
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    class_of = rank[inverse.ravel()]
+
+    # Групуємо індекси проєктів за класами (стабільне сортування зберігає порядок)
+    sorted_projects = np.argsort(class_of, kind='stable')
+    members = [member.tolist() for member in np.split(sorted_projects, np.cumsum(counts[order])[:-1])]
+
+    return portfolio.take(first[order]), counts[order].tolist(), members
+
+def binary_split(counts):
+    """
+    Розбиває кожен клас на псевдопроєкти з 1, 2, 4, ... копій (двійкове розбиття),
+    щоб обмежену задачу про рюкзак розв'язати як звичайну 0/1 задачу.
+
+    Аргументи:
+        counts: Кількість проєктів у кожному класі
+
+    Повертає:
+        list: Список кортежів (індекс класу, кількість копій у псевдопроєкті)
+    """
+    items = []
+
+    for class_id, count in enumerate(counts):
+        units = 1
+        while count > 0:
+            taken = min(units, count)
+            items.append((class_id, taken))
+            count -= taken
+            units *= 2
+
+    return items
+
+def expand_class_counts(class_counts, members, n):
+    """
+    Перетворює кількості вибраних проєктів кожного класу на вектор x_i.
+    З кожного класу вибираються проєкти з найменшими номерами.
+
+    Аргументи:
+        class_counts: Кількість вибраних проєктів кожного класу
+        members: Індекси проєктів кожного класу
+        n: Загальна кількість проєктів
+
+    Повертає:
+        list: Вектор вибору проєктів (0 або 1 для кожного проєкту)
+    """
+    solution = [0] * n
+
+    for count, member in zip(class_counts, members):
+        for i in member[:count]:
+            solution[i] = 1
+
+    return solution
+
+def generate_class_combinations(classes, counts, budget, capacities=None):
+    """
+    Генерує всі допустимі набори кількостей проєктів кожного класу в межах бюджету.
+
+    Аргументи:
+        classes: Portfolio класів проєктів [вартість, прибуток, експертна_оцінка]
+        counts: Кількість проєктів у кожному класі
+        budget: Доступний бюджет
+        capacities: Доступні обсяги додаткових ресурсів класів (None - лише бюджет)
+
+    Повертає:
+        list: Список кортежів (кількості за класами, вартість, прибуток, експертна_оцінка)
+    """
+    classes = as_portfolio(classes)
+    if capacities is not None:
+        return _generate_resource_class_combinations(classes, counts, budget, capacities)
+
+    k = len(classes)
+    result = []
+
+    # Перетворюємо стовпці на числа Python один раз перед перебором; бюджет перевіряється
+    # в цілих одиницях, як у таблиці ДП, тож дробові вартості не відкидають допустимих комбінацій
+    costs, budget, scaled = feasibility_units(classes.cost, budget)
+    profits, experts = criterion_lists(classes)
+
+    def backtrack(index, current_counts, current_cost, current_profit, current_expert):
+        if index == k:
+            result.append((current_counts.copy(), current_cost, current_profit, current_expert))
+            return
+
+        cost, profit, expert = costs[index], profits[index], experts[index]
+
+        # Перебираємо кількість копій класу, доки вистачає бюджету
+        for count in range(counts[index] + 1):
+            if current_cost + count * cost > budget:
+                break
+            backtrack(
+                index + 1,
+                current_counts + [count],
+                current_cost + count * cost,
+                current_profit + count * profit,
+                current_expert + count * expert
+            )
+
+    backtrack(0, [], 0, 0, 0)
+
+    # Для масштабованих вартостей справжню вартість комбінацій рахуємо після перебору
+    if scaled:
+        totals = (np.array([combination[0] for combination in result]).reshape(len(result), k) @ classes.cost).tolist()
+        result = [(class_counts, total, profit, expert)
+                  for (class_counts, _, profit, expert), total in zip(result, totals)]
+    return result
+
+def _generate_resource_class_combinations(classes, counts, budget, capacities):
+    """Те саме, що generate_class_combinations, але з перевіркою обсягів додаткових ресурсів"""
+    k = len(classes)
+    result = []
+
+    costs = classes.column(0).tolist()
+    profits, experts = criterion_lists(classes)
+    resources = [column.tolist() for column in classes.resources]
+
+    # Та сама відносна похибка, що й у solve_knapsack_resources
+    budget = budget + 1e-9 * max(1.0, abs(budget))
+    capacities = [limit + 1e-9 * max(1.0, abs(limit)) for limit in capacities]
+
+    def backtrack(index, current_counts, current_cost, current_profit, current_expert, current_usage):
+        if index == k:
+            result.append((current_counts.copy(), current_cost, current_profit, current_expert))
+            return
+
+        cost, profit, expert = costs[index], profits[index], experts[index]
+        usage = [column[index] for column in resources]
+
+        # Перебираємо кількість копій класу, доки вистачає бюджету та ресурсів
+        for count in range(counts[index] + 1):
+            if current_cost + count * cost > budget:
+                break
+            if any(used + count * amount > limit for used, amount, limit in zip(current_usage, usage, capacities)):
+                break
+            backtrack(
+                index + 1,
+                current_counts + [count],
+                current_cost + count * cost,
+                current_profit + count * profit,
+                current_expert + count * expert,
+                [used + count * amount for used, amount in zip(current_usage, usage)]
+            )
+
+    backtrack(0, [], 0, 0, 0, [0] * len(capacities))
+    return result
@@ -1,5 +1,55 @@
 import numpy as np
-import pandas as pd
+from .portfolio import as_portfolio
+
+def criteria_matrix(projects, criterion_indices=None):
+    """
+    Повертає вартості та матрицю критеріїв портфеля проєктів.
+    
+    Аргументи:
+        projects: Portfolio або список проєктів [вартість, критерій1, ..., критерійm]
+        criterion_indices: Індекси стовпців критеріїв (за замовчуванням усі, крім вартості)
+        
+    Повертає:
+        tuple: (вартості розміром n, матриця критеріїв розміром n × m)
+    """
+    portfolio = as_portfolio(projects)
+    if criterion_indices is None:
+        criterion_indices = range(1, portfolio.n_criteria + 1)
+    
+    return portfolio.cost, portfolio.columns(list(criterion_indices))
+
+def criterion_lists(projects, criterion_indices=(1, 2)):
+    """
+    Повертає стовпці матриці критеріїв як списки чисел Python для покрокового перебору.
+    
+    Аргументи:
+        projects: Portfolio або список проєктів [вартість, критерій1, ..., критерійm]
+        criterion_indices: Індекси стовпців критеріїв
+        
+    Повертає:
+        list: Список значень кожного критерію (цілі критерії лишаються цілими)
+    """
+    portfolio = as_portfolio(projects)
+    _, values = criteria_matrix(portfolio, criterion_indices)
+    return [values[:, j].astype(portfolio.column(index).dtype).tolist()
+            for j, index in enumerate(criterion_indices)]
+
+def normalize_matrix(values):
+    """
+    Нормалізує кожен стовпець матриці критеріїв, поділивши його на квадратний корінь
+    суми квадратів цього стовпця.
+    
+    Аргументи:
+        values: Матриця значень критеріїв розміром n × m
+        
+    Повертає:
+        tuple: (нормалізована матриця, нормалізуючі фактори для кожного критерію)
+    """
+    values = np.asarray(values, dtype=float)
+    norm_factors = np.sqrt((values**2).sum(axis=0))
+    
+    # Стовпець з нулів залишаємо нульовим замість ділення на нуль
+    return values / np.where(norm_factors > 0, norm_factors, 1), norm_factors
 
 def normalize_data(projects):
     """
@@ -7,30 +57,26 @@ def normalize_data(projects):
     суми квадратів цього критерію.
     
     Аргументи:
-        projects: Список проєктів, кожен містить [вартість, прибуток, експертна_оцінка]
+        projects: Portfolio або список проєктів [вартість, прибуток, експертна_оцінка]
         
     Повертає:
         tuple: (нормалізовані_прибутки, нормалізовані_експертні_оцінки, дані_нормалізації)
     """
-    # Витягуємо прибутки та експертні оцінки для нормалізації
-    profits = [project[1] for project in projects]
-    expert_scores = [project[2] for project in projects]
-    
-    # Обчислюємо квадрати значень
-    squared_profits = [profit**2 for profit in profits]
-    squared_expert = [score**2 for score in expert_scores]
+    portfolio = as_portfolio(projects)
     
-    # Обчислюємо суму квадратів для кожного критерію
-    sum_squared_profits = sum(squared_profits)
-    sum_squared_expert = sum(squared_expert)
+    # Витягуємо прибутки та експертні оцінки для нормалізації
+    profits, expert_scores = criterion_lists(portfolio)
     
-    # Обчислюємо нормалізуючий фактор (квадратний корінь суми квадратів)
-    norm_factor_profits = (sum_squared_profits) ** 0.5
-    norm_factor_expert = (sum_squared_expert) ** 0.5
+    # Нормалізуємо обидва критерії як стовпці однієї матриці
+    _, values = criteria_matrix(portfolio, [1, 2])
+    norm_values, norm_factors = normalize_matrix(values)
+    squared_values = values**2
     
-    # Нормалізуємо кожне значення
-    norm_profits = [profit / norm_factor_profits for profit in profits]
-    norm_expert = [score / norm_factor_expert for score in expert_scores]
+    squared_profits = squared_values[:, 0].tolist()
+    squared_expert = squared_values[:, 1].tolist()
+    norm_factor_profits, norm_factor_expert = norm_factors.tolist()
+    norm_profits = norm_values[:, 0].tolist()
+    norm_expert = norm_values[:, 1].tolist()
     
     # Створюємо дані нормалізації для відображення
     normalization_data = {
@@ -46,36 +92,6 @@ def normalize_data(projects):
     
     return norm_profits, norm_expert, normalization_data
 
-def create_normalization_df(projects, norm_data):
-    """
-    Створює pandas DataFrame з деталями нормалізації для відображення
-    
-    Аргументи:
-        projects: Список проєктів
-        norm_data: Словник з даними нормалізації
-        
-    Повертає:
-        pandas.DataFrame: DataFrame з інформацією про нормалізацію
-    """
-    df = pd.DataFrame({
-        'Проєкт': [f"x{i+1}" for i in range(len(projects))],
-        'Прибуток': norm_data['profits'],
-        'Норм. прибуток': [round(x, 4) for x in norm_data['norm_profits']],
-        'Експертна оцінка': norm_data['expert_scores'],
-        'Норм. експертна оцінка': [round(x, 4) for x in norm_data['norm_expert']]
-    })
-    
-    # Додаємо рядок з підсумками
-    totals = pd.DataFrame({
-        'Проєкт': ['√Σ'],
-        'Прибуток': [''],
-        'Норм. прибуток': [round(norm_data['norm_factor_profits'], 4)],
-        'Експертна оцінка': [''],
-        'Норм. експертна оцінка': [round(norm_data['norm_factor_expert'], 4)]
-    })
-    
-    return pd.concat([df, totals], ignore_index=True)
-
 def verify_normalization(norm_profits, norm_expert):
     """
     Перевіряє правильність нормалізації, перевіряючи, чи дорівнює сума
@@ -88,12 +104,12 @@ def verify_normalization(norm_profits, norm_expert):
     Повертає:
         dict: Результати перевірки
     """
-    sum_squared_norm_profits = sum([x**2 for x in norm_profits])
-    sum_squared_norm_expert = sum([x**2 for x in norm_expert])
+    sum_squared_norm_profits = float(np.square(norm_profits).sum())
+    sum_squared_norm_expert = float(np.square(norm_expert).sum())
     
     return {
         'profit_sum': round(sum_squared_norm_profits, 4),
         'profit_valid': abs(sum_squared_norm_profits - 1.0) < 0.0001,
         'expert_sum': round(sum_squared_norm_expert, 4),
         'expert_valid': abs(sum_squared_norm_expert - 1.0) < 0.0001
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,172 @@
+import numpy as np
+
+class Portfolio:
+    """
+    Портфель проєктів у вигляді суцільних стовпців NumPy замість списку [вартість, прибуток, експертна_оцінка].
+
+    Індексація стовпців така сама, як у рядку проєкту: 0 - вартість, 1..m - критерії.
+    Типи перевіряються один раз при створенні: кожен стовпець зберігається як int64,
+    якщо всі його значення цілі, інакше як float64 (дробові вартості масштабуються
+    перед побудовою таблиці ДП, див. plan_precision).
+
+    Крім бюджету, проєкти можуть витрачати інші обмежені ресурси (години персоналу,
+    обладнання); їх витрати зберігаються окремими стовпцями і не входять у рядок проєкту.
+
+    Атрибути:
+        cost: Вартості проєктів (масив розміром n)
+        criteria: Кортеж суцільних масивів розміром n, по одному на критерій
+        resources: Кортеж суцільних масивів розміром n, по одному на додатковий ресурс
+    """
+    __slots__ = ('cost', 'criteria', 'resources')
+
+    def __init__(self, cost, criteria, resources=()):
+        cost = _as_column(cost, "вартості")
+        if (cost < 0).any():
+            raise ValueError("Вартості проєктів не можуть бути від'ємними")
+
+        # Матрицю n × m розбиваємо на окремі стовпці
+        if isinstance(criteria, np.ndarray):
+            criteria = criteria.reshape(len(cost), -1).T
+        criteria = tuple(_as_column(column, "критерію") for column in criteria)
+        resources = tuple(_as_column(column, "ресурсу") for column in resources)
+        if any(len(column) != len(cost) for column in criteria + resources):
+            raise ValueError("Усі стовпці портфеля повинні мати однакову довжину")
+        if any((column < 0).any() for column in resources):
+            raise ValueError("Витрати ресурсів не можуть бути від'ємними")
+
+        for column in (cost,) + criteria + resources:
+            column.flags.writeable = False
+
+        self.cost = cost
+        self.criteria = criteria
+        self.resources = resources
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Створює портфель зі списку проєктів [вартість, критерій1, ..., критерійm].
+
+        Аргументи:
+            rows: Список проєктів
+
+        Повертає:
+            Portfolio: Портфель проєктів
+        """
+        if len(rows) == 0:
+            return cls([], [[], []])
+
+        data = np.array(rows, dtype=object).reshape(len(rows), -1)
+        if data.shape[1] < 2:
+            raise ValueError("Кожен проєкт повинен мати вартість і хоча б один критерій")
+        return cls(data[:, 0], list(data[:, 1:].T))
+
+    def __len__(self):
+        return len(self.cost)
+
+    def __getitem__(self, i):
+        return [self.cost[i].item()] + [column[i].item() for column in self.criteria]
+
+    def __iter__(self):
+        return iter(self.to_rows())
+
+    def __reduce__(self):
+        # Дозволяє копіювати портфель між процесами та кешувати результати за його вмістом
+        return (Portfolio, (self.cost, list(self.criteria), list(self.resources)))
+
+    def __repr__(self):
+        if self.resources:
+            return f"Portfolio(n={len(self)}, criteria={self.n_criteria}, resources={self.n_resources})"
+        return f"Portfolio(n={len(self)}, criteria={self.n_criteria})"
+
+    @property
+    def n_criteria(self):
+        return len(self.criteria)
+
+    @property
+    def n_resources(self):
+        return len(self.resources)
+
+    def usage(self):
+        """Повертає матрицю n × (1 + r) витрат: вартість і витрати кожного додаткового ресурсу"""
+        return np.column_stack((self.cost,) + self.resources).reshape(len(self), 1 + self.n_resources)
+
+    def column(self, index):
+        """Повертає стовпець за індексом у рядку проєкту (0 - вартість)"""
+        return self.cost if index == 0 else self.criteria[index - 1]
+
+    def columns(self, indices):
+        """Повертає матрицю n × k зі стовпців за їх індексами у рядку проєкту"""
+        return np.column_stack([self.column(index) for index in indices]).reshape(len(self), len(indices))
+
+    def take(self, indices):
+        """Повертає портфель з вибраних проєктів"""
+        return Portfolio(self.cost[indices], [column[indices] for column in self.criteria],
+                         [column[indices] for column in self.resources])
+
+    def to_rows(self):
+        """Повертає список проєктів [вартість, критерій1, ..., критерійm] зі звичайними числами Python"""
+        return [list(row) for row in zip(*(column.tolist() for column in (self.cost,) + self.criteria))]
+
+def as_portfolio(projects):
+    """
+    Перетворює список проєктів на Portfolio (або повертає портфель без змін).
+
+    Аргументи:
+        projects: Список проєктів або Portfolio
+
+    Повертає:
+        Portfolio: Портфель проєктів
+    """
+    if isinstance(projects, Portfolio):
+        return projects
+    return Portfolio.from_rows(projects)
+
+def _as_column(values, name):
+    # Перетворює стовпець на int64, якщо всі значення цілі, інакше на float64
+    try:
+        column = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError(f"Значення {name} мають бути числами")
+
+    if not np.isfinite(column).all():
+        raise ValueError(f"Значення {name} не можуть бути порожніми або нескінченними")
+
+    if np.array_equal(column, np.round(column)):
+        return np.ascontiguousarray(column, dtype=np.int64)
+    return np.ascontiguousarray(column)
+
+def apply_row_changes(portfolio, changes, columns):
+    """
+    Застосовує зміни з редактора таблиці (st.data_editor) до портфеля.
+
+    Зміни застосовуються в тому ж порядку, що й у редакторі: спочатку редаговані рядки,
+    потім додані, потім видалені (номери видалених рядків рахуються з урахуванням доданих).
+
+    Аргументи:
+        portfolio: Портфель, показаний у редакторі
+        changes: Словник змін {'edited_rows', 'added_rows', 'deleted_rows'}
+        columns: Назви стовпців редактора у порядку рядка проєкту (вартість, критерії)
+
+    Повертає:
+        Portfolio: Новий портфель зі змінами
+    """
+    portfolio = as_portfolio(portfolio)
+    data = [portfolio.column(j).astype(float) for j in range(len(columns))]
+    position = {name: j for j, name in enumerate(columns)}
+
+    for row, values in changes.get('edited_rows', {}).items():
+        for name, value in values.items():
+            data[position[name]][int(row)] = np.nan if value is None else value
+
+    added = changes.get('added_rows', [])
+    if added:
+        data = [np.concatenate([column, [row.get(name, np.nan) for row in added]]).astype(float)
+                for column, name in zip(data, columns)]
+
+    deleted = changes.get('deleted_rows', [])
+    if deleted:
+        keep = np.ones(len(data[0]), dtype=bool)
+        keep[list(deleted)] = False
+        data = [column[keep] for column in data]
+
+    return Portfolio(data[0], data[1:])
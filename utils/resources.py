@@ -0,0 +1,212 @@
+import numpy as np
+from .portfolio import as_portfolio
+
+# Найбільша кількість пар станів в одному векторному кроці перевірки домінування
+DEFAULT_BLOCK_CELLS = 4_000_000
+
+# Кількість найперспективніших станів, які на кожному кроці доповнюються жадібно для нижньої межі
+GREEDY_STATES = 64
+
+def resource_limits(projects, budget, capacities):
+    """
+    Перевіряє обмеження ресурсів і повертає витрати та межі для всіх обмежень разом.
+
+    Аргументи:
+        projects: Portfolio з додатковими ресурсами
+        budget: Доступний бюджет
+        capacities: Доступні обсяги додаткових ресурсів (по одному на ресурс портфеля)
+
+    Повертає:
+        tuple: (матриця витрат n × (1 + r) - вартість і ресурси, вектор меж розміром 1 + r)
+    """
+    portfolio = as_portfolio(projects)
+    capacities = list(capacities)
+    if len(capacities) != portfolio.n_resources:
+        raise ValueError(f"Потрібен доступний обсяг кожного з {portfolio.n_resources} ресурсів")
+
+    limits = np.array([budget] + capacities, dtype=float)
+    if not np.isfinite(limits).all() or (limits < 0).any():
+        raise ValueError("Бюджет і доступні обсяги ресурсів мають бути невід'ємними числами")
+
+    return portfolio.usage().astype(float), limits
+
+def solve_knapsack_resources(projects, budget, capacities, criterion_index, secondary_criterion_index=None,
+                             block_cells=DEFAULT_BLOCK_CELLS):
+    """
+    Розв'язує задачу про рюкзак з кількома обмеженнями (бюджет і додаткові ресурси).
+
+    Таблиця ДП мала б окремий вимір для кожного ресурсу, тому зберігаються лише стани
+    (витрати, значення) разом з вибраними проєктами, як у розрідженому методі. Стан
+    відкидається, якщо існує стан з не більшими витратами всіх ресурсів і не меншим
+    значенням, або якщо верхня межа його значення менша за вже досягнуте. Межа - розв'язок
+    дробової задачі з сурогатним обмеженням (сума витрат, поділених на межі ресурсів)
+    для ще не розглянутих проєктів; проєкти розглядаються за спаданням відношення
+    значення до сурогатної витрати, тож межа швидко стає точною.
+
+    Аргументи:
+        projects: Portfolio з додатковими ресурсами
+        budget: Доступний бюджет
+        capacities: Доступні обсяги додаткових ресурсів
+        criterion_index: Індекс критерію, який максимізується
+        secondary_criterion_index: Індекс критерію, який максимізується серед рівних за основним
+        block_cells: Найбільша кількість пар станів в одному векторному кроці
+
+    Повертає:
+        tuple: (рішення, максимальне значення)
+    """
+    portfolio = as_portfolio(projects)
+    usage, limits = resource_limits(portfolio, budget, capacities)
+    values = portfolio.column(criterion_index)
+    secondary = portfolio.column(secondary_criterion_index) if secondary_criterion_index is not None else None
+    n = len(portfolio)
+    tolerance = 1e-9 * np.maximum(1.0, limits)
+
+    # Проєкти, що не вкладаються самі по собі, не розглядаються
+    candidates = np.flatnonzero((usage <= limits + tolerance).all(axis=1))
+    gain = np.maximum(values[candidates], 0).astype(float)
+
+    # Множники сурогатного обмеження - двоїсті змінні неперервної релаксації, тоді межа
+    # дробової сурогатної задачі в корені дорівнює межі лінійного програмування
+    scale = surrogate_multipliers(usage[candidates], gain, limits)
+    surrogate = usage @ scale
+
+    # Проєкти розглядаються за спаданням відношення значення до сурогатної витрати
+    ratio = np.divide(gain, surrogate[candidates], out=np.full(len(candidates), np.inf), where=surrogate[candidates] > 0)
+    order = candidates[np.lexsort((-gain, -ratio))]
+
+    # Нижня межа - найкраще значення жадібного доповнення найперспективніших станів
+    incumbent = -np.inf
+
+    state_usage = np.zeros((1, len(limits)))
+    state_values = np.zeros(1, dtype=values.dtype)
+    state_secondary = np.zeros(1, dtype=secondary.dtype if secondary is not None else values.dtype)
+    state_masks = np.array([0], dtype=object)
+
+    for t, i in enumerate(order):
+        fits = (state_usage + usage[i] <= limits + tolerance).all(axis=1)
+        all_usage = np.concatenate([state_usage, state_usage[fits] + usage[i]])
+        all_values = np.concatenate([state_values, state_values[fits] + values[i]])
+        all_masks = np.concatenate([state_masks, state_masks[fits] | (1 << int(i))])
+        if secondary is None:
+            all_secondary = np.concatenate([state_secondary, state_secondary[fits]])
+        else:
+            all_secondary = np.concatenate([state_secondary, state_secondary[fits] + secondary[i]])
+
+        # Відкидаємо стани, які не можуть досягти найкращого вже знайденого значення
+        rest = order[t + 1:]
+        bounds = _upper_bounds(all_values, all_usage, usage[rest], values[rest], limits, scale)
+        promising = np.argsort(-bounds, kind='stable')[:GREEDY_STATES]
+        incumbent = max(incumbent, all_values.max(), _greedy_completion(
+            all_usage[promising], all_values[promising], usage[rest], values[rest], limits + tolerance).max())
+        keep = bounds >= incumbent - 1e-9 * max(1.0, abs(incumbent))
+
+        # Стани впорядковуємо за значенням (лексикографічно, якщо є другорядний критерій),
+        # а рівні - за сумою витрат, і відкидаємо доміновані попередніми
+        survivors = np.flatnonzero(keep)
+        ranked = survivors[np.lexsort((all_usage[survivors] @ scale, -all_secondary[survivors],
+                                       -all_values[survivors]))]
+        ranked = ranked[~_dominated(all_usage[ranked], block_cells)]
+
+        state_usage, state_values = all_usage[ranked], all_values[ranked]
+        state_secondary, state_masks = all_secondary[ranked], all_masks[ranked]
+
+    # Перший стан - найкращий за значенням (і за другорядним критерієм серед рівних)
+    best = np.lexsort((-state_secondary, -state_values))[0]
+    mask = state_masks[best]
+    solution = [(mask >> i) & 1 for i in range(n)]
+
+    return solution, state_values[best].item()
+
+def surrogate_multipliers(usage, values, limits, sweeps=20):
+    """
+    Знаходить множники сурогатного обмеження покоординатним спуском по двоїстій задачі.
+
+    Двоїста функція неперервної релаксації u·L + Σ max(0, v_i - u·w_i) опукла, і її мінімум
+    по одній координаті - критичне відношення дробової задачі про рюкзак за цим ресурсом,
+    тож кожен крок точний. Множники 1/межа використовуються, якщо всі проєкти вкладаються.
+
+    Аргументи:
+        usage: Матриця витрат проєктів n × (1 + r)
+        values: Невід'ємні значення проєктів
+        limits: Межі обмежень
+
+    Повертає:
+        numpy.ndarray: Невід'ємні множники обмежень
+    """
+    u = np.zeros(len(limits))
+    for _ in range(sweeps):
+        previous = u.copy()
+        for j in np.flatnonzero(limits > 0):
+            # Зведені значення без внеску цього ресурсу і точки зламу за ним
+            reduced = values - usage @ u + usage[:, j] * u[j]
+            used = (usage[:, j] > 0) & (reduced > 0)
+            breaks = reduced[used] / usage[used, j]
+            order = np.argsort(-breaks, kind='stable')
+            filled = np.searchsorted(np.cumsum(usage[used, j][order]), limits[j], side='left')
+            u[j] = breaks[order[filled]] if filled < len(order) else 0.0
+        if np.allclose(u, previous):
+            break
+
+    if not u.any():
+        return np.where(limits > 0, 1 / np.where(limits > 0, limits, 1), 0)
+    return u
+
+def _upper_bounds(state_values, state_usage, usage, values, limits, scale):
+    """
+    Верхні межі значень станів для решти проєктів: найменша з меж дробових задач
+    з сурогатним обмеженням і з кожним обмеженням окремо.
+    """
+    gains = np.maximum(values, 0).astype(float)
+    relaxations = [(usage @ scale, (limits - state_usage) @ scale)]
+    relaxations += [(usage[:, j], limits[j] - state_usage[:, j]) for j in np.flatnonzero(limits > 0)]
+
+    bounds = np.full(len(state_values), np.inf)
+    for weights, remaining in relaxations:
+        bounds = np.minimum(bounds, _fractional_bounds(state_values, remaining, gains, weights))
+    return bounds
+
+def _fractional_bounds(state_values, remaining, gains, weights):
+    """Межі дробової задачі про рюкзак з одним обмеженням для кожного стану"""
+    # Проєкти за спаданням відношення значення до витрати; проєкти без витрат - першими
+    ratio = np.divide(gains, weights, out=np.full(len(gains), np.inf), where=weights > 0)
+    order = np.argsort(-ratio, kind='stable')
+    gains, weights = gains[order], weights[order]
+
+    prefix_weights = np.concatenate([[0.0], np.cumsum(weights)])
+    prefix_gains = np.concatenate([[0.0], np.cumsum(gains)])
+    remaining = np.maximum(remaining, 0)
+
+    # Скільки проєктів вкладається повністю; наступний додається частково
+    whole = np.searchsorted(prefix_weights, remaining, side='right') - 1
+    bounds = state_values + prefix_gains[whole]
+    partial = whole < len(gains)
+    next_item = whole[partial]
+    bounds[partial] = bounds[partial] + gains[next_item] * (
+        (remaining[partial] - prefix_weights[next_item]) / weights[next_item])
+    return bounds
+
+def _greedy_completion(state_usage, state_values, usage, values, limits):
+    """Значення станів, доповнених жадібно (у заданому порядку) проєктами, які ще вкладаються"""
+    used = state_usage.copy()
+    totals = state_values.astype(float)
+    for row, value in zip(usage, values.tolist()):
+        if value > 0:
+            fits = (used + row <= limits).all(axis=1)
+            used[fits] += row
+            totals[fits] += value
+    return totals
+
+def _dominated(usage, block_cells):
+    """Позначає стани, витрати яких не менші за витрати одного з попередніх станів за всіма ресурсами"""
+    count, d = usage.shape
+    dominated = np.zeros(count, dtype=bool)
+    block = max(1, block_cells // max(count * d, 1))
+
+    for start in range(1, count, block):
+        stop = min(start + block, count)
+        # Пари (попередній стан, стан блоку); попередні стани мають не менше значення
+        covers = (usage[None, :stop] <= usage[start:stop, None]).all(axis=2)
+        covers &= np.arange(stop)[None, :] < np.arange(start, stop)[:, None]
+        dominated[start:stop] = covers.any(axis=1)
+
+    return dominated
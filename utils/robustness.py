@@ -0,0 +1,199 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .normalize import criteria_matrix, normalize_matrix
+from .portfolio import as_portfolio
+from .combinations import generate_combinations, build_candidate_store
+from .multiplicity import group_identical_projects
+
+# Моделі відносної похибки оцінок критеріїв
+NOISE_MODELS = ('normal', 'uniform', 'lognormal')
+DEFAULT_NOISE = {'model': 'normal', 'scale': 0.1}
+
+# Кількість вибірок в одній частині роботи процесу; від неї (а не від кількості процесів)
+# залежить розбиття генератора випадкових чисел, тому результат відтворюваний
+DEFAULT_CHUNK_SAMPLES = 250
+
+# Найбільша кількість пар (комбінація, вибірка) в одному векторному пакеті
+DEFAULT_BATCH_CELLS = 2_000_000
+
+def perturb_values(values, noise, rng, samples):
+    """
+    Генерує вибірки збурених значень критеріїв.
+
+    Похибка відносна: для 'normal' значення множиться на 1 + scale·Z, для 'uniform' -
+    на 1 + U(-scale, scale), для 'lognormal' - на exp(scale·Z - scale²/2), тобто середнє
+    значення не змінюється. Множники обрізаються знизу нулем, тож значення лишаються невід'ємними.
+
+    Аргументи:
+        values: Матриця значень критеріїв розміром n × m
+        noise: Модель похибки {'model', 'scale'} або список моделей для кожного критерію
+        rng: Генератор випадкових чисел NumPy
+        samples: Кількість вибірок
+
+    Повертає:
+        numpy.ndarray: Збурені значення розміром samples × n × m
+    """
+    values = np.asarray(values, dtype=float)
+    noise = _noise_per_criterion(noise, values.shape[1])
+    perturbed = np.empty((samples,) + values.shape)
+
+    for j, criterion_noise in enumerate(noise):
+        model, scale = criterion_noise['model'], criterion_noise['scale']
+        size = (samples, values.shape[0])
+        if model == 'normal':
+            factors = np.maximum(1 + scale * rng.standard_normal(size), 0)
+        elif model == 'uniform':
+            factors = np.maximum(1 + rng.uniform(-scale, scale, size), 0)
+        else:
+            factors = np.exp(scale * rng.standard_normal(size) - scale**2 / 2)
+        perturbed[:, :, j] = values[:, j] * factors
+
+    return perturbed
+
+def _noise_per_criterion(noise, m):
+    """Перевіряє моделі похибки і повертає окрему модель для кожного критерію"""
+    noise = [noise] * m if isinstance(noise, dict) else list(noise)
+    if len(noise) != m:
+        raise ValueError(f"Потрібна модель похибки для кожного з {m} критеріїв")
+    for criterion_noise in noise:
+        if criterion_noise.get('model') not in NOISE_MODELS:
+            raise ValueError(f"Невідома модель похибки: {criterion_noise.get('model')}")
+        if not criterion_noise.get('scale', 0) >= 0:
+            raise ValueError("Розмір похибки не може бути від'ємним")
+    return noise
+
+def count_winners(masks, class_values, project_class, noise, seed, samples, batch_cells=DEFAULT_BATCH_CELLS):
+    """
+    Рахує, скільки разів кожна комбінація найближча до ідеальної точки на збурених даних.
+
+    Множина допустимих комбінацій не залежить від оцінок критеріїв, тому для кожної
+    вибірки перераховуються лише нормалізовані суми комбінацій (одним множенням матриць
+    для пакета вибірок). Ідеальна точка вибірки - найбільші суми на цій множині, тобто
+    оптимуми задачі про рюкзак, і окремий розв'язок ДП не потрібен.
+
+    Аргументи:
+        masks: Маски вибору проєктів допустимих комбінацій розміром C × n
+        class_values: Значення критеріїв класів однакових проєктів розміром k × m
+        project_class: Клас кожного проєкту (однакові проєкти отримують однакову похибку)
+        noise: Модель похибки (див. perturb_values)
+        seed: Зерно або SeedSequence генератора випадкових чисел
+        samples: Кількість вибірок
+        batch_cells: Найбільша кількість пар (комбінація, вибірка) в одному пакеті
+
+    Повертає:
+        numpy.ndarray: Кількість виграшів кожної комбінації
+    """
+    rng = np.random.default_rng(seed)
+    counts = np.zeros(len(masks), dtype=np.int64)
+    masks_t = masks.T.astype(float)
+    batch = max(1, batch_cells // max(len(masks), 1))
+
+    for start in range(0, samples, batch):
+        size = min(batch, samples - start)
+
+        # Збурюємо значення класів і нормалізуємо кожну вибірку окремо
+        values = perturb_values(class_values, noise, rng, size)[:, project_class]
+        factors = np.sqrt((values**2).sum(axis=1, keepdims=True))
+        norm_values = values / np.where(factors > 0, factors, 1)
+
+        # Нормалізовані суми всіх комбінацій одним множенням матриць: samples × m × C
+        m = norm_values.shape[2]
+        totals = (norm_values.transpose(0, 2, 1).reshape(size * m, -1) @ masks_t).reshape(size, m, -1)
+        totals -= totals.max(axis=2, keepdims=True)
+        np.square(totals, out=totals)
+        distances = totals.sum(axis=1)
+
+        counts += np.bincount(distances.argmin(axis=1), minlength=len(masks))
+
+    return counts
+
+def _maximal_combinations(masks, costs, projects, budget):
+    """Позначає комбінації, до яких не вкладається жоден невибраний проєкт"""
+    project_costs = as_portfolio(projects).cost.astype(float)
+    cheapest_left = np.where(masks, np.inf, project_costs).min(axis=1, initial=np.inf)
+
+    # Через похибки округлення комбінація скоріше залишиться, ніж буде помилково відкинута
+    tolerance = 1e-9 * max(1.0, abs(budget))
+    return costs + cheapest_left > budget - tolerance
+
+def _count_chunk(args):
+    # Точка входу процесу: одна частина вибірок зі своїм генератором
+    return count_winners(*args)
+
+def robustness_analysis(projects, budget, samples=1000, noise=DEFAULT_NOISE, seed=0, workers=None,
+                        chunk_samples=DEFAULT_CHUNK_SAMPLES, batch_cells=DEFAULT_BATCH_CELLS):
+    """
+    Оцінює стійкість рекомендації методу ідеальної точки методом Монте-Карло.
+
+    Прибуток і експертна оцінка кожного класу однакових проєктів збурюються за моделлю
+    похибки, і для кожної вибірки знаходиться комбінація, найближча до ідеальної точки.
+    Вибірки розбиваються на частини по chunk_samples, які обчислюються в пулі процесів.
+
+    Аргументи:
+        projects: Portfolio або список проєктів [вартість, прибуток, експертна_оцінка]
+        budget: Доступний бюджет
+        samples: Кількість вибірок
+        noise: Модель похибки {'model', 'scale'} або список моделей для прибутку та експертної оцінки
+        seed: Зерно генератора випадкових чисел
+        workers: Кількість процесів (1 - без пулу процесів)
+        chunk_samples: Кількість вибірок в одній частині
+        batch_cells: Найбільша кількість пар (комбінація, вибірка) в одному пакеті
+
+    Повертає:
+        dict: Комбінації, їх частоти виграшу, частоти вибору проєктів і номінальна рекомендація
+    """
+    if samples < 1:
+        raise ValueError("Кількість вибірок має бути додатною")
+
+    _, values = criteria_matrix(projects, [1, 2])
+    _noise_per_criterion(noise, values.shape[1])
+    norm_values, _ = normalize_matrix(values)
+    store = build_candidate_store(generate_combinations(projects, budget), values, norm_values)
+
+    # Номінальна рекомендація - найближча комбінація без похибок
+    nominal = store['norm']
+    nominal_winner = int(((nominal - nominal.max(axis=0))**2).sum(axis=1).argmin())
+
+    # Якщо значення невід'ємні, комбінація, до якої можна додати ще один проєкт,
+    # не ближча до ідеальної точки, ніж її розширення. Тоді виграти можуть лише максимальні
+    # за включенням комбінації (і номінальна рекомендація, яку залишаємо для звіту)
+    if (values >= 0).all():
+        candidates = _maximal_combinations(store['masks'], store['cost'], projects, budget)
+    else:
+        candidates = np.ones(len(store['masks']), dtype=bool)
+    candidates[nominal_winner] = True
+    candidates = np.flatnonzero(candidates)
+
+    # Однакові проєкти описують одну оцінку, тому отримують однакову похибку
+    classes, _, members = group_identical_projects(projects)
+    project_class = np.zeros(len(values), dtype=int)
+    for class_id, member in enumerate(members):
+        project_class[member] = class_id
+    class_values = classes.columns([1, 2])
+
+    sizes = [min(chunk_samples, samples - start) for start in range(0, samples, chunk_samples)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(store['masks'][candidates], class_values, project_class, noise, chunk_seed, size, batch_cells)
+             for chunk_seed, size in zip(seeds, sizes)]
+
+    if workers == 1 or len(tasks) == 1:
+        chunk_counts = list(map(_count_chunk, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunk_counts = list(pool.map(_count_chunk, tasks))
+    counts = np.zeros(len(store['masks']), dtype=np.int64)
+    counts[candidates] = np.sum(chunk_counts, axis=0)
+
+    return {
+        'samples': samples,
+        'noise': noise,
+        'masks': store['masks'],
+        'cost': store['cost'],
+        'values': store['values'],
+        'counts': counts,
+        'frequency': counts / samples,
+        'project_frequency': counts @ store['masks'] / samples,
+        'candidates': len(candidates),
+        'nominal_winner': nominal_winner,
+        'nominal_frequency': counts[nominal_winner] / samples
+    }
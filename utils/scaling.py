@@ -0,0 +1,97 @@
+import math
+import numpy as np
+
+# Найбільший розмір таблиці ДП (кількість комірок), для якого використовується щільний метод
+DEFAULT_MAX_DP_CELLS = 20_000_000
+
+# Найбільша кількість знаків після коми, яку перевіряє автоматичний вибір точності
+MAX_DECIMALS = 6
+
+def plan_precision(costs, budget, decimals=None, max_cells=DEFAULT_MAX_DP_CELLS):
+    """
+    Визначає, як перевести вартості у цілі одиниці для таблиці ДП.
+
+    Вартості множаться на 10^decimals і діляться на їх найбільший спільний дільник,
+    тому таблиця ДП має найменшу ширину, за якої результат лишається точним.
+    Якщо точність задана грубіше за потрібну, вартості округлюються вгору, а бюджет - вниз,
+    тож знайдені рішення завжди вкладаються в справжній бюджет.
+
+    Аргументи:
+        costs: Вартості проєктів
+        budget: Доступний бюджет
+        decimals: Кількість знаків після коми (None - найменша точна кількість)
+        max_cells: Найбільша кількість комірок таблиці ДП для щільного методу
+
+    Повертає:
+        dict: Параметри масштабування, розмір таблиці ДП та вибраний метод ('dense' або 'sparse')
+    """
+    costs = np.asarray(costs, dtype=float)
+    exact_decimals = _exact_decimals(costs)
+
+    if decimals is None:
+        decimals = exact_decimals if exact_decimals is not None else MAX_DECIMALS
+    exact = exact_decimals is not None and decimals >= exact_decimals
+
+    # Переводимо у цілі одиниці: вартості вгору, бюджет вниз
+    factor = 10**decimals
+    units = np.ceil(np.round(costs * factor, MAX_DECIMALS)).astype(np.int64)
+
+    # Спільний дільник вартостей не змінює множини допустимих рішень
+    divisor = math.gcd(*units.tolist()) if len(units) and units.any() else 1
+    divisor = max(divisor, 1)
+    budget_units = int(np.floor(np.round(budget * factor, MAX_DECIMALS))) // divisor
+    budget_units = max(budget_units, 0)
+
+    cells = (len(costs) + 1) * (budget_units + 1)
+
+    return {
+        'decimals': decimals,
+        'scale': factor / divisor,
+        'divisor': divisor,
+        'costs': units // divisor,
+        'budget': budget_units,
+        'cells': cells,
+        'memory_bytes': cells * np.dtype(np.int64).itemsize,
+        'exact': exact,
+        'engine': 'dense' if cells <= max_cells else 'sparse'
+    }
+
+def feasibility_units(costs, budget):
+    """
+    Повертає вартості й бюджет у тих самих цілих одиницях, у яких бюджет перевіряє таблиця ДП.
+
+    Суми дробових вартостей (0.1 + 0.2) не можна точно порівняти з бюджетом, тому перебір
+    комбінацій порівнює суми цілих одиниць з plan_precision. Цілі вартості повертаються без змін.
+
+    Аргументи:
+        costs: Вартості проєктів (масив NumPy)
+        budget: Доступний бюджет
+
+    Повертає:
+        tuple: (список вартостей в одиницях, бюджет в одиницях, чи були вартості масштабовані)
+    """
+    if costs.dtype.kind != 'f':
+        return costs.tolist(), budget, False
+    plan = plan_precision(costs, budget)
+    return plan['costs'].tolist(), plan['budget'], True
+
+def to_budget_units(plan, budget):
+    """
+    Переводить бюджет у цілі одиниці таблиці ДП за вже вибраним масштабуванням.
+
+    Аргументи:
+        plan: Параметри масштабування з plan_precision
+        budget: Бюджет у початкових одиницях
+
+    Повертає:
+        int: Бюджет в одиницях таблиці ДП
+    """
+    return int(np.floor(np.round(budget * 10**plan['decimals'], MAX_DECIMALS))) // plan['divisor']
+
+def _exact_decimals(costs):
+    # Найменша кількість знаків після коми, за якої всі вартості стають цілими
+    for decimals in range(MAX_DECIMALS + 1):
+        scaled = costs * 10**decimals
+        if np.allclose(scaled, np.round(scaled), rtol=0, atol=1e-6):
+            return decimals
+    return None
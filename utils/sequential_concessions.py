@@ -1,31 +1,55 @@
-import pandas as pd
 import numpy as np
-from .knapsack import solve_knapsack
+from .knapsack import solve_lexicographic_knapsack
+from .resources import solve_knapsack_resources
+from .dependencies import solve_knapsack_rules, generate_rule_combinations
+from .portfolio import as_portfolio
+from .multiplicity import group_identical_projects, generate_class_combinations, expand_class_counts
 
-def initialize_sequential_concessions(projects, budget, primary_criterion_index=1, secondary_criterion_index=2):
+def initialize_sequential_concessions(projects, budget, primary_criterion_index=1, secondary_criterion_index=2,
+                                      precision=None, capacities=None, rules=None):
     """
     Ініціалізує процес послідовних поступок для двох критеріїв.
     
+    Початкове рішення - лексикографічний оптимум: найбільше значення основного критерію,
+    а серед таких рішень - найбільше значення другорядного. Комбінації для наступних
+    поступок генеруються лише під час першої поступки. Якщо задано обсяги додаткових
+    ресурсів або правила вибору проєктів, початкове рішення знаходиться розрідженим
+    методом, який враховує їх під час пошуку.
+    
     Аргументи:
-        projects: Список проєктів, кожен містить [вартість, критерій1, критерій2]
+        projects: Portfolio або список проєктів [вартість, критерій1, критерій2]
         budget: Доступний бюджет
         primary_criterion_index: Індекс основного критерію (1 або 2)
         secondary_criterion_index: Індекс другорядного критерію (1 або 2)
+        precision: Кількість знаків після коми у вартостях (None - найменша точна)
+        capacities: Доступні обсяги додаткових ресурсів портфеля (None - лише бюджет)
+        rules: Залежності та групи взаємовиключних проєктів (див. project_rules) або None
     
     Повертає:
         dict: Початковий стан процесу послідовних поступок
     """
-    # Крок 1: Оптимізація за основним критерієм
-    primary_solution, primary_max, _, _ = solve_knapsack(projects, budget, primary_criterion_index)
-    primary_cost = sum(projects[i][0] for i, x in enumerate(primary_solution) if x == 1)
-    secondary_value = sum(projects[i][secondary_criterion_index] for i, x in enumerate(primary_solution) if x == 1)
-    
-    # Генеруємо всі можливі комбінації для подальшого використання
-    all_combinations = generate_all_combinations(projects, budget)
+    projects = as_portfolio(projects)
+    
+    # Крок 1: Оптимізація за основним критерієм, а за рівності - за другорядним
+    if rules is not None:
+        primary_solution, primary_max = solve_knapsack_rules(
+            projects, budget, primary_criterion_index, rules, secondary_criterion_index, capacities)
+    elif capacities is not None:
+        primary_solution, primary_max = solve_knapsack_resources(
+            projects, budget, capacities, primary_criterion_index, secondary_criterion_index)
+    else:
+        primary_solution, primary_max, secondary_value = solve_lexicographic_knapsack(
+            projects, budget, primary_criterion_index, secondary_criterion_index, precision)
+    if rules is not None or capacities is not None:
+        secondary_value = projects.column(secondary_criterion_index)[np.array(primary_solution, dtype=bool)].sum().item()
+    selected = np.array(primary_solution, dtype=bool)
+    primary_cost = projects.cost[selected].sum().item()
     
     return {
         "projects": projects,
         "budget": budget,
+        "capacities": capacities,
+        "rules": rules,
         "primary_criterion_index": primary_criterion_index,
         "secondary_criterion_index": secondary_criterion_index,
         "current_solution": primary_solution,
@@ -33,7 +57,7 @@ def initialize_sequential_concessions(projects, budget, primary_criterion_index=
         "current_secondary_value": secondary_value,
         "current_cost": primary_cost,
         "original_primary_max": primary_max,
-        "all_combinations": all_combinations,
+        "all_combinations": None,
         "iteration": 0,
         "history": [{
             "solution": primary_solution,
@@ -51,18 +75,27 @@ def make_next_concession(state, concession_amount):
     primary_criterion_index = state["primary_criterion_index"]
     secondary_criterion_index = state["secondary_criterion_index"]
     current_primary_value = state["current_primary_value"]
+    
+    # Комбінації генеруються один раз, під час першої поступки
+    if state["all_combinations"] is None:
+        state["all_combinations"] = generate_all_combinations(projects, budget, state.get("capacities"),
+                                                               state.get("rules"))
     all_combinations = state["all_combinations"]
     
     # Визначаємо мінімально прийнятне значення основного критерію після поступки
     min_acceptable_primary = current_primary_value - concession_amount
     
+    # Обчислюємо значення критеріїв для всіх комбінацій одним множенням матриць
+    masks = np.array([combo for combo, _ in all_combinations], dtype=bool).reshape(len(all_combinations), len(projects))
+    primary_values = (masks @ projects.column(primary_criterion_index)).tolist()
+    secondary_values = (masks @ projects.column(secondary_criterion_index)).tolist()
+    
     # Фільтруємо комбінації
-    acceptable_combinations = []
-    for combo, cost in all_combinations:
-        combo_primary = sum(projects[i][primary_criterion_index] for i, x in enumerate(combo) if x == 1)
-        combo_secondary = sum(projects[i][secondary_criterion_index] for i, x in enumerate(combo) if x == 1)
-        if combo_primary >= min_acceptable_primary:
-            acceptable_combinations.append((combo, cost, combo_primary, combo_secondary))
+    acceptable_combinations = [
+        (combo, cost, combo_primary, combo_secondary)
+        for (combo, cost), combo_primary, combo_secondary in zip(all_combinations, primary_values, secondary_values)
+        if combo_primary >= min_acceptable_primary
+    ]
     
     # Перевіряємо, чи є прийнятні комбінації
     if not acceptable_combinations:
@@ -78,8 +111,9 @@ def make_next_concession(state, concession_amount):
         })
         return state
     
-    # Вибираємо найкращу за другорядним критерієм
-    final_solution = max(acceptable_combinations, key=lambda x: x[3])
+    # Вибираємо найкращу за другорядним критерієм, а серед рівних - за основним
+    # (так само, як mitm_concession_optimum)
+    final_solution = max(acceptable_combinations, key=lambda x: (x[3], x[2]))
     combo, combo_cost, combo_primary, combo_secondary = final_solution
     
     # Оновлюємо стан
@@ -112,76 +146,26 @@ def get_current_result(state):
         "history": state["history"]
     }
 
-def create_concessions_df(acceptable_combinations, final_solution):
-    """
-    Створює DataFrame з результатами.
-    
-    Аргументи:
-        acceptable_combinations: Список прийнятних комбінацій
-        final_solution: Фінальне вибране рішення
-    
-    Повертає:
-        pandas.DataFrame: Таблиця результатів
-    """
-    rows = []
-    for i, (combo, cost, primary_value, secondary_value) in enumerate(acceptable_combinations, 1):
-        combo_str = ', '.join([f'x{j+1}' for j, x in enumerate(combo) if x == 1]) or "Жодного"
-        is_final = np.array_equal(combo, final_solution)
-        rows.append({
-            'Ранг': i,
-            'Комбінація': combo_str,
-            'Вартість': cost,
-            'Критерій 1': primary_value, 
-            'Критерій 2': secondary_value,
-            'Фінальне': '✓' if is_final else ''
-        })
-    return pd.DataFrame(rows)
-
-def generate_all_combinations(projects, budget):
+def generate_all_combinations(projects, budget, capacities=None, rules=None):
     """
-    Генерує всі можливі комбінації проєктів у межах бюджету.
+    Генерує всі можливі комбінації проєктів у межах бюджету (і обсягів додаткових ресурсів).
+    Однакові проєкти перебираються як один клас із кількістю копій.
     
     Аргументи:
-        projects: Список проєктів [вартість, критерій1, критерій2]
+        projects: Portfolio або список проєктів [вартість, критерій1, критерій2]
         budget: Доступний бюджет
+        capacities: Доступні обсяги додаткових ресурсів портфеля (None - лише бюджет)
+        rules: Залежності та групи взаємовиключних проєктів (див. project_rules) або None
     
     Повертає:
         list: Список кортежів (комбінація, вартість)
     """
-    n = len(projects)
-    result = []
-    
-    def backtrack(index, current_combo, current_cost):
-        if index == n:
-            result.append((current_combo.copy(), current_cost))
-            return
-        backtrack(index + 1, current_combo + [0], current_cost)
-        if current_cost + projects[index][0] <= budget:
-            backtrack(index + 1, current_combo + [1], current_cost + projects[index][0])
-    
-    backtrack(0, [], 0)
-    return result
-
-def get_history_df(state):
-    """
-    Створює DataFrame з історією ітерацій.
+    if rules is not None:
+        return [(combo, cost) for combo, cost, _, _ in generate_rule_combinations(projects, budget, rules, capacities)]
     
-    Аргументи:
-        state: Поточний стан процесу послідовних поступок
+    classes, counts, members = group_identical_projects(projects)
     
-    Повертає:
-        pandas.DataFrame: Таблиця історії ітерацій
-    """
-    rows = []
-    for i, entry in enumerate(state["history"]):
-        projects_str = ', '.join([f'x{j+1}' for j, x in enumerate(entry["solution"]) if x == 1]) or "Жодного"
-        rows.append({
-            'Ітерація': i,
-            'Поступка': entry["concession_amount"],
-            'Вибрані проєкти': projects_str,
-            'Критерій 1': entry["primary_value"],
-            'Критерій 2': entry["secondary_value"],
-            'Вартість': entry["cost"],
-            'Повідомлення': entry["message"]
-        })
-    return pd.DataFrame(rows)
\ No newline at end of file
+    return [
+        (expand_class_counts(class_counts, members, len(projects)), cost)
+        for class_counts, cost, _, _ in generate_class_combinations(classes, counts, budget, capacities)
+    ]
@@ -0,0 +1,135 @@
+import heapq
+import numpy as np
+
+def pareto_front(points):
+    """
+    Знаходить недоміновані точки (максимізація за всіма критеріями).
+
+    Аргументи:
+        points: Масив точок розміром (кількість × критерії)
+
+    Повертає:
+        numpy.ndarray: Індекси точок фронту Парето
+    """
+    points = np.asarray(points, dtype=float)
+    if len(points) == 0:
+        return np.array([], dtype=int)
+
+    # Сортуємо за спаданням усіх координат, щоб домінуюча точка йшла раніше за доміновану
+    order = np.lexsort(-points.T[::-1])
+
+    if points.shape[1] == 2:
+        # Для двох критеріїв точка недомінована, якщо її друга координата
+        # більша за максимум серед усіх попередніх
+        y = points[order, 1]
+        running_max = np.maximum.accumulate(np.concatenate([[-np.inf], y[:-1]]))
+        return np.sort(order[y > running_max])
+
+    front = []
+    for i in order:
+        if not any(np.all(points[j] >= points[i]) for j in front):
+            front.append(i)
+    return np.sort(np.array(front, dtype=int))
+
+def build_kd_tree(points, leaf_size=16):
+    """
+    Будує k-d дерево для швидкого пошуку найближчих точок.
+
+    Кожен вузол зберігає обмежувальний прямокутник своїх точок, що дозволяє
+    відсікати піддерева для будь-якої зваженої p-норми.
+
+    Аргументи:
+        points: Масив точок розміром (кількість × критерії)
+        leaf_size: Максимальна кількість точок у листі
+
+    Повертає:
+        dict: Дерево - точки, порядок індексів та список вузлів
+    """
+    points = np.asarray(points, dtype=float)
+    order = np.arange(len(points))
+    nodes = []
+
+    def build(start, end):
+        node_points = points[order[start:end]]
+        node = {
+            'start': start,
+            'end': end,
+            'low': node_points.min(axis=0),
+            'high': node_points.max(axis=0),
+            'left': None,
+            'right': None
+        }
+        node_id = len(nodes)
+        nodes.append(node)
+
+        if end - start > leaf_size:
+            # Ділимо за медіаною вздовж виміру з найбільшим розкидом
+            axis = np.argmax(node['high'] - node['low'])
+            mid = (start + end) // 2
+            part = np.argpartition(node_points[:, axis], mid - start)
+            order[start:end] = order[start:end][part]
+            node['left'] = build(start, mid)
+            node['right'] = build(mid, end)
+
+        return node_id
+
+    if len(points) > 0:
+        build(0, len(points))
+
+    return {'points': points, 'order': order, 'nodes': nodes}
+
+def _weighted_norm(diffs, weights, p):
+    if np.isinf(p):
+        return (np.abs(diffs) * weights).max(axis=-1)
+    return ((np.abs(diffs)**p) * weights).sum(axis=-1)**(1 / p)
+
+def query_nearest(tree, ideal, k=1, weights=None, p=2):
+    """
+    Знаходить k точок, найближчих до ідеальної точки, за зваженою p-нормою.
+
+    Аргументи:
+        tree: Дерево з build_kd_tree
+        ideal: Координати ідеальної точки
+        k: Кількість найближчих точок
+        weights: Ваги критеріїв (за замовчуванням однакові)
+        p: Порядок норми (1, 2 або np.inf)
+
+    Повертає:
+        tuple: (відстані, індекси) відсортовані за зростанням відстані
+    """
+    points = tree['points']
+    nodes = tree['nodes']
+    ideal = np.asarray(ideal, dtype=float)
+    weights = np.ones(points.shape[1]) if weights is None else np.asarray(weights, dtype=float)
+
+    if not nodes:
+        return np.array([]), np.array([], dtype=int)
+
+    def box_distance(node):
+        # Відстань від ідеальної точки до найближчої точки прямокутника вузла
+        return _weighted_norm(np.clip(ideal, node['low'], node['high']) - ideal, weights, p)
+
+    # Купа кандидатів (максимум зверху) та черга вузлів за нижньою межею відстані
+    best = []
+    queue = [(box_distance(nodes[0]), 0)]
+
+    while queue:
+        bound, node_id = heapq.heappop(queue)
+        if len(best) == k and bound > -best[0][0]:
+            break
+
+        node = nodes[node_id]
+        if node['left'] is None:
+            idx = tree['order'][node['start']:node['end']]
+            dist = _weighted_norm(points[idx] - ideal, weights, p)
+            for d, i in zip(dist, idx):
+                if len(best) < k:
+                    heapq.heappush(best, (-d, i))
+                elif d < -best[0][0]:
+                    heapq.heapreplace(best, (-d, i))
+        else:
+            for child in (node['left'], node['right']):
+                heapq.heappush(queue, (box_distance(nodes[child]), child))
+
+    best.sort(key=lambda x: -x[0])
+    return np.array([-d for d, _ in best]), np.array([i for _, i in best], dtype=int)
@@ -0,0 +1,380 @@
+import os
+import pstats
+import numpy as np
+import pandas as pd
+from .scaling import plan_precision, DEFAULT_MAX_DP_CELLS, MAX_DECIMALS
+from .combinations import DEFAULT_METRICS
+
+# Функції для подання результатів розв'язувачів у вигляді таблиць pandas.
+# Модулі розв'язувачів не імпортують pandas, тому не залежать від цього модуля.
+
+def create_normalization_df(projects, norm_data):
+    """
+    Створює pandas DataFrame з деталями нормалізації для відображення
+    
+    Аргументи:
+        projects: Список проєктів
+        norm_data: Словник з даними нормалізації
+        
+    Повертає:
+        pandas.DataFrame: DataFrame з інформацією про нормалізацію
+    """
+    df = pd.DataFrame({
+        'Проєкт': [f"x{i+1}" for i in range(len(projects))],
+        'Прибуток': norm_data['profits'],
+        'Норм. прибуток': [round(x, 4) for x in norm_data['norm_profits']],
+        'Експертна оцінка': norm_data['expert_scores'],
+        'Норм. експертна оцінка': [round(x, 4) for x in norm_data['norm_expert']]
+    })
+    
+    # Додаємо рядок з підсумками
+    totals = pd.DataFrame({
+        'Проєкт': ['√Σ'],
+        'Прибуток': [''],
+        'Норм. прибуток': [round(norm_data['norm_factor_profits'], 4)],
+        'Експертна оцінка': [''],
+        'Норм. експертна оцінка': [round(norm_data['norm_factor_expert'], 4)]
+    })
+    
+    return pd.concat([df, totals], ignore_index=True)
+
+def create_precision_df(costs, budget, max_cells=DEFAULT_MAX_DP_CELLS):
+    """
+    Створює pandas DataFrame з розміром таблиці ДП для кожної точності вартостей
+
+    Аргументи:
+        costs: Вартості проєктів
+        budget: Доступний бюджет
+        max_cells: Найбільша кількість комірок таблиці ДП для щільного методу
+
+    Повертає:
+        pandas.DataFrame: DataFrame з розміром і пам'яттю таблиці ДП для кожної точності
+    """
+    rows = []
+
+    for decimals in range(MAX_DECIMALS // 2 + 1):
+        plan = plan_precision(costs, budget, decimals, max_cells)
+        rows.append({
+            'Знаків після коми': decimals,
+            'Одиниця вартості': f"{1 / plan['scale']:g}",
+            'Ширина таблиці ДП': plan['budget'] + 1,
+            'Комірок': plan['cells'],
+            "Пам'ять (МБ)": round(plan['memory_bytes'] / 2**20, 2),
+            'Точно': '✓' if plan['exact'] else '',
+            'Метод': 'Таблиця ДП' if plan['engine'] == 'dense' else 'Розріджений'
+        })
+
+    return pd.DataFrame(rows)
+
+def create_dp_table_df(dp, budget, criterion_name, rows=None, columns=None):
+    """
+    Створює pandas DataFrame з таблиці ДП (або її вікна) для відображення
+    
+    Аргументи:
+        dp: Таблиця динамічного програмування
+        budget: Максимальний бюджет
+        criterion_name: Назва критерію, який максимізується
+        rows: Номери рядків вікна (за замовчуванням усі)
+        columns: Стовпці бюджету вікна (за замовчуванням 0..budget)
+        
+    Повертає:
+        pandas.DataFrame: Версія таблиці ДП у форматі DataFrame
+    """
+    dp = np.asarray(dp)
+    rows = np.arange(len(dp)) if rows is None else np.asarray(rows, dtype=int)
+    columns = np.arange(budget + 1) if columns is None else np.asarray(columns, dtype=int)
+    
+    # Вікно вирізається одразу з масиву, без побудови рядків у Python
+    df = pd.DataFrame(dp[np.ix_(rows, columns)], columns=columns.astype(str))
+    df.insert(0, 'i\\S', rows)
+    return df
+
+def create_combinations_df(distances):
+    """
+    Створює pandas DataFrame з деталями комбінацій для відображення
+    
+    Аргументи:
+        distances: Список кортежів з інформацією про відстані
+        
+    Повертає:
+        pandas.DataFrame: DataFrame з інформацією про комбінації
+    """
+    rows = []
+    
+    for i, (combo, cost, profit, expert, norm_profit, norm_expert, distance) in enumerate(distances, start=1):
+        combo_str = ', '.join([f'x{j+1}' for j, x in enumerate(combo) if x == 1]) or "Жодного"
+        
+        rows.append({
+            'Ранг': i,
+            'Комбінація': combo_str,
+            'Вартість': cost,
+            'Прибуток': profit,
+            'Експертна оцінка': expert,
+            'Норм. прибуток': round(norm_profit, 4),
+            'Норм. експертна оцінка': round(norm_expert, 4),
+            'Відстань': round(distance, 4)
+        })
+    
+    return pd.DataFrame(rows)
+
+def create_metric_comparison_df(store, distance_matrix, metrics=DEFAULT_METRICS,
+                                criteria_names=("Прибуток", "Експертна оцінка")):
+    """
+    Створює pandas DataFrame з найкращою комбінацією для кожної метрики
+    
+    Аргументи:
+        store: Сховище кандидатів з build_candidate_store
+        distance_matrix: Матриця відстаней з calculate_distance_matrix
+        metrics: Список метрик
+        criteria_names: Назви критеріїв для стовпців таблиці
+        
+    Повертає:
+        pandas.DataFrame: DataFrame з рекомендованими портфелями за кожною метрикою
+    """
+    rows = []
+    best = distance_matrix.argmin(axis=0)
+    
+    for j, metric in enumerate(metrics):
+        i = best[j]
+        combo_str = ', '.join([f'x{k+1}' for k in np.flatnonzero(store['masks'][i])]) or "Жодного"
+        
+        row = {
+            'Метрика': metric['name'],
+            'Ваги': 'однакові' if metric['weights'] is None else ', '.join(f'{w:g}' for w in metric['weights']),
+            'Комбінація': combo_str,
+            'Вартість': store['cost'][i]
+        }
+        for name, value in zip(criteria_names, store['values'][i]):
+            row[name] = value
+        row['Відстань'] = round(distance_matrix[i, j], 4)
+        rows.append(row)
+    
+    return pd.DataFrame(rows)
+
+def create_candidate_page_df(store, indices, criteria_names=("Прибуток", "Експертна оцінка")):
+    """
+    Створює pandas DataFrame лише для вибраних кандидатів (однієї сторінки результатів)
+    
+    Аргументи:
+        store: Сховище кандидатів
+        indices: Індекси кандидатів сторінки
+        criteria_names: Назви критеріїв для стовпців таблиці
+        
+    Повертає:
+        pandas.DataFrame: DataFrame з інформацією про кандидатів сторінки
+    """
+    indices = np.asarray(indices, dtype=int)
+    masks = store['masks'][indices]
+    
+    df = pd.DataFrame({
+        'Комбінація': [', '.join(f'x{j+1}' for j in np.flatnonzero(mask)) or "Жодного" for mask in masks],
+        'Вартість': store['cost'][indices]
+    })
+    if 'rank' in store:
+        df.insert(0, 'Ранг', store['rank'][indices])
+    for j, name in enumerate(criteria_names):
+        df[name] = store['values'][indices, j]
+    if 'norm' in store:
+        for j, name in enumerate(criteria_names):
+            df[f'Норм. {name[0].lower() + name[1:]}'] = np.round(store['norm'][indices, j], 4)
+    if 'distance' in store:
+        df['Відстань'] = np.round(store['distance'][indices], 4)
+    
+    return df
+
+def create_concessions_df(acceptable_combinations, final_solution):
+    """
+    Створює DataFrame з результатами.
+    
+    Аргументи:
+        acceptable_combinations: Список прийнятних комбінацій
+        final_solution: Фінальне вибране рішення
+    
+    Повертає:
+        pandas.DataFrame: Таблиця результатів
+    """
+    rows = []
+    for i, (combo, cost, primary_value, secondary_value) in enumerate(acceptable_combinations, 1):
+        combo_str = ', '.join([f'x{j+1}' for j, x in enumerate(combo) if x == 1]) or "Жодного"
+        is_final = np.array_equal(combo, final_solution)
+        rows.append({
+            'Ранг': i,
+            'Комбінація': combo_str,
+            'Вартість': cost,
+            'Критерій 1': primary_value, 
+            'Критерій 2': secondary_value,
+            'Фінальне': '✓' if is_final else ''
+        })
+    return pd.DataFrame(rows)
+
+def get_history_df(state):
+    """
+    Створює DataFrame з історією ітерацій.
+    
+    Аргументи:
+        state: Поточний стан процесу послідовних поступок
+    
+    Повертає:
+        pandas.DataFrame: Таблиця історії ітерацій
+    """
+    rows = []
+    for i, entry in enumerate(state["history"]):
+        projects_str = ', '.join([f'x{j+1}' for j, x in enumerate(entry["solution"]) if x == 1]) or "Жодного"
+        rows.append({
+            'Ітерація': i,
+            'Поступка': entry["concession_amount"],
+            'Вибрані проєкти': projects_str,
+            'Критерій 1': entry["primary_value"],
+            'Критерій 2': entry["secondary_value"],
+            'Вартість': entry["cost"],
+            'Повідомлення': entry["message"]
+        })
+    return pd.DataFrame(rows)
+
+def create_budget_sweep_df(sweep):
+    """
+    Створює pandas DataFrame з результатами аналізу чутливості до бюджету
+
+    Аргументи:
+        sweep: Результати функції budget_sweep
+
+    Повертає:
+        pandas.DataFrame: DataFrame з результатами для кожного бюджету
+    """
+    rows = []
+
+    for entry in sweep:
+        combo_str = ', '.join([f'x{j+1}' for j, x in enumerate(entry['best_combo']) if x == 1]) or "Жодного"
+
+        rows.append({
+            'Бюджет': entry['budget'],
+            'Макс. прибуток': entry['max_profit'],
+            'Макс. експертна оцінка': entry['max_expert'],
+            'Найкраща комбінація': combo_str,
+            'Вартість': entry['best_cost'],
+            'Прибуток': entry['best_profit'],
+            'Експертна оцінка': entry['best_expert'],
+            'Відстань': round(entry['best_distance'], 4)
+        })
+
+    return pd.DataFrame(rows)
+
+def create_k_best_df(projects, solutions, values, criterion_name):
+    """
+    Створює pandas DataFrame з k найкращими рішеннями задачі про рюкзак за одним критерієм
+
+    Аргументи:
+        projects: Portfolio проєктів
+        solutions: Рішення (вектори вибору проєктів) за спаданням значення критерію
+        values: Значення критерію кожного рішення
+        criterion_name: Назва критерію
+
+    Повертає:
+        pandas.DataFrame: DataFrame з вибраними проєктами, вартістю і значенням кожного рішення
+    """
+    masks = np.array(solutions, dtype=bool).reshape(len(solutions), len(projects))
+
+    return pd.DataFrame({
+        'Місце': np.arange(1, len(solutions) + 1),
+        'Вибрані проєкти': [', '.join(f'x{j+1}' for j in np.flatnonzero(mask)) or "Жодного" for mask in masks],
+        'Вартість': masks @ projects.cost,
+        criterion_name: values
+    })
+
+def create_robustness_df(result, limit=20):
+    """
+    Створює pandas DataFrame з комбінаціями, які вигравали на збурених даних
+
+    Аргументи:
+        result: Результат функції robustness_analysis
+        limit: Найбільша кількість комбінацій (за спаданням частоти виграшу)
+
+    Повертає:
+        pandas.DataFrame: DataFrame з частотою виграшу кожної комбінації
+    """
+    winners = np.flatnonzero(result['counts'])
+    winners = winners[np.argsort(-result['counts'][winners], kind='stable')][:limit]
+    values = result['values'][winners]
+
+    return pd.DataFrame({
+        'Комбінація': [', '.join(f'x{j+1}' for j in np.flatnonzero(mask)) or "Жодного"
+                       for mask in result['masks'][winners]],
+        'Вартість': result['cost'][winners],
+        'Прибуток': values[:, 0],
+        'Експертна оцінка': values[:, 1],
+        'Частота виграшу': np.round(result['frequency'][winners], 4),
+        'Номінальна рекомендація': np.where(winners == result['nominal_winner'], '✓', '')
+    })
+
+def create_project_frequency_df(result):
+    """
+    Створює pandas DataFrame з частотою вибору кожного проєкту на збурених даних
+
+    Аргументи:
+        result: Результат функції robustness_analysis
+
+    Повертає:
+        pandas.DataFrame: DataFrame з частотою вибору та входженням у номінальну рекомендацію
+    """
+    frequency = result['project_frequency']
+
+    return pd.DataFrame({
+        'Проєкт': [f'x{j+1}' for j in range(len(frequency))],
+        'Частота вибору': np.round(frequency, 4),
+        'У номінальній рекомендації': np.where(result['masks'][result['nominal_winner']], '✓', '')
+    })
+
+def create_ingest_errors_df(errors, limit=1000):
+    """
+    Створює pandas DataFrame зі списком некоректних значень для відображення
+
+    Аргументи:
+        errors: Список помилок з read_projects
+        limit: Максимальна кількість рядків таблиці
+
+    Повертає:
+        pandas.DataFrame: DataFrame з некоректними значеннями
+    """
+    return pd.DataFrame(errors[:limit], columns=['Рядок', 'Стовпець', 'Значення'])
+
+def create_stages_df(records):
+    """
+    Створює pandas DataFrame з тривалістю та пам'яттю етапів для відображення
+
+    Аргументи:
+        records: Список записів етапів з record_stage
+
+    Повертає:
+        pandas.DataFrame: DataFrame з етапами
+    """
+    return pd.DataFrame({
+        'Етап': [record['stage'] for record in records],
+        'Елементів': [record['items'] for record in records],
+        'Час (мс)': [round(record['seconds'] * 1000, 2) for record in records],
+        "Пік пам'яті (МБ)": [None if record['peak_bytes'] is None else round(record['peak_bytes'] / 2**20, 3)
+                             for record in records]
+    })
+
+def create_profile_df(profiler, limit=30):
+    """
+    Створює pandas DataFrame з функціями, що займають найбільше часу
+
+    Аргументи:
+        profiler: Об'єкт cProfile.Profile
+        limit: Кількість функцій у таблиці
+
+    Повертає:
+        pandas.DataFrame: DataFrame з функціями, відсортованими за сумарним часом
+    """
+    stats = pstats.Stats(profiler).stats
+    rows = [
+        {
+            'Функція': f"{os.path.basename(file)}:{line}({function})",
+            'Викликів': calls,
+            'Власний час (с)': round(own_time, 4),
+            'Сумарний час (с)': round(total_time, 4)
+        }
+        for (file, line, function), (_, calls, own_time, total_time, _) in stats.items()
+    ]
+    rows.sort(key=lambda row: row['Сумарний час (с)'], reverse=True)
+    return pd.DataFrame(rows[:limit])